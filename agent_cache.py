@@ -0,0 +1,156 @@
+"""
+Agent-Side Caches
+Caches the agent keeps in front of its MCP servers.
+
+VersionedCache holds read results from the Task Database Server. The server
+tags every tools/call result with ``storeVersion``, a counter it bumps on
+each mutation. An entry is served only while the newest version the agent
+has seen still equals the version it was read at, so a write invalidates
+every cached read at once without tracking which reads it affected.
+
+ResponseCache holds the agent's final answers. Its keys include the state
+versions of both MCP servers, so a mutation makes every earlier answer
+unreachable; entries also expire after a TTL and are evicted LRU. Each
+entry remembers what producing it cost (LLM latency and tokens), so the
+stats report what the hits saved.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class VersionedCache:
+    """Bounded LRU cache whose entries are valid for one store version."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe(self, version: Optional[int]):
+        """Record a version reported by the server; versions only move forward."""
+        if version is None:
+            return
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.version = version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` if it is from the current version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # Written before the latest mutation: never valid again
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: Optional[int], value: Any):
+        """Cache ``value`` read at ``version``; stale or unversioned reads are skipped."""
+        if version is None:
+            return
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget every entry and the known version (e.g. after a server restart)."""
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for health reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "store_version": self.version,
+        }
+
+
+class ResponseCache:
+    """Bounded LRU cache of agent answers that expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Requests that skipped the cache (mutating, or server state unknown)
+        self.bypassed = 0
+        self.saved_ms = 0.0
+        self.saved_tokens = 0
+        # key -> (expiry on the monotonic clock, answer, cost in ms, cost in tokens)
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return the cached answer for ``key`` unless it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_ms += entry[2]
+                self.saved_tokens += entry[3]
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, answer: str, cost_ms: float = 0.0, tokens: int = 0):
+        """Cache ``answer``, recording what producing it cost."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer, cost_ms, tokens)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bypass(self):
+        """Count a request that was not eligible for caching."""
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        """Forget every entry (e.g. after a server restart reset its versions)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/bypass counters and the latency and tokens hits saved."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+            "saved_tokens": self.saved_tokens,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+        }
@@ -0,0 +1,111 @@
+"""
+Parallel Tool Call Benchmark
+Times one agent step that issues several tool calls at once: a few add_task
+calls (Task DB, STDIO) and a send_reminder (Notification Server, HTTP).
+
+- sequential: each tool is awaited in turn, so their latencies add up
+- tool node:  the step goes through LangGraph's ToolNode, as in the agent,
+              which runs the calls concurrently; each server's supervisor
+              caps how many run against it at once
+
+The tool node's results are checked to come back in the model's order.
+Both servers are started by the agent itself, with a throwaway data directory.
+
+Usage:
+    python benchmarks/bench_parallel_tools.py [--adds 3] [--steps 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.tools import StructuredTool  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode  # noqa: E402
+
+
+def step_calls(step, adds):
+    """The tool calls of one model turn, in the model's order."""
+    calls = [
+        {"name": "add_task", "args": {"task": f"bench task {step}-{index}"}, "id": f"call-{step}-{index}"}
+        for index in range(adds)
+    ]
+    calls.append({"name": "send_reminder", "args": {"task": f"bench task {step}-0"}, "id": f"call-{step}-reminder"})
+    return calls
+
+
+async def run_sequential(tools_by_name, calls):
+    return [await tools_by_name[call["name"]].ainvoke(call["args"]) for call in calls]
+
+
+def tool_graph(tools):
+    """A graph with just the agent's tool node (ToolNode needs a graph runtime)."""
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", ToolNode(tools))
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    return graph.compile()
+
+
+async def run_tool_node(graph, calls):
+    result = await graph.ainvoke({"messages": [AIMessage(content="", tool_calls=calls)]})
+    messages = result["messages"][1:]
+    if [message.tool_call_id for message in messages] != [call["id"] for call in calls]:
+        raise AssertionError("tool results are not in the model's order")
+    return [message.content for message in messages]
+
+
+async def main_async(args):
+    from mcp_task_manager import MCPTaskManagerAgent
+
+    agent = MCPTaskManagerAgent()
+    if not await agent.start_mcp_servers():
+        raise SystemExit("could not start the MCP servers")
+    tools = agent._build_tools(StructuredTool)
+    tools_by_name = {tool.name: tool for tool in tools}
+    graph = tool_graph(tools)
+    print(f"{args.steps} steps of {args.adds} add_task + 1 send_reminder (ms per step)\n")
+    print(f"{'mode':<12}{'p50':>10}{'p95':>10}{'mean':>10}")
+    try:
+        await run_sequential(tools_by_name, step_calls("warmup", args.adds))
+        for mode, run in (("sequential", lambda calls: run_sequential(tools_by_name, calls)),
+                          ("tool node", lambda calls: run_tool_node(graph, calls))):
+            samples = []
+            for step in range(args.steps):
+                calls = step_calls(f"{mode}-{step}", args.adds)
+                started = time.perf_counter()
+                await run(calls)
+                samples.append((time.perf_counter() - started) * 1000)
+            p95 = statistics.quantiles(samples, n=20)[-1]
+            print(f"{mode:<12}{statistics.median(samples):10.2f}{p95:10.2f}{statistics.mean(samples):10.2f}")
+        for name, supervisor in (("task_db", agent.task_db_supervisor),
+                                 ("notifications", agent.notification_supervisor)):
+            print(f"\n{name}: peak {supervisor.peak_in_flight} concurrent calls "
+                  f"(limit {supervisor.max_concurrency})", end="")
+        print()
+    finally:
+        await agent.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--adds", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ["TASK_DB_DATA_DIR"] = data_dir
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Sharded Task DB Benchmark
+Measures tool-call throughput of the Task Database pool as shards are added.
+
+Seeds --namespaces namespaces with --tasks tasks each, then keeps
+--concurrency search_tasks/add_task calls in flight, spread over the
+namespaces, and reports calls per second for each shard count. A single
+server is bound to one core; with enough cores throughput should grow with
+the number of shards.
+
+Usage:
+    python benchmarks/bench_shards.py [--shards 1 2 4] [--namespaces 32] [--tasks 2000] [--calls 4000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from task_db_pool import ShardedTaskDB  # noqa: E402
+
+WORDS = "buy call book pay send fix clean plan email review order renew pick water".split()
+THINGS = "milk dentist invoice report car garden tickets plants passport slides".split()
+
+
+def task_text(rng):
+    return f"{rng.choice(WORDS)} {rng.choice(THINGS)} {rng.randrange(10000)}"
+
+
+async def run(shards, args):
+    rng = random.Random(7)
+    namespaces = [f"user-{index}" for index in range(args.namespaces)]
+    with tempfile.TemporaryDirectory() as data_dir:
+        pool = ShardedTaskDB(shards, data_dir, timeout=60.0,
+                             command=[sys.executable, os.path.join(ROOT, "task_db_server.py")])
+        await pool.start()
+        await asyncio.gather(*(
+            pool.call_tool("add_tasks", {"tasks": [task_text(rng) for _ in range(args.tasks)]}, namespace=namespace)
+            for namespace in namespaces
+        ))
+
+        queue = [(rng.choice(namespaces), rng.random()) for _ in range(args.calls)]
+
+        async def worker():
+            while queue:
+                namespace, roll = queue.pop()
+                if roll < args.write_ratio:
+                    await pool.call_tool("add_task", {"task": task_text(rng)}, namespace=namespace)
+                else:
+                    await pool.call_tool("search_tasks", {"query": f"{rng.choice(WORDS)} {rng.choice(THINGS)}"},
+                                         namespace=namespace)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        total = await pool.total_count()
+        await pool.close()
+    print(f"{shards:>6} {args.calls / elapsed:>12.0f} {elapsed:>10.2f} {total:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--namespaces", type=int, default=32)
+    parser.add_argument("--tasks", type=int, default=2000, help="Tasks per namespace")
+    parser.add_argument("--calls", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.namespaces} namespaces x {args.tasks} tasks, "
+          f"{args.calls} calls, {args.concurrency} in flight\n")
+    print(f"{'shards':>6} {'calls/s':>12} {'seconds':>10} {'tasks':>10}")
+    for shards in args.shards:
+        asyncio.run(run(shards, args))
+
+
+if __name__ == "__main__":
+    main()
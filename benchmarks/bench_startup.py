@@ -0,0 +1,92 @@
+"""
+Cold Start Benchmark
+Measures what a fresh process pays before it can do useful work.
+
+Part 1 imports each entry module in a new interpreter with
+``python -X importtime`` and reports its cumulative import time plus the
+heaviest dependencies it pulled in.
+Part 2 restarts the Task Database Server repeatedly, once launching a new
+interpreter each time and once activating a preforked warm spare.
+
+Usage:
+    python benchmarks/bench_startup.py [--modules web_app mcp_task_manager task_db_server] [--restarts 5]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp_clients import StdioMCPClient  # noqa: E402
+
+
+def import_times(module):
+    """Return {module: cumulative µs} for one cold import of ``module``."""
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"))
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_imports(modules, top):
+    print("Cold import time per entry module (ms)\n")
+    for module in modules:
+        times = import_times(module)
+        if module not in times:
+            print(f"{module:<20} failed to import")
+            continue
+        heaviest = sorted(
+            ((name, us) for name, us in times.items() if "." not in name and name != module),
+            key=lambda item: item[1], reverse=True
+        )[:top]
+        details = ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest)
+        print(f"{module:<20} {times[module] / 1000:8.1f}   heaviest: {details}")
+
+
+async def bench_restarts(restarts):
+    print(f"\nTask DB restart until ready, {restarts} restarts (ms)\n")
+    with tempfile.TemporaryDirectory() as data_dir:
+        command = [sys.executable, os.path.join(ROOT, "task_db_server.py"), "--data-dir", data_dir]
+        for spare in (False, True):
+            client = StdioMCPClient(command, spare=spare)
+            await client.start()
+            samples = []
+            for _ in range(restarts):
+                # Give the spare time to warm up, as between real restarts
+                await asyncio.sleep(1.0)
+                await client.close(keep_spare=True)
+                started = time.perf_counter()
+                await client.start()
+                samples.append((time.perf_counter() - started) * 1000)
+            await client.close()
+            label = "warm spare" if spare else "new interpreter"
+            print(f"{label:<20} mean {sum(samples) / len(samples):7.1f}   min {min(samples):7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=["web_app", "mcp_task_manager", "task_db_server"])
+    parser.add_argument("--top", type=int, default=4, help="Heaviest dependencies to list per module")
+    parser.add_argument("--restarts", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_imports(args.modules, args.top)
+    asyncio.run(bench_restarts(args.restarts))
+
+
+if __name__ == "__main__":
+    main()
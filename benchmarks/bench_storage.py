@@ -0,0 +1,120 @@
+"""
+Storage Backend Benchmark
+Runs the same task workload against every Task Database storage engine:
+
+- list:   the original plain-list implementation (linear scans)
+- memory: indexed in-memory TaskStore
+- sqlite: SQLiteTaskStore (WAL, indexed queries, maintained counter)
+
+Usage:
+    python benchmarks/bench_storage.py --tasks 20000 --lookups 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_db_server import open_task_store  # noqa: E402
+
+
+class ListStore:
+    """The pre-index behaviour: a plain list with linear scans."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add(self, text):
+        self.tasks.append(text)
+
+    def match(self, text):
+        if text in self.tasks:
+            return text
+        needle = text.lower()
+        for task in self.tasks:
+            if needle in task.lower():
+                return task
+        return None
+
+    def remove(self, task):
+        self.tasks.remove(task)
+
+    def texts(self):
+        return list(self.tasks)
+
+    def close(self):
+        pass
+
+
+WORDS = ["buy", "call", "email", "review", "plan", "book", "fix", "write", "clean", "pay",
+         "groceries", "dentist", "report", "invoice", "flight", "garden", "car", "budget"]
+
+
+def make_tasks(count, seed=42):
+    rng = random.Random(seed)
+    return [f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{i} {rng.choice(WORDS)}" for i in range(count)]
+
+
+def run(name, store, tasks, lookups):
+    """Time add / partial match / remove / count / list on one store."""
+    rng = random.Random(7)
+    timings = {}
+
+    start = time.perf_counter()
+    for task in tasks:
+        store.add(task)
+    timings["add"] = time.perf_counter() - start
+
+    queries = [f"#{rng.randrange(len(tasks))} " for _ in range(lookups)]
+    start = time.perf_counter()
+    for query in queries:
+        store.match(query.upper())
+    timings["match"] = time.perf_counter() - start
+
+    victims = rng.sample(tasks, lookups)
+    start = time.perf_counter()
+    for victim in victims:
+        key = store.match(victim)
+        if key is not None:
+            store.remove(key)
+    timings["remove"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(lookups):
+        len(store)
+    timings["count"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.texts()
+    timings["list"] = time.perf_counter() - start
+
+    store.close()
+    row = "  ".join(f"{op}={seconds * 1000:9.1f}ms" for op, seconds in timings.items())
+    print(f"{name:<8} {row}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    print(f"Workload: {args.tasks} adds, {args.lookups} partial matches, "
+          f"{args.lookups} removes by text, {args.lookups} counts, 1 full list\n")
+
+    run("list", ListStore(), tasks, args.lookups)
+    run("memory", open_task_store("memory"), tasks, args.lookups)
+    with tempfile.TemporaryDirectory() as data_dir:
+        run("sqlite", open_task_store("sqlite", data_dir), tasks, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Tool Call Latency Benchmark
+Compares the two ways the agent has registered its LangChain tools:
+
+- wrapper: the old ``sync_*`` functions. LangChain runs them on an executor
+           thread, where each call builds a new event loop with asyncio.run()
+- native:  ``StructuredTool.from_function(coroutine=...)``. The coroutine runs
+           directly on the agent's event loop
+
+Each tool either does nothing (pure dispatch overhead) or calls
+``get_task_count`` on a real task_db_server.py through StdioMCPClient.
+
+Usage:
+    python benchmarks/bench_tool_calls.py [--iterations 500] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.tools import StructuredTool  # noqa: E402
+
+from mcp_clients import StdioMCPClient  # noqa: E402
+
+
+def legacy_wrapper(coroutine_function):
+    """The pre-async tool wrapper from setup_agent, verbatim in behaviour."""
+    def sync_tool() -> str:
+        try:
+            loop = asyncio.get_event_loop()
+            if loop.is_running():
+                with concurrent.futures.ThreadPoolExecutor() as executor:
+                    future = executor.submit(asyncio.run, coroutine_function())
+                    return future.result()
+            else:
+                return loop.run_until_complete(coroutine_function())
+        except RuntimeError:
+            return asyncio.run(coroutine_function())
+    return sync_tool
+
+
+def make_tools(coroutine_function):
+    return {
+        "wrapper": StructuredTool.from_function(
+            func=legacy_wrapper(coroutine_function), name="tool", description="bench"),
+        "native": StructuredTool.from_function(
+            coroutine=coroutine_function, name="tool", description="bench"),
+    }
+
+
+async def time_sequential(tool, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await tool.ainvoke({})
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def time_concurrent(tool, iterations, concurrency):
+    start = time.perf_counter()
+    for _ in range(iterations // concurrency):
+        await asyncio.gather(*(tool.ainvoke({}) for _ in range(concurrency)))
+    return (time.perf_counter() - start) / (iterations // concurrency * concurrency) * 1e6
+
+
+async def main_async(args):
+    client = StdioMCPClient([sys.executable, os.path.join(ROOT, "task_db_server.py")])
+    await client.start()
+
+    async def noop() -> str:
+        return "ok"
+
+    async def get_task_count() -> str:
+        response = await client.call_tool("get_task_count")
+        return str(response["result"]["structuredContent"]["result"])
+
+    print(f"{args.iterations} calls per row; concurrent rows run {args.concurrency} at a time (µs)\n")
+    print(f"{'body':<16}{'style':<10}{'p50':>10}{'p95':>10}{'concurrent/call':>18}")
+    try:
+        for body_name, body in (("no-op", noop), ("get_task_count", get_task_count)):
+            for style, tool in make_tools(body).items():
+                await tool.ainvoke({})  # warm up
+                samples = await time_sequential(tool, args.iterations)
+                per_call = await time_concurrent(tool, args.iterations, args.concurrency)
+                p95 = statistics.quantiles(samples, n=20)[-1]
+                print(f"{body_name:<16}{style:<10}{statistics.median(samples):10.1f}{p95:10.1f}{per_call:18.1f}")
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
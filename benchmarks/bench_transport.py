@@ -0,0 +1,127 @@
+"""
+STDIO Transport Benchmark
+Compares the wire formats the Task Database Server can negotiate:
+
+- ndjson/json                   the original newline-delimited stdlib JSON
+- ndjson/orjson                 same framing, faster codec
+- length-prefixed/orjson        binary frames, no newline scanning
+- length-prefixed/msgpack       binary frames, compact binary codec
+
+Part 1 times encode+frame and unframe+decode in-process for typical messages.
+Part 2 (--e2e) spawns task_db_server.py and times real round trips per mode.
+
+Usage:
+    python benchmarks/bench_transport.py [--iterations 2000] [--e2e]
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp_transport import (  # noqa: E402
+    CODECS, FRAMING_LENGTH_PREFIXED, FRAMING_NDJSON, JsonCodec,
+    encode_frame, get_codec, negotiate_request, read_frame_sync
+)
+
+MODES = [
+    (FRAMING_NDJSON, "json"),
+    (FRAMING_NDJSON, "orjson"),
+    (FRAMING_LENGTH_PREFIXED, "orjson"),
+    (FRAMING_LENGTH_PREFIXED, "msgpack"),
+]
+
+
+def sample_messages():
+    """A small tool call, a bulk-add request and a page of list_tasks results."""
+    small = {"jsonrpc": "2.0", "id": 42, "method": "tools/call",
+             "params": {"name": "get_task_count", "arguments": {}}}
+    bulk = {"jsonrpc": "2.0", "id": 43, "method": "tools/call",
+            "params": {"name": "add_tasks",
+                       "arguments": {"tasks": [f"task number {i} - buy milk" for i in range(1000)]}}}
+    page = {"jsonrpc": "2.0", "id": 44, "result": {
+        "tasks": [{"id": i, "task": f"task number {i} - call the dentist"} for i in range(1000)],
+        "next_cursor": "eyJhZnRlciI6IDEwMDB9", "total": 250000}}
+    return {"small": small, "bulk-add": bulk, "page": page}
+
+
+def bench_codecs(iterations):
+    print(f"In-process encode+frame / unframe+decode, {iterations} iterations (µs per message)\n")
+    print(f"{'mode':<28}" + "".join(f"{name:>22}" for name in sample_messages()))
+    for framing, codec_name in MODES:
+        if codec_name not in CODECS:
+            print(f"{framing + '/' + codec_name:<28}  (not installed)")
+            continue
+        codec = get_codec(codec_name)
+        cells = []
+        for message in sample_messages().values():
+            start = time.perf_counter()
+            for _ in range(iterations):
+                wire = encode_frame(codec.encode(message), framing)
+            encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                codec.decode(read_frame_sync(io.BytesIO(wire), framing))
+            decode_us = (time.perf_counter() - start) / iterations * 1e6
+            cells.append(f"{encode_us:7.1f}/{decode_us:7.1f} {len(wire) // 1024:4d}K")
+        print(f"{framing + '/' + codec_name:<28}" + "".join(f"{cell:>22}" for cell in cells))
+
+
+def bench_end_to_end(iterations):
+    print(f"\nEnd-to-end against task_db_server.py ({iterations} sequential round trips)\n")
+    for framing, codec_name in MODES:
+        if codec_name not in CODECS:
+            continue
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "task_db_server.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        process.stdin.write(encode_frame(JsonCodec.encode(
+            negotiate_request(0, [framing], [codec_name])), FRAMING_NDJSON))
+        process.stdin.flush()
+        mode = JsonCodec.decode(read_frame_sync(process.stdout, FRAMING_NDJSON))["result"]
+        codec = get_codec(mode["codec"])
+
+        def call(request_id, name, arguments):
+            request = {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                       "params": {"name": name, "arguments": arguments}}
+            process.stdin.write(encode_frame(codec.encode(request), mode["framing"]))
+            process.stdin.flush()
+            return codec.decode(read_frame_sync(process.stdout, mode["framing"]))
+
+        call(1, "add_tasks", {"tasks": [f"task number {i}" for i in range(1000)]})
+        start = time.perf_counter()
+        for i in range(iterations):
+            call(i + 2, "get_task_count", {})
+        small_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for i in range(iterations // 10):
+            call(i + 2, "get_tasks_by_ids", {"ids": list(range(1, 1001))})
+        bulk_us = (time.perf_counter() - start) / (iterations // 10) * 1e6
+
+        process.stdin.close()
+        process.wait()
+        label = f"{mode['framing']}/{mode['codec']}"
+        print(f"{label:<28} get_task_count {small_us:8.1f} µs   get_tasks_by_ids(1000) {bulk_us:9.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--e2e", action="store_true", help="Also time round trips against a real server")
+    args = parser.parse_args()
+
+    bench_codecs(args.iterations)
+    if args.e2e:
+        bench_end_to_end(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
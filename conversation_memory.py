@@ -0,0 +1,187 @@
+"""
+Conversation Memory
+Per-session conversation state with a flat, token-bounded prompt.
+
+Each session keeps its last few turns verbatim plus a compact summary of the
+turns before them, so a follow-up like "remove that one" can be resolved
+from the conversation instead of another list_tasks call. Before each
+``ainvoke`` the prompt is fitted to a token budget:
+
+- turns beyond ``max_turns`` are folded into the summary
+- if the prompt is still over ``max_tokens``, the oldest remaining turns are
+  folded too, and then the oldest summary lines are dropped
+- each stored message is capped, so one long task listing cannot fill the
+  window on its own
+
+The summary is built locally (one line per folded turn, keeping task IDs and
+names) rather than by another model call, so trimming adds no latency or
+tokens. Token counts are estimated at about four characters per token.
+Sessions are evicted least-recently-used and after ``session_ttl`` idle
+seconds.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Rough characters per token for English text and task listings
+CHARS_PER_TOKEN = 4
+# Per-message overhead (role, separators) in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text`` plus its message overhead."""
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def _clip(text: str, tokens: int) -> str:
+    """Cut ``text`` to about ``tokens`` tokens, marking the cut."""
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+class Session:
+    """One conversation: recent turns verbatim and a summary of older ones."""
+
+    def __init__(self, max_turns: int):
+        # (user message, assistant answer) pairs, oldest first
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.max_turns = max_turns
+        self.summary_lines: Deque[str] = deque()
+        self.summarized_turns = 0
+        self.last_used = time.monotonic()
+
+    def fold_oldest(self, line_tokens: int):
+        """Move the oldest turn into the summary as one line."""
+        user, answer = self.turns.popleft()
+        answer = " ".join(answer.split())
+        self.summary_lines.append(
+            f"- User: {_clip(user, line_tokens // 3)} -> Assistant: {_clip(answer, line_tokens)}"
+        )
+        self.summarized_turns += 1
+
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+
+class ConversationMemory:
+    """Bounded per-session histories, fitted to a token budget per prompt."""
+
+    def __init__(self, max_turns: int = 6, max_tokens: int = 1500,
+                 max_message_tokens: int = 300, summary_line_tokens: int = 60,
+                 max_sessions: int = 1000, session_ttl: float = 3600.0):
+        # Turns kept verbatim before older ones are summarized
+        self.max_turns = max_turns
+        # Budget for summary + history + the new message
+        self.max_tokens = max_tokens
+        # Cap on each stored message (e.g. a long task listing)
+        self.max_message_tokens = max_message_tokens
+        self.summary_line_tokens = summary_line_tokens
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.prompt_tokens_total = 0
+        self.prompt_tokens_max = 0
+        self.dropped_summary_lines = 0
+
+    def _session(self, session_id: str) -> Session:
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None or now - session.last_used > self.session_ttl:
+            session = self._sessions[session_id] = Session(self.max_turns)
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def prompt(self, session_id: str, user_input: str,
+               system: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Messages for the next ``ainvoke``: summary, recent turns, new message.
+
+        Older turns are summarized until the estimate fits ``max_tokens``.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            while len(session.turns) > self.max_turns:
+                session.fold_oldest(self.summary_line_tokens)
+            user_input = _clip(user_input, self.max_message_tokens)
+            while True:
+                messages = self._render(session, user_input, system)
+                size = sum(estimate_tokens(message["content"]) for message in messages)
+                if size <= self.max_tokens:
+                    break
+                if session.turns:
+                    session.fold_oldest(self.summary_line_tokens)
+                elif session.summary_lines:
+                    session.summary_lines.popleft()
+                    self.dropped_summary_lines += 1
+                else:
+                    # Only the new message is left; send it as is
+                    break
+            self.prompts += 1
+            self.prompt_tokens_total += size
+            self.prompt_tokens_max = max(self.prompt_tokens_max, size)
+            return messages
+
+    @staticmethod
+    def _render(session: Session, user_input: str, system: Optional[str]) -> List[Dict[str, str]]:
+        messages = []
+        context = []
+        if system:
+            context.append(system)
+        if session.summary_lines:
+            context.append("Earlier in this conversation:\n" + session.summary())
+        if context:
+            messages.append({"role": "system", "content": "\n\n".join(context)})
+        for user, answer in session.turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": user_input})
+        return messages
+
+    def record(self, session_id: str, user_input: str, answer: str):
+        """Store a finished turn (both sides capped to ``max_message_tokens``)."""
+        with self._lock:
+            session = self._session(session_id)
+            session.turns.append((
+                _clip(user_input, self.max_message_tokens),
+                _clip(answer, self.max_message_tokens),
+            ))
+
+    def fingerprint(self, session_id: Optional[str]) -> str:
+        """Digest of a session's current context ("" if there is none), for cache keys."""
+        if session_id is None:
+            return ""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not (session.turns or session.summary_lines):
+                return ""
+            digest = hashlib.md5(session.summary().encode("utf-8"))
+            for user, answer in session.turns:
+                digest.update(b"\0" + user.encode("utf-8") + b"\0" + answer.encode("utf-8"))
+            return digest.hexdigest()
+
+    def forget(self, session_id: str):
+        """Drop a session's history (e.g. the user started a new conversation)."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Session count and prompt-size figures for health reporting."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "prompts": self.prompts,
+                "prompt_tokens_mean": round(self.prompt_tokens_total / self.prompts, 1) if self.prompts else None,
+                "prompt_tokens_max": self.prompt_tokens_max,
+                "max_tokens": self.max_tokens,
+                "summarized_turns": sum(session.summarized_turns for session in self._sessions.values()),
+                "dropped_summary_lines": self.dropped_summary_lines,
+            }
@@ -0,0 +1,99 @@
+"""
+Request Deadlines
+One absolute deadline per user request, carried everywhere the request goes.
+
+The web app sets a deadline when a request arrives; ``deadline_scope`` stores
+it in a context variable, so every coroutine and task started for the request
+sees it without passing it by hand. Transports read it to:
+- shorten their own timeouts to the time that is left
+- send it to the servers (``params._meta.deadline`` over STDIO, the
+  ``X-Request-Deadline`` header over HTTP), which drop requests that arrive
+  or wait in their queue past it
+
+Deadlines are wall-clock epoch seconds so they mean the same thing in every
+process.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline"
+# JSON-RPC error code servers use for requests that arrived after their deadline
+DEADLINE_EXCEEDED_CODE = -32001
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's deadline passed; the work was abandoned."""
+
+
+def get_deadline() -> Optional[float]:
+    """The current request's deadline (epoch seconds), or None."""
+    return _deadline.get()
+
+
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left before ``deadline`` (default: the current one); None if unbounded."""
+    deadline = get_deadline() if deadline is None else deadline
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired(deadline: Optional[float]) -> bool:
+    """True if ``deadline`` is set and has passed."""
+    return deadline is not None and time.time() >= deadline
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """Run the block under ``deadline``, or under the current one if that is sooner."""
+    current = get_deadline()
+    if deadline is None or (current is not None and current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def clamp_timeout(timeout: Optional[float], deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Shorten ``timeout`` to the time left before the deadline.
+
+    Raises DeadlineExceeded if no time is left at all.
+    """
+    left = remaining(deadline)
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+def request_deadline(params: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Read ``_meta.deadline`` from JSON-RPC params (servers call this)."""
+    if not isinstance(params, dict):
+        return None
+    meta = params.get("_meta")
+    if not isinstance(meta, dict):
+        return None
+    deadline = meta.get("deadline")
+    return float(deadline) if isinstance(deadline, (int, float)) else None
+
+
+def header_deadline(value: Optional[str]) -> Optional[float]:
+    """Read an ``X-Request-Deadline`` header (HTTP servers call this); None if absent or malformed."""
+    if not value:
+        return None
+    try:
+        deadline = float(value)
+    except ValueError:
+        return None
+    return deadline if math.isfinite(deadline) else None
@@ -0,0 +1,48 @@
+"""
+Import Timing
+Deferred imports for heavy frameworks, with a per-module timing report.
+
+The web app and the agent import LangChain, LangGraph, the OpenAI client and
+aiohttp only when they first need them, through ``lazy_import``. Each first
+import is timed, so ``import_report()`` (shown under ``import_ms`` in
+``/api/health``) says where cold-start time went.
+"""
+
+import importlib
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict
+
+# Process start of this module, used as the reference for boot timings
+PROCESS_T0 = time.perf_counter()
+
+# module name -> milliseconds its first lazy import took
+IMPORT_TIMINGS: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import ``name`` on first use and record how long that took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = round((time.perf_counter() - started) * 1000, 1)
+    with _lock:
+        IMPORT_TIMINGS.setdefault(name, elapsed)
+    return module
+
+
+def record(name: str, started: float):
+    """Record a timing measured by the caller (e.g. a module's own body)."""
+    with _lock:
+        IMPORT_TIMINGS[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def import_report() -> Dict[str, float]:
+    """Recorded timings in milliseconds, slowest first."""
+    with _lock:
+        return dict(sorted(IMPORT_TIMINGS.items(), key=lambda item: item[1], reverse=True))
@@ -0,0 +1,134 @@
+"""
+Intent Router
+Rule-based dispatch of unambiguous requests straight to one MCP tool.
+
+Listing tasks, counting them or showing the notification history needs one
+fixed tool call, so sending it through the LLM agent only adds seconds and
+tokens. The router matches the whole (normalized) message against a few
+strict patterns. A match names the tool and its arguments; the agent calls
+that tool directly and returns its locally formatted result. Anything that
+does not match exactly falls through to the LLM agent as before.
+
+Only read-only tools are routed: a misread request can at worst show the
+wrong listing, never change the task list.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+# Web quick-action buttons: action -> (tool, arguments)
+QUICK_ACTIONS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "list_tasks": ("list_tasks", {}),
+    "task_count": ("get_task_count", {}),
+    "notification_history": ("get_notification_history", {}),
+}
+
+_SHOW = r"(?:(?:can you |could you )?(?:show|list|display|give|get|view|see)(?: me)?(?: all)?(?: of)? )?"
+
+# (pattern over the normalized message, tool); named groups become arguments
+RULES: List[Tuple[Pattern, str]] = [
+    (re.compile(_SHOW + r"(?:my |the )?(?:current |open )?(?:tasks|task list|todo list|to do list)"
+                r"(?: (?:containing|mentioning|about|with) (?P<contains>.+))?"), "list_tasks"),
+    (re.compile(r"what (?:are|is) (?:on )?my (?:tasks|task list|todo list)"), "list_tasks"),
+    (re.compile(r"how many tasks(?: do i have| are there| have i got)?(?: left)?"
+                r"|(?:count|number of) (?:my |the )?tasks|task count"), "get_task_count"),
+    (re.compile(_SHOW + r"(?:my |the )?(?:notification|reminder) history"
+                r"|(?:what|which) (?:notifications|reminders) (?:have been|were) sent"),
+     "get_notification_history"),
+    (re.compile(r"(?:find|search(?: for)?) (?:my )?tasks? (?:about|for|mentioning|matching) (?P<query>.+)"),
+     "search_tasks"),
+]
+
+# Several requests in one message ("list my tasks and remind me ...") go to the agent
+_COMPOUND = re.compile(r"\b(?:and|then|also)\b|[,;]")
+# Requests that may change tasks or send notifications; their answers are never cached
+_MUTATING = re.compile(
+    r"\b(?:add|create|new|remove|delete|drop|complete|finish|mark|done|send|remind|schedule|"
+    r"notify|update|change|edit|rename|clear|set|move|cancel)\b"
+)
+# References to earlier turns ("remove that one", "what about the second?"): the
+# answer depends on the conversation, not just the message
+_FOLLOW_UP = re.compile(
+    r"\b(?:it|its|that|those|them|this one|these|they|the (?:first|second|third|last|other|same|previous) ?(?:one|ones)?|"
+    r"above|again|previous|earlier|before|instead|else|more|next|another|same)\b"
+    r"|^(?:and|but|also|what about|how about|then)\b"
+)
+_POLITE = re.compile(r"^(?:please |hey |hi )+|(?: please| thanks| thank you)+$")
+_TRAILING = re.compile(r"[\s.!?]+$")
+
+
+def normalize(message: str) -> str:
+    """Lowercase, collapse whitespace and drop politeness and end punctuation."""
+    text = " ".join(message.lower().split())
+    text = _TRAILING.sub("", text)
+    return _POLITE.sub("", text).strip()
+
+
+def is_mutating(message: str) -> bool:
+    """True if the message may ask for a change (conservatively: any change verb)."""
+    return bool(_MUTATING.search(normalize(message)))
+
+
+def is_follow_up(message: str) -> bool:
+    """True if the message may refer to earlier turns (conservatively: any back-reference)."""
+    return bool(_FOLLOW_UP.search(normalize(message)))
+
+
+class IntentRouter:
+    """Matches messages to read-only tools and counts how often it could."""
+
+    def __init__(self, rules: Optional[List[Tuple[Pattern, str]]] = None):
+        self.rules = RULES if rules is None else rules
+        self.routed = 0
+        self.fallthrough = 0
+        self.quick_actions = 0
+        self.by_tool: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def match(self, message: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(tool, arguments) for a message one rule fully matches, else None."""
+        text = normalize(message)
+        if _COMPOUND.search(text):
+            return None
+        for pattern, tool in self.rules:
+            found = pattern.fullmatch(text)
+            if found:
+                return tool, {name: value for name, value in found.groupdict().items() if value}
+        return None
+
+    def route(self, message: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Like ``match``, recording a fast-path hit or a fall-through to the agent."""
+        routed = self.match(message)
+        with self._lock:
+            if routed is None:
+                self.fallthrough += 1
+            else:
+                self.routed += 1
+                self.by_tool[routed[0]] += 1
+        return routed
+
+    def quick_action(self, action: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(tool, arguments) for a quick-action button, or None if unknown."""
+        routed = QUICK_ACTIONS.get(action)
+        if routed is not None:
+            with self._lock:
+                self.quick_actions += 1
+                self.by_tool[routed[0]] += 1
+        return routed
+
+    def stats(self) -> Dict[str, Any]:
+        """Fast-path counters and hit rate over every routed request."""
+        with self._lock:
+            fast = self.routed + self.quick_actions
+            total = fast + self.fallthrough
+            return {
+                "requests": total,
+                "fast_path": fast,
+                "routed": self.routed,
+                "quick_actions": self.quick_actions,
+                "agent": self.fallthrough,
+                "hit_rate": round(fast / total, 3) if total else None,
+                "by_tool": dict(self.by_tool),
+            }
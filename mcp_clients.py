@@ -0,0 +1,445 @@
+"""
+MCP Client Transports
+Clients the agent uses to talk to its MCP servers.
+
+StdioMCPClient drives a JSON-RPC server running as an asyncio subprocess
+(the Task Database Server). start() returns once the server has answered
+the MCP ``initialize`` handshake, i.e. as soon as it is ready rather than
+after a fixed sleep. With ``spare=True`` it keeps a preforked standby
+process (interpreter started, modules imported, storage not yet opened) and
+a restart activates that warm process instead of launching a new one. One
+background reader task owns the server's STDOUT and routes every reply to
+the future waiting on its request ID, so:
+- many calls can be in flight over one pipe at once
+- no thread is created per call
+- a call that times out is simply forgotten; its late reply is dropped
+  instead of being read by the next caller
+
+Both clients honour the current request deadline (see deadlines.py): call
+timeouts are cut to the time that is left, the deadline travels with the
+call so servers can drop work nobody waits for, and a STDIO call that is
+cancelled or times out tells the server with ``notifications/cancelled``.
+
+HttpMCPClient talks to an HTTP MCP server (the Notification Server) through
+one long-lived aiohttp session whose connection pool keeps warm keep-alive
+connections, instead of a new session and TCP handshake per call. Its
+readiness probe retries ``/health`` with exponential backoff starting at a
+few milliseconds. aiohttp is imported on first use.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from deadlines import DEADLINE_HEADER, DeadlineExceeded, clamp_timeout, get_deadline
+from import_timing import lazy_import
+from mcp_transport import (
+    ACTIVATE_METHOD, CANCELLED_NOTIFICATION, FRAMING_NDJSON, INITIALIZE_METHOD, INITIALIZED_NOTIFICATION,
+    MCP_PROTOCOL_VERSION, JsonCodec, TransportError, encode_frame, get_codec,
+    negotiate_request, read_frame
+)
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# Largest line the subprocess StreamReader will buffer in ndjson mode
+STREAM_LIMIT = 2 ** 24
+CLIENT_INFO = {"name": "mcp-task-manager", "version": "1.0"}
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+class StdioMCPClient:
+    """Multiplexed JSON-RPC client for an MCP server spoken to over STDIO."""
+
+    def __init__(self, command: List[str], timeout: float = 5.0, negotiate: bool = True,
+                 start_timeout: float = 30.0, spare: bool = False):
+        self.command = command
+        # Default per-call timeout in seconds
+        self.timeout = timeout
+        self.negotiate = negotiate
+        # Seconds the server may take to load its storage and answer initialize
+        self.start_timeout = start_timeout
+        # Result of the initialize handshake (serverInfo, taskCount, ...)
+        self.server_info: Dict[str, Any] = {}
+        # Milliseconds spent in each start() phase
+        self.timings: Dict[str, float] = {}
+        # Keep a preforked standby server for the next start()
+        self.spare = spare
+        self._spare: Optional[asyncio.subprocess.Process] = None
+        self._prefork: Optional[asyncio.Task] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.framing = FRAMING_NDJSON
+        self.codec = JsonCodec
+        self._ids = itertools.count(1)
+        # request id -> future resolved by the reader task
+        self._pending: Dict[Any, asyncio.Future] = {}
+        # request id -> callback for notifications tagged with that requestId
+        self._listeners: Dict[Any, Callable[[Dict[str, Any]], None]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_running(self) -> bool:
+        """True while the process is alive and its replies are being read."""
+        return (
+            self.process is not None
+            and self.process.returncode is None
+            and self._reader is not None
+            and not self._reader.done()
+        )
+
+    async def start(self):
+        """
+        Spawn the server, negotiate the wire format and wait until it is ready.
+
+        Returns after the ``initialize`` handshake; raises ConnectionError if
+        the server exits or does not answer within ``start_timeout``.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._write_lock = asyncio.Lock()
+        self.framing, self.codec = FRAMING_NDJSON, JsonCodec
+        started = time.perf_counter()
+        spare = await self._take_spare()
+        if spare is not None:
+            # Already past interpreter start-up and imports: tell it to open storage
+            self.process = spare
+            self.process.stdin.write(encode_frame(
+                JsonCodec.encode({"jsonrpc": "2.0", "method": ACTIVATE_METHOD}), FRAMING_NDJSON
+            ))
+            await self.process.stdin.drain()
+            self.timings = {"activate_spare_ms": _elapsed_ms(started)}
+        else:
+            self.process = await self._spawn()
+            self.timings = {"spawn_ms": _elapsed_ms(started)}
+        if self.negotiate:
+            phase = time.perf_counter()
+            await self._negotiate()
+            self.timings["negotiate_ms"] = _elapsed_ms(phase)
+        self._reader = asyncio.create_task(self._read_loop())
+        phase = time.perf_counter()
+        await self._initialize()
+        self.timings["initialize_ms"] = _elapsed_ms(phase)
+        self.timings["total_ms"] = _elapsed_ms(started)
+        if self.spare:
+            self._prefork = asyncio.create_task(self._prefork_spare())
+
+    async def _spawn(self, *extra_args: str) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            *self.command, *extra_args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT
+        )
+
+    async def _prefork_spare(self):
+        """Launch the standby process that the next start() will activate."""
+        if self._spare is None or self._spare.returncode is not None:
+            try:
+                self._spare = await self._spawn("--standby")
+            except OSError as e:
+                print(f"⚠️ Could not prefork a spare MCP server: {e}")
+
+    async def _take_spare(self) -> Optional[asyncio.subprocess.Process]:
+        """Hand over the standby process if one is alive (waiting for a prefork in progress)."""
+        if self._prefork is not None:
+            await asyncio.gather(self._prefork, return_exceptions=True)
+            self._prefork = None
+        spare, self._spare = self._spare, None
+        if spare is not None and spare.returncode is None:
+            return spare
+        return None
+
+    async def _initialize(self):
+        """MCP handshake: the server answers once its storage is loaded."""
+        params = {"protocolVersion": MCP_PROTOCOL_VERSION, "clientInfo": CLIENT_INFO, "capabilities": {}}
+        try:
+            response = await self.request(INITIALIZE_METHOD, params, timeout=self.start_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"MCP server not ready after {self.start_timeout:g}s")
+        if "result" not in response:
+            raise ConnectionError(f"MCP server refused initialize: {response.get('error')}")
+        self.server_info = response["result"]
+        await self.notify(INITIALIZED_NOTIFICATION)
+
+    async def _negotiate(self):
+        """
+        Upgrade to the fastest wire format both sides support.
+
+        Runs before the reader task starts, so the reply is read directly. On
+        any failure the connection stays in newline-delimited JSON.
+        """
+        request = negotiate_request(next(self._ids))
+        try:
+            self.process.stdin.write(encode_frame(JsonCodec.encode(request), FRAMING_NDJSON))
+            await self.process.stdin.drain()
+            payload = await asyncio.wait_for(read_frame(self.process.stdout, FRAMING_NDJSON), self.timeout)
+            if payload is None:
+                raise TransportError("server closed STDOUT")
+            mode = JsonCodec.decode(payload)["result"]
+            self.codec = get_codec(mode["codec"])
+            self.framing = mode["framing"]
+        except Exception as e:
+            print(f"⚠️ Transport negotiation failed, using newline-delimited JSON: {e}")
+
+    async def _read_loop(self):
+        """Route every message from the server until its STDOUT closes."""
+        error: Exception = ConnectionError("MCP server closed its output")
+        try:
+            while True:
+                payload = await read_frame(self.process.stdout, self.framing)
+                if payload is None:
+                    break
+                try:
+                    message = self.codec.decode(payload)
+                except Exception:
+                    continue
+                if isinstance(message, list):
+                    # Batch reply: resolve each member separately
+                    for member in message:
+                        self._route(member)
+                else:
+                    self._route(message)
+        except (TransportError, asyncio.IncompleteReadError, ConnectionError) as e:
+            error = ConnectionError(f"MCP server stream broken: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            self._listeners.clear()
+
+    def _route(self, message: Any):
+        if not isinstance(message, dict):
+            return
+        if "method" in message:
+            params = message.get("params") or {}
+            listener = self._listeners.get(params.get("requestId"))
+            if listener is not None:
+                listener(params)
+            return
+        future = self._pending.pop(message.get("id"), None)
+        if future is not None and not future.done():
+            future.set_result(message)
+        # Otherwise a reply to a call that already timed out: drop it
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None,
+                      on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Send one JSON-RPC request and wait for its response message.
+
+        Raises asyncio.TimeoutError after ``timeout`` seconds (default: the
+        client's), DeadlineExceeded once ``deadline`` (default: the current
+        request's) has passed, and ConnectionError if the server goes away.
+        """
+        deadline = get_deadline() if deadline is None else deadline
+        running = asyncio.get_running_loop()
+        if self._loop is not None and running is not self._loop:
+            # Called from another event loop (e.g. code running asyncio.run on a
+            # worker thread): hand the call to the loop that owns the pipes
+            future = asyncio.run_coroutine_threadsafe(
+                self.request(method, params, timeout, on_notification, deadline), self._loop
+            )
+            return await asyncio.wrap_future(future)
+        if not self.is_running:
+            raise ConnectionError("MCP server is not running")
+
+        call_timeout = self.timeout if timeout is None else timeout
+        effective = clamp_timeout(call_timeout, deadline)
+        params = dict(params or {})
+        if deadline is not None:
+            params["_meta"] = dict(params.get("_meta") or {}, deadline=deadline)
+
+        request_id = next(self._ids)
+        future = running.create_future()
+        self._pending[request_id] = future
+        if on_notification is not None:
+            self._listeners[request_id] = on_notification
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+        try:
+            async with self._write_lock:
+                self.process.stdin.write(encode_frame(self.codec.encode(message), self.framing))
+                await self.process.stdin.drain()
+            return await asyncio.wait_for(future, effective)
+        except asyncio.TimeoutError:
+            self._cancel_on_server(request_id, "timeout")
+            if effective < call_timeout:
+                raise DeadlineExceeded(f"{method} abandoned at the request deadline") from None
+            raise
+        except asyncio.CancelledError:
+            self._cancel_on_server(request_id, "cancelled")
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            self._listeners.pop(request_id, None)
+
+    def _cancel_on_server(self, request_id: int, reason: str):
+        """Best-effort ``notifications/cancelled`` so the server can skip queued work."""
+        if not self.is_running:
+            return
+        message = {"jsonrpc": "2.0", "method": CANCELLED_NOTIFICATION,
+                   "params": {"requestId": request_id, "reason": reason}}
+        try:
+            # One buffered write, so it cannot interleave with a frame being sent
+            self.process.stdin.write(encode_frame(self.codec.encode(message), self.framing))
+        except (ConnectionError, OSError, RuntimeError):
+            pass
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Send a JSON-RPC notification (no id, no reply)."""
+        message = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+        async with self._write_lock:
+            self.process.stdin.write(encode_frame(self.codec.encode(message), self.framing))
+            await self.process.stdin.drain()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None,
+                        on_notification: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Invoke an MCP tool (``tools/call``) and return the response message."""
+        return await self.request(
+            "tools/call", {"name": name, "arguments": arguments or {}}, timeout, on_notification
+        )
+
+    async def close(self, timeout: float = 2.0, keep_spare: bool = False):
+        """
+        Close STDIN so the server exits cleanly; terminate it if it does not.
+
+        With ``keep_spare`` the standby process stays up for the next start().
+        """
+        if not keep_spare:
+            spare = await self._take_spare()
+            if spare is not None:
+                # A standby exits as soon as its STDIN closes
+                spare.stdin.close()
+                await spare.wait()
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if process.returncode is None:
+            try:
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout)
+            except (asyncio.TimeoutError, ConnectionError, OSError):
+                try:
+                    process.terminate()
+                    await asyncio.wait_for(process.wait(), timeout)
+                except (asyncio.TimeoutError, ProcessLookupError):
+                    process.kill()
+                    await process.wait()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+
+
+class HttpMCPClient:
+    """Connection-pooled HTTP client for an MCP server's ``/call/<tool>`` API."""
+
+    def __init__(self, base_url: str, pool_size: int = 10, keepalive_timeout: float = 30.0,
+                 timeout: float = 10.0, connect_timeout: float = 2.0):
+        self.base_url = base_url.rstrip("/")
+        # Maximum simultaneous connections (and so concurrent requests) to the server
+        self.pool_size = pool_size
+        # Seconds an idle connection is kept open for reuse
+        self.keepalive_timeout = keepalive_timeout
+        # Default per-request timeout in seconds
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Create the pooled session on first use (it belongs to the running loop)."""
+        aiohttp = lazy_import("aiohttp")
+        if self._session is None or self._session.closed:
+            self._loop = asyncio.get_running_loop()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout)
+            )
+        return self._session
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None,
+                      deadline: Optional[float] = None) -> Tuple[int, Any]:
+        """
+        Send one request over a pooled connection.
+
+        Returns (HTTP status, decoded JSON body or raw text). Raises
+        asyncio.TimeoutError or aiohttp.ClientError on transport failures,
+        and DeadlineExceeded if ``deadline`` (default: the current
+        request's) has already passed.
+        """
+        deadline = get_deadline() if deadline is None else deadline
+        running = asyncio.get_running_loop()
+        if self._loop is not None and running is not self._loop and not self._loop.is_closed():
+            # The session is bound to the loop that created it
+            future = asyncio.run_coroutine_threadsafe(
+                self.request(method, path, payload, timeout, deadline), self._loop
+            )
+            return await asyncio.wrap_future(future)
+
+        session = self._get_session()
+        aiohttp = lazy_import("aiohttp")
+        request_timeout = aiohttp.ClientTimeout(
+            total=clamp_timeout(self.timeout if timeout is None else timeout, deadline),
+            sock_connect=self.connect_timeout
+        )
+        headers = {DEADLINE_HEADER: repr(deadline)} if deadline is not None else None
+        async with session.request(method, f"{self.base_url}{path}", json=payload,
+                                   headers=headers, timeout=request_timeout) as response:
+            if response.content_type == "application/json":
+                return response.status, await response.json()
+            return response.status, await response.text()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """Invoke an MCP tool via ``POST /call/<name>``."""
+        return await self.request("POST", f"/call/{name}", arguments or {}, timeout)
+
+    async def is_healthy(self, timeout: float = 1.0) -> bool:
+        """Probe ``GET /health``; any failure counts as unhealthy."""
+        aiohttp = lazy_import("aiohttp")
+        try:
+            status, _ = await self.request("GET", "/health", timeout=timeout)
+            return status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return False
+
+    async def wait_until_ready(self, timeout: float = 10.0, initial_delay: float = 0.01,
+                               max_delay: float = 0.5) -> Optional[float]:
+        """
+        Probe ``/health`` until it answers, doubling the pause between tries.
+
+        Returns the milliseconds it took, or None if ``timeout`` passed first.
+        A server that binds its port within a few milliseconds is seen almost
+        at once instead of after a fixed one-second sleep.
+        """
+        started = time.perf_counter()
+        deadline = started + timeout
+        delay = initial_delay
+        while True:
+            remaining = deadline - time.perf_counter()
+            if await self.is_healthy(timeout=max(0.05, min(1.0, remaining))):
+                return _elapsed_ms(started)
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+    async def close(self):
+        """Close pooled connections. The client can be reused afterwards."""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
@@ -0,0 +1,251 @@
+"""
+MCP Server Supervisor
+Health tracking, circuit breaking and restarts for the agent's MCP servers.
+
+One ServerSupervisor watches one server. Every call to it goes through
+``call()``, which times it and counts failures:
+
+- closed     calls go through; after ``failure_threshold`` consecutive
+             failures (at once if the server is gone) the circuit opens
+- open       calls fail immediately with CircuitOpenError instead of each
+             waiting out its own timeout, while the server is restarted in
+             the background with jittered exponential backoff
+- half_open  a restart succeeded; the next call (or health probe) is a trial
+             that closes the circuit, or reopens it and backs off further
+
+``start_monitor()`` also probes the server periodically, so one that dies
+between calls is restarted before anyone needs it. A failed probe counts
+toward ``failure_threshold`` like a failed call; one slow probe never
+restarts a server (and, for the Notification Server, wipes its history) on
+its own.
+
+With ``max_concurrency`` set, at most that many calls run against the server
+at once. The agent runs one step's tool calls concurrently, so this keeps a
+burst from one step (or from many users) from flooding a single server.
+Calls wait for a slot in arrival order, for at most the time left before
+their request deadline.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from deadlines import DeadlineExceeded, remaining
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a server whose circuit is open."""
+
+
+class ServerSupervisor:
+    """Circuit breaker, restart loop and call statistics for one MCP server."""
+
+    def __init__(self, name: str,
+                 restart: Callable[[], Awaitable[None]],
+                 probe: Callable[[], Awaitable[bool]],
+                 failure_threshold: int = 3,
+                 base_delay: float = 0.1,
+                 max_delay: float = 30.0,
+                 monitor_interval: float = 5.0,
+                 fatal: Tuple[Type[BaseException], ...] = (ConnectionError,),
+                 latency_window: int = 512,
+                 max_concurrency: Optional[int] = None):
+        self.name = name
+        self._restart = restart
+        self._probe = probe
+        self.failure_threshold = failure_threshold
+        # Backoff before restart attempt n is jittered within base_delay * 2**n, capped
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.monitor_interval = monitor_interval
+        # Errors meaning the server is gone: open the circuit without waiting for the threshold
+        self.fatal = fatal
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        # Failed health probes since the last healthy one (part of consecutive_failures)
+        self.probe_failures = 0
+        # Restart attempts since the server last worked; drives the backoff
+        self.restart_attempts = 0
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.failed_restarts = 0
+        self.last_error: Optional[str] = None
+        self.last_restart_ms: Optional[float] = None
+        self._latencies: deque = deque(maxlen=latency_window)
+        # Calls allowed to run at once (None: unlimited); the semaphore is
+        # created on first use so it belongs to the running loop
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.queued = 0
+        self._trial_in_flight = False
+        self._restarting: Optional[asyncio.Task] = None
+        self._monitor: Optional[asyncio.Task] = None
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before restart ``attempt``: half fixed, half random ("equal jitter")."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    async def call(self, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run one call to the server through the breaker.
+
+        Raises CircuitOpenError right away while the circuit is open (or a
+        half-open trial is already running); otherwise re-raises whatever
+        the call raised after recording it. A call abandoned at its request
+        deadline says nothing about the server and is not counted.
+        """
+        if self.max_concurrency is None:
+            return await self._call(operation)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"no free {self.name} slot before the request deadline") from None
+        finally:
+            self.queued -= 1
+        try:
+            return await self._call(operation)
+        finally:
+            self._slots.release()
+
+    async def _call(self, operation: Callable[[], Awaitable[Any]]) -> Any:
+        if self.state == OPEN or (self.state == HALF_OPEN and self._trial_in_flight):
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} is unavailable: {self.last_error}")
+        trial = self.state == HALF_OPEN
+        self._trial_in_flight = trial
+        started = time.perf_counter()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            result = await operation()
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            fatal = isinstance(e, self.fatal) and not isinstance(e, asyncio.TimeoutError)
+            self._record_failure(e, fatal or trial)
+            raise
+        finally:
+            self.in_flight -= 1
+            if trial:
+                self._trial_in_flight = False
+            self.calls += 1
+            self._latencies.append((time.perf_counter() - started) * 1000)
+        self._record_success()
+        return result
+
+    def _record_success(self):
+        self.consecutive_failures = 0
+        self.probe_failures = 0
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.restart_attempts = 0
+
+    def _record_failure(self, error: BaseException, fatal: bool):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if fatal or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        """Reject calls and restart the server in the background (once)."""
+        self.state = OPEN
+        if self._restarting is None or self._restarting.done():
+            self._restarting = asyncio.create_task(self._restart_loop())
+
+    async def _restart_loop(self):
+        while True:
+            delay = self.backoff(self.restart_attempts)
+            self.restart_attempts += 1
+            print(f"🔁 Restarting {self.name} in {delay:.2f}s (attempt {self.restart_attempts})")
+            await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                await self._restart()
+            except Exception as e:
+                self.failed_restarts += 1
+                self.last_error = f"restart failed: {e}"
+                continue
+            self.restarts += 1
+            self.last_restart_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.consecutive_failures = 0
+            self.probe_failures = 0
+            self.state = HALF_OPEN
+            return
+
+    def start_monitor(self):
+        """Probe the server every ``monitor_interval`` seconds in the background."""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            if self.state == OPEN:
+                continue
+            try:
+                healthy = await self._probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                # A live process can still be wedged: only a half-open trial is
+                # settled by the probe; call failures keep counting
+                if self.state == HALF_OPEN:
+                    self._record_success()
+                self.consecutive_failures = max(0, self.consecutive_failures - self.probe_failures)
+                self.probe_failures = 0
+            else:
+                # Only a failed half-open trial reopens the circuit at once
+                self.probe_failures += 1
+                self._record_failure(ConnectionError("health probe failed"), fatal=self.state == HALF_OPEN)
+
+    async def stop(self):
+        """Cancel the monitor and any restart in progress."""
+        tasks = [task for task in (self._monitor, self._restarting) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._monitor = self._restarting = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state, restart counters and call latency (ms) for health reporting."""
+        latencies = sorted(self._latencies)
+        latency = None
+        if latencies:
+            latency = {
+                "p50": round(latencies[len(latencies) // 2], 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "max": round(latencies[-1], 2),
+                "mean": round(sum(latencies) / len(latencies), 2),
+            }
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "probe_failures": self.probe_failures,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "failed_restarts": self.failed_restarts,
+            "last_restart_ms": self.last_restart_ms,
+            "last_error": self.last_error,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "queued": self.queued,
+            "latency_ms": latency,
+        }
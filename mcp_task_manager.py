@@ -15,14 +15,19 @@ import asyncio
 import os
 import json
 import subprocess
-import aiohttp
-from typing import List, Dict, Any, Optional
-from langchain.tools import BaseTool
-from langchain_core.tools import StructuredTool
-from langgraph.prebuilt import create_react_agent
-from langchain_openai import ChatOpenAI
+import time
+from collections import deque
+from typing import List, Dict, Any, Callable, Optional, Union
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from agent_cache import ResponseCache, VersionedCache
+from conversation_memory import ConversationMemory
+from deadlines import DeadlineExceeded, deadline_scope, expired, get_deadline, remaining
+from import_timing import lazy_import
+from intent_router import IntentRouter, is_follow_up, is_mutating, normalize
+from tool_budget import OutputBudgets, format_counts, parse_budgets
+from mcp_clients import HttpMCPClient, StdioMCPClient
+from mcp_supervisor import CircuitOpenError, ServerSupervisor
+from task_db_pool import PROBE_TIMEOUT, STATE_FILE, ShardedTaskDB, current_namespace
 
 # Load environment variables
 load_dotenv()
@@ -44,13 +49,87 @@ class MCPTaskManagerAgent:
     
     def __init__(self):
         """Initialize the MCP-based task manager agent."""
-        self.model = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1
-        )
+        # The chat model is created in setup_agent, once LangChain is loaded
+        self.model = None
+        self.model_name = "gpt-4o-mini"
+        self.temperature = 0.1
         self.agent = None
-        self.task_db_process = None
+        # Multiplexed STDIO client for the Task Database Server (see mcp_clients.py),
+        # or a pool of sharded servers (see task_db_pool.py)
+        self.task_db: Optional[Union[StdioMCPClient, ShardedTaskDB]] = None
+        # Journal/snapshot directory so tasks survive task DB restarts
+        self.task_db_data_dir = os.getenv("TASK_DB_DATA_DIR", ".task_db")
+        # Worker processes; above 1, namespaces are spread over them by consistent hashing
+        self.task_db_shards = int(os.getenv("TASK_DB_SHARDS", "1"))
+        # Namespace (task owner) the agent's tasks live in when sharded. It is
+        # one shared, stable key: sharding must not change which tasks users
+        # see (callers with real user identities can use namespace_scope)
+        self.task_db_namespace = os.getenv("TASK_DB_NAMESPACE", "default")
+        # Seconds to wait for one Task DB reply
+        self.task_db_timeout = 5.0
+        # Last task count total_task_count got, and when (time.time()), for health reports
+        self.last_task_count: Optional[int] = None
+        self.last_task_count_at: Optional[float] = None
+        # Keep a preforked warm Task DB process so a restart skips interpreter start-up
+        self.task_db_spare = os.getenv("TASK_DB_SPARE", "1") != "0"
+        # Read-through cache for list/count results, invalidated by the server's storeVersion
+        self.task_db_cache = VersionedCache(max_entries=128)
+        # Final answers to read-only requests, keyed on both servers' state versions
+        # (RESPONSE_CACHE_TTL=0 turns it off)
+        self.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+        self.response_cache = ResponseCache(max_entries=256, ttl=self.response_cache_ttl)
+        # Per-session recent turns + summary, fitted to a token budget per prompt
+        self.memory = ConversationMemory(
+            max_turns=int(os.getenv("MEMORY_MAX_TURNS", "6")),
+            max_tokens=int(os.getenv("MEMORY_MAX_TOKENS", "1500"))
+        )
+        # Latest stateVersion the Notification Server reported (its history length)
+        self.notification_version: Optional[int] = None
         self.notification_server_url = "http://localhost:8000"
+        # One pooled keep-alive HTTP client for every notification call
+        self.notification_client = HttpMCPClient(
+            self.notification_server_url,
+            pool_size=int(os.getenv("NOTIFICATION_POOL_SIZE", "10")),
+            keepalive_timeout=30.0,
+            timeout=10.0
+        )
+        # Items and characters each tool may put into the model's context, so one
+        # result never carries the whole store (see tool_budget.py)
+        self.output_budgets = OutputBudgets(parse_budgets(os.getenv("TOOL_OUTPUT_BUDGETS", "")))
+        self.notification_process: Optional[subprocess.Popen] = None
+        # Seconds to wait for the Notification Server's /health to answer
+        self.notification_ready_timeout = 10.0
+        # Sends unambiguous read requests straight to their tool, skipping the LLM
+        self.intent_router = IntentRouter()
+        # Milliseconds from request to first streamed token, for the last streamed requests
+        self.first_token_ms: deque = deque(maxlen=256)
+        self.streamed_requests = 0
+        # Milliseconds spent in each startup phase (see start_mcp_servers)
+        self.startup_timings: Dict[str, float] = {}
+        # Circuit breakers and background restarts (see mcp_supervisor.py)
+        self.monitor_interval = float(os.getenv("MCP_MONITOR_INTERVAL", "5"))
+        # The tool calls of one agent step run concurrently; these cap how many
+        # of them (across all requests) each server handles at once. A sharded
+        # Task DB supervises each shard itself with the same settings, so one
+        # failing shard never opens the circuit for the others
+        self.task_db_concurrency = int(os.getenv("TASK_DB_CONCURRENCY", "16"))
+        self.task_db_supervisor = ServerSupervisor(
+            "Task Database Server",
+            restart=self._restart_task_db_server,
+            probe=self._probe_task_db,
+            monitor_interval=self.monitor_interval,
+            max_concurrency=self.task_db_concurrency
+        )
+        self.notification_supervisor = ServerSupervisor(
+            "Notification Server",
+            restart=self._restart_notification_server,
+            probe=self.notification_client.is_healthy,
+            monitor_interval=self.monitor_interval,
+            # Refused connections (OSError) mean the server is down
+            fatal=(OSError,),
+            # No more calls than pooled connections, so none waits inside aiohttp
+            max_concurrency=self.notification_client.pool_size
+        )
         
     async def start_mcp_servers(self):
         """
@@ -62,209 +141,437 @@ class MCPTaskManagerAgent:
         - Graceful startup and health checking
         """
         print("🚀 Starting MCP servers...")
+        started = time.perf_counter()
         
-        # Start Task Database Server (STDIO transport)
-        try:
-            self.task_db_process = subprocess.Popen(
-                ["python", "task_db_server.py"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=0  # Unbuffered for immediate communication
-            )
-            # Give the server a moment to start
-            await asyncio.sleep(0.5)
-            
-            # Test the connection
-            test_result = await self._call_task_db_server("get_task_count")
-            if "❌" not in test_result:
-                print("✅ Task Database Server started (STDIO transport)")
+        # Both servers boot at the same time; each phase waits on a readiness
+        # signal (initialize reply, /health answer) rather than a fixed sleep
+        task_db_ok, notification_ok = await asyncio.gather(
+            self._start_task_db_phase(),
+            self._start_notification_phase()
+        )
+        
+        self.startup_timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        phases = ", ".join(f"{name} {ms:g}ms" for name, ms in self.startup_timings.items())
+        print(f"⏱️ Startup: {phases}")
+        if task_db_ok and notification_ok:
+            if isinstance(self.task_db, ShardedTaskDB):
+                self.task_db.start_monitor()
             else:
-                print(f"⚠️ Task Database Server started but communication test failed: {test_result}")
-                # Continue anyway, might work later
+                self.task_db_supervisor.start_monitor()
+            self.notification_supervisor.start_monitor()
+        return task_db_ok and notification_ok
+    
+    async def _start_task_db_phase(self) -> bool:
+        """Start the Task Database Server (STDIO transport) and record its phase timings."""
+        try:
+            await self._start_task_db_server()
         except Exception as e:
             print(f"❌ Failed to start Task Database Server: {e}")
             return False
-        
-        # Start Notification Server (HTTP/SSE transport)
+        for phase, ms in self.task_db.timings.items():
+            self.startup_timings[f"task_db_{phase}"] = ms
+        count = self.task_db.server_info.get("taskCount", 0)
+        print(f"✅ Task Database Server ready (STDIO transport, {count} tasks)")
+        return True
+    
+    async def _start_notification_phase(self) -> bool:
+        """Start the Notification Server (HTTP/SSE transport) and wait for /health."""
+        started = time.perf_counter()
         try:
-            # Start notification server in background
-            subprocess.Popen(
-                ["python", "notification_server.py"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
+            if await self.notification_client.is_healthy(timeout=0.2):
+                # Already running (e.g. started by hand, or by an earlier agent)
+                print("✅ Notification Server already running (HTTP/SSE transport)")
+                return True
+            self._spawn_notification_server()
+            self.startup_timings["notification_spawn_ms"] = round((time.perf_counter() - started) * 1000, 1)
             
-            # Wait for HTTP server to be ready
-            await self._wait_for_http_server()
-            print("✅ Notification Server started (HTTP/SSE transport)")
+            ready_ms = await self._wait_for_http_server()
+            if ready_ms is None:
+                print(f"❌ Notification Server not ready after {self.notification_ready_timeout:g}s")
+                return False
+            self.startup_timings["notification_ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            print("✅ Notification Server ready (HTTP/SSE transport)")
+            return True
         except Exception as e:
             print(f"❌ Failed to start Notification Server: {e}")
             return False
-        
-        return True
     
-    async def _wait_for_http_server(self, max_retries=10):
-        """Wait for HTTP server to be ready."""
-        for i in range(max_retries):
+    async def _wait_for_http_server(self) -> Optional[float]:
+        """Wait for the HTTP server to answer /health (exponential backoff from 10ms)."""
+        return await self.notification_client.wait_until_ready(timeout=self.notification_ready_timeout)
+    
+    def _spawn_notification_server(self):
+        self.notification_process = subprocess.Popen(
+            ["python", "notification_server.py"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    
+    async def _restart_notification_server(self):
+        """Replace the Notification Server process (run by its supervisor, with backoff)."""
+        process = self.notification_process
+        if process is not None and process.poll() is None:
+            process.terminate()
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{self.notification_server_url}/health", timeout=1) as response:
-                        if response.status == 200:
-                            return True
-            except:
-                await asyncio.sleep(1)
-        return False
-    
-    async def _call_task_db_server(self, method: str, params: Dict = None) -> str:
+                await asyncio.get_running_loop().run_in_executor(None, process.wait, 2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await self.notification_client.close()
+        # The new process starts with an empty history and counts from zero again
+        self.notification_version = None
+        self.response_cache.clear()
+        self._spawn_notification_server()
+        if await self._wait_for_http_server() is None:
+            raise ConnectionError(f"not ready after {self.notification_ready_timeout:g}s")
+        print("✅ Notification Server restarted")
+    
+    async def _start_task_db_server(self):
+        """Spawn the Task DB Server (or its shards) as asyncio subprocesses and negotiate their wire format."""
+        if self.task_db is not None:
+            # Restart: the client (and its warm spare) is reused
+            pass
+        elif self.task_db_shards > 1 or os.path.exists(os.path.join(self.task_db_data_dir, STATE_FILE)):
+            # Once a pool has run, its tasks live in the shard directories: keep
+            # using the pool (down to one shard) rather than the emptied root
+            self.task_db = ShardedTaskDB(
+                self.task_db_shards,
+                self.task_db_data_dir,
+                namespace=self.task_db_namespace,
+                timeout=self.task_db_timeout,
+                monitor_interval=self.monitor_interval,
+                max_concurrency=self.task_db_concurrency
+            )
+        else:
+            self.task_db = StdioMCPClient(
+                ["python", "task_db_server.py", "--data-dir", self.task_db_data_dir],
+                timeout=self.task_db_timeout,
+                spare=self.task_db_spare
+            )
+        await self.task_db.start()
+    
+    @staticmethod
+    def _is_error(result: Any) -> bool:
+        """True for the "❌ ..." messages the _call_* helpers return on failure."""
+        return isinstance(result, str) and result.startswith("❌")
+    
+    @staticmethod
+    def _structured_result(result: Dict[str, Any]) -> Any:
+        """Take a tool's value from an MCP result: typed ``structuredContent``, else the text block."""
+        structured = result.get("structuredContent")
+        if isinstance(structured, dict) and "result" in structured:
+            return structured["result"]
+        return result["content"][0]["text"] if result.get("content") else None
+    
+    async def _call_task_db_server(self, method: str, params: Dict = None, on_notification=None,
+                                   cached: bool = False, on_cache_hit=None) -> Any:
         """
         Communicate with Task DB Server via STDIO transport.
         
+        Returns the tool's structured result (decoded once, with the frame),
+        or an "❌ ..." message on failure.
+        
+        Calls are multiplexed over one pipe: each gets a unique request ID and
+        awaits its own reply, so concurrent tool calls never wait on each other.
+        ``on_notification`` receives the params of notifications the server
+        sends for this request ahead of its reply (e.g. list_tasks_stream chunks).
+        With ``cached``, a result read at the current store version is
+        returned from ``task_db_cache`` without touching the pipe, and
+        ``on_cache_hit`` (if given) is called so the caller can tell.
+        
         Demonstrates:
         - STDIO-based MCP communication
         - JSON-RPC protocol usage
         - Error handling for process communication
         """
-        if not self.task_db_process or self.task_db_process.poll() is not None:
-            # Process not available or has died, try to restart
-            await self._restart_task_db_server()
-            if not self.task_db_process:
-                return "❌ Task Database Server not available"
-        
-        # Prepare MCP tool call
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": method,
-                "arguments": params or {}
-            }
-        }
+        cache_key = (method, json.dumps(params, sort_keys=True), self._task_namespace()) if cached else None
+        if cached:
+            hit = self.task_db_cache.get(cache_key)
+            if hit is not None:
+                if on_cache_hit:
+                    on_cache_hit()
+                return hit
+        
+        async def call():
+            if not await self._task_db_alive():
+                raise ConnectionError("Task Database Server is not running")
+            return await self.task_db.call_tool(method, params, on_notification=on_notification)
         
         try:
-            # Convert request to JSON string
-            request_json = json.dumps(request) + "\n"
-            
-            # Send request to STDIO MCP server
-            self.task_db_process.stdin.write(request_json)
-            self.task_db_process.stdin.flush()
-            
-            # Read response with timeout
-            import asyncio
-            import threading
-            
-            response_line = None
-            def read_response():
-                nonlocal response_line
-                try:
-                    response_line = self.task_db_process.stdout.readline()
-                except:
-                    response_line = None
-            
-            # Run the blocking read in a thread
-            thread = threading.Thread(target=read_response)
-            thread.start()
-            thread.join(timeout=5)  # 5 second timeout
-            
-            if response_line and response_line.strip():
-                try:
-                    response = json.loads(response_line.strip())
-                    if "result" in response:
-                        return str(response["result"]["content"][0]["text"])
-                    elif "error" in response:
-                        return f"❌ Error: {response['error']['message']}"
-                except json.JSONDecodeError as e:
-                    return f"❌ Invalid JSON response: {response_line}"
-            
-            return "❌ No response from Task Database Server"
-            
+            # A dead or repeatedly failing server opens the circuit: later calls
+            # fail at once while the supervisor restarts it in the background
+            if isinstance(self.task_db, ShardedTaskDB):
+                # The pool routes the call through its shard's own supervisor
+                response = await call()
+            else:
+                response = await self.task_db_supervisor.call(call)
+        except DeadlineExceeded:
+            return "❌ Request deadline exceeded"
+        except CircuitOpenError as e:
+            return f"❌ {e} (restarting)"
+        except asyncio.TimeoutError:
+            # The server is alive but slow; its late reply will be discarded
+            return f"❌ Task Database Server did not answer within {self.task_db_timeout:g}s"
         except Exception as e:
-            # Try to restart the server on communication error
-            await self._restart_task_db_server()
             return f"❌ Communication error with Task Database Server: {str(e)}"
+        
+        if "result" in response:
+            value = self._structured_result(response["result"])
+            version = response["result"].get("storeVersion")
+            self.task_db_cache.observe(version)
+            if cached:
+                self.task_db_cache.put(cache_key, version, value)
+            return value
+        return f"❌ Error: {response.get('error', {}).get('message', 'Invalid response')}"
+    
+    async def _task_db_alive(self) -> bool:
+        return self.task_db is not None and self.task_db.is_running
+    
+    async def _probe_task_db(self) -> bool:
+        """Health probe: the server is running and answers a count within a second."""
+        if not await self._task_db_alive():
+            return False
+        response = await self.task_db.call_tool("get_task_count", timeout=PROBE_TIMEOUT)
+        return "result" in response
+    
+    def _task_namespace(self) -> Optional[str]:
+        """Namespace the current request's Task DB calls go to (None when not sharded)."""
+        if not isinstance(self.task_db, ShardedTaskDB):
+            return None
+        return current_namespace() or self.task_db.namespace
+    
+    async def total_task_count(self) -> Optional[int]:
+        """Tasks across every namespace, gathered from each shard when sharded; None on failure."""
+        if isinstance(self.task_db, ShardedTaskDB):
+            try:
+                count = await self.task_db.total_count()
+            except Exception:
+                return None
+        else:
+            count = await self._call_task_db_server("get_task_count", cached=True)
+            if not isinstance(count, int):
+                return None
+        self.last_task_count, self.last_task_count_at = count, time.time()
+        return count
+    
+    async def resize_task_db(self, shards: int) -> Dict[str, Any]:
+        """
+        Change the number of Task DB shards while serving.
+        
+        Only namespaces whose shard changes are moved; calls for a namespace
+        wait while it moves. The new count is kept for the next start
+        (see task_db_pool.py), so TASK_DB_SHARDS only sets the first one.
+        """
+        if not isinstance(self.task_db, ShardedTaskDB):
+            raise ValueError("Task DB is not sharded; start with TASK_DB_SHARDS above 1")
+        await self.task_db.resize(shards)
+        self.task_db_shards = shards
+        return self.task_db.stats()
     
     async def _restart_task_db_server(self):
-        """Restart the task database server if it's not responding."""
-        if self.task_db_process:
+        """Restart the task database server (run by its supervisor, with backoff)."""
+        # A new process counts versions from zero again
+        self.task_db_cache.clear()
+        self.response_cache.clear()
+        if self.task_db:
             try:
-                self.task_db_process.terminate()
-                self.task_db_process.wait(timeout=2)
-            except:
-                try:
-                    self.task_db_process.kill()
-                except:
-                    pass
+                await self.task_db.close(keep_spare=True)
+            except Exception:
+                pass
         
         try:
-            self.task_db_process = subprocess.Popen(
-                ["python", "task_db_server.py"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=0  # Unbuffered
-            )
-            # Give it a moment to start
-            await asyncio.sleep(0.5)
+            await self._start_task_db_server()
         except Exception as e:
             print(f"❌ Failed to restart Task Database Server: {e}")
-            self.task_db_process = None
+            raise
     
-    async def _call_notification_server(self, method: str, params: Dict = None) -> str:
+    async def _call_notification_server(self, method: str, params: Dict = None) -> Any:
         """
         Communicate with Notification Server via HTTP transport.
         
+        Requests reuse warm keep-alive connections from the agent's pooled client.
+        Returns the tool's structured result, or an "❌ ..." message on failure.
+        
         Demonstrates:
         - HTTP-based MCP communication
         - RESTful API integration
         - Async HTTP client usage
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                # Call MCP tool via HTTP
-                url = f"{self.notification_server_url}/call/{method}"
-                async with session.post(url, json=params or {}) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return str(result.get("result", "Success"))
-                    else:
-                        error_text = await response.text()
-                        return f"❌ HTTP Error {response.status}: {error_text}"
+            # Call MCP tool via HTTP
+            status, body = await self.notification_supervisor.call(
+                lambda: self.notification_client.call_tool(method, params)
+            )
+            if status == 200 and isinstance(body, dict):
+                self._observe_notification_version(body.get("stateVersion"))
+                return self._structured_result(body)
+            return f"❌ HTTP Error {status}: {body}"
+        except DeadlineExceeded:
+            return "❌ Request deadline exceeded"
+        except CircuitOpenError as e:
+            return f"❌ {e} (restarting)"
+        except asyncio.TimeoutError:
+            if expired(get_deadline()):
+                return "❌ Request deadline exceeded"
+            return "❌ Notification Server did not answer in time"
         except Exception as e:
             return f"❌ Communication error with Notification Server: {str(e)}"
     
+    def _observe_notification_version(self, version: Optional[int]):
+        if version is None:
+            return
+        if self.notification_version is not None and version < self.notification_version:
+            # Restarted behind our back: answers cached against its old history are void
+            self.response_cache.clear()
+        self.notification_version = version
+    
+    async def _state_versions(self) -> Optional[tuple]:
+        """
+        Current (Task DB storeVersion, Notification Server stateVersion).
+        
+        Both are probed with a cheap call (an inline get_task_count and
+        ``/health``), so mutations made by anyone are seen. None if either
+        server did not answer.
+        """
+        async def notification_version():
+            status, body = await self.notification_client.request("GET", "/health", timeout=1.0)
+            if status == 200 and isinstance(body, dict):
+                self._observe_notification_version(body.get("stateVersion"))
+        
+        count, health = await asyncio.gather(
+            self._call_task_db_server("get_task_count"), notification_version(),
+            return_exceptions=True
+        )
+        if self._is_error(count) or isinstance(count, BaseException) or isinstance(health, BaseException):
+            return None
+        if self.task_db_cache.version is None or self.notification_version is None:
+            return None
+        return self.task_db_cache.version, self.notification_version
+    
+    async def _response_cache_key(self, user_input: str, session_id: Optional[str] = None) -> Optional[tuple]:
+        """Cache key for a read-only request, or None if it must go to the model."""
+        if self.response_cache_ttl <= 0 or is_mutating(user_input):
+            return None
+        versions = await self._state_versions()
+        if versions is None:
+            return None
+        # A follow-up's answer depends on the conversation it continues; any
+        # other message is keyed on itself, so a repeated question hits
+        context = self.memory.fingerprint(session_id) if is_follow_up(user_input) else ""
+        return (normalize(user_input),) + versions + (self.model_name, self.temperature,
+                                                      self._task_namespace(), context)
+    
+    @staticmethod
+    def _tokens_used(messages: List[Any]) -> int:
+        """Total tokens the model reported for the given messages."""
+        total = 0
+        for message in messages:
+            usage = getattr(message, "usage_metadata", None) or {}
+            total += usage.get("total_tokens", 0)
+        return total
+    
     # Task Management Tools (via STDIO MCP Server)
-    async def add_task_mcp(self, task: str) -> str:
+    async def add_task_mcp(self, task: str, priority: Optional[str] = None, due: Optional[str] = None) -> str:
         """Add a task via MCP Task Database Server."""
-        result = await self._call_task_db_server("add_task", {"task": task})
-        return f"✅ {result}"
-    
-    async def list_tasks_mcp(self) -> str:
-        """List tasks via MCP Task Database Server."""
-        result = await self._call_task_db_server("list_tasks")
-        if isinstance(result, str) and result.startswith("["):
-            # Parse list result
-            try:
-                tasks = eval(result)  # In production, use json.loads
-                if not tasks:
-                    return "📝 No tasks found. Your task list is empty!"
-                task_list = "\n".join([f"{i+1}. {task}" for i, task in enumerate(tasks)])
-                return f"📝 Your current tasks:\n{task_list}\n\nTotal: {len(tasks)} tasks"
-            except:
-                return str(result)
-        return str(result)
+        params = {"task": task}
+        if priority:
+            params["priority"] = priority
+        if due:
+            params["due"] = due
+        result = await self._call_task_db_server("add_task", params)
+        return result if self._is_error(result) else f"✅ {result}"
+    
+    async def add_tasks_mcp(self, tasks: List[str]) -> str:
+        """Add several tasks in one MCP call (one storage write on the server)."""
+        result = await self._call_task_db_server("add_tasks", {"tasks": tasks})
+        if not isinstance(result, list):
+            return str(result)
+        added = [item for item in result if "id" in item]
+        message = f"✅ Added {len(added)} of {len(result)} tasks"
+        if added:
+            message += f" (IDs {', '.join(str(item['id']) for item in added)})"
+        failed = [f"'{item['task']}': {item['error']}" for item in result if "error" in item]
+        if failed:
+            message += "\n⚠️ Not added: " + "; ".join(failed)
+        return message
+    
+    async def list_tasks_mcp(self, cursor: Optional[str] = None, contains: Optional[str] = None) -> str:
+        """
+        List one page of tasks via MCP Task Database Server.
+        
+        The page is sized by the list_tasks output budget. When more tasks
+        exist, the first page also carries counts by status and priority, and
+        every page ends with the cursor for the next one.
+        """
+        params = {"limit": self.output_budgets.for_tool("list_tasks").max_items}
+        if cursor:
+            params["cursor"] = cursor
+        else:
+            params["with_counts"] = True
+        if contains:
+            params["contains"] = contains
+        cache_hits = []
+        page = await self._call_task_db_server("list_tasks", params, cached=True,
+                                               on_cache_hit=lambda: cache_hits.append(True))
+        if not isinstance(page, dict):
+            return str(page)
+        # A cached page was budgeted and logged when it was first read
+        fresh = not cache_hits
+        tasks = page["tasks"]
+        if not tasks and not cursor:
+            if contains:
+                return f"📝 No tasks match '{contains}'."
+            return "📝 No tasks found. Your task list is empty!"
+        lines = self.output_budgets.fit_lines("list_tasks", [self._format_task(task) for task in tasks],
+                                              record=fresh)
+        task_list = "\n".join(lines)
+        message = f"📝 Your current tasks:\n{task_list}\n\nTotal: {page['total']} tasks"
+        if page["next_cursor"]:
+            if fresh:
+                self.output_budgets.record_truncation("list_tasks", len(tasks), page["total"], page["next_cursor"])
+            counts = page.get("counts")
+            if counts:
+                message += (f"\nBy status: {format_counts(counts['status'])}"
+                            f"\nBy priority: {format_counts(counts['priority'])}")
+            message += (f"\n(Showing {len(tasks)} tasks; more available - call list_tasks "
+                        f"with cursor='{page['next_cursor']}' for the next page)")
+        return message
+    
+    @staticmethod
+    def _format_task(task: Dict[str, Any]) -> str:
+        """One listing line: id, text and any non-default fields."""
+        details = []
+        if task.get("priority", "normal") != "normal":
+            details.append(f"{task['priority']} priority")
+        if task.get("due"):
+            details.append(f"due {task['due']}")
+        if task.get("status", "open") != "open":
+            details.append(task["status"].replace("_", " "))
+        suffix = f" ({', '.join(details)})" if details else ""
+        return f"{task['id']}. {task['task']}{suffix}"
+    
+    async def search_tasks_mcp(self, query: str) -> str:
+        """Find the tasks most relevant to a description via MCP Task Database Server."""
+        budget = self.output_budgets.for_tool("search_tasks")
+        found = await self._call_task_db_server("search_tasks", {"query": query, "limit": budget.max_items})
+        if not isinstance(found, dict):
+            return str(found)
+        if not found["results"]:
+            return f"🔎 No tasks match '{query}'."
+        lines = "\n".join(self.output_budgets.fit_lines(
+            "search_tasks", [self._format_task(task) for task in found["results"]]
+        ))
+        return f"🔎 Best matches for '{query}':\n{lines}\n\n({found['matches']} matching tasks)"
     
     async def remove_task_mcp(self, task: str) -> str:
         """Remove a task via MCP Task Database Server."""
         result = await self._call_task_db_server("remove_task", {"task": task})
-        return f"✅ {result}"
+        return result if self._is_error(result) else f"✅ {result}"
     
     async def get_task_count_mcp(self) -> str:
         """Get task count via MCP Task Database Server."""
-        result = await self._call_task_db_server("get_task_count")
-        count = int(result) if result.isdigit() else 0
+        count = await self._call_task_db_server("get_task_count", cached=True)
+        if not isinstance(count, int):
+            return str(count)
         if count == 0:
             return "📊 You have no tasks in your list."
         elif count == 1:
@@ -279,30 +586,45 @@ class MCPTaskManagerAgent:
             "task": task, 
             "priority": priority
         })
-        return f"🔔 {result}"
+        return result if self._is_error(result) else f"🔔 {result}"
     
-    async def get_notification_history_mcp(self) -> str:
-        """Get notification history via MCP Notification Server."""
-        result = await self._call_notification_server("get_notification_history")
+    async def get_notification_history_mcp(self, cursor: Optional[str] = None) -> str:
+        """
+        Get notification history via MCP Notification Server.
         
-        try:
-            # Parse the notification history
-            if isinstance(result, str) and result.startswith("["):
-                history = eval(result)  # In production, use json.loads
-                if not history:
-                    return "📜 No notifications have been sent yet."
-                
-                formatted_history = "\n".join([
-                    f"🔔 {notif['timestamp']} - {notif['type'].title()}: '{notif['task']}' " + 
-                    (f"(Priority: {notif.get('priority', 'normal')})" if 'priority' in notif else "")
-                    for notif in history
-                ])
-                
-                return f"📜 Notification History:\n{formatted_history}\n\nTotal: {len(history)} notifications"
-            else:
-                return str(result)
-        except:
-            return str(result)
+        Shows the newest notifications first, as many as the tool's output
+        budget allows, with counts by type and priority and a cursor for
+        older ones.
+        """
+        params = {"limit": self.output_budgets.for_tool("get_notification_history").max_items}
+        if cursor:
+            params["cursor"] = cursor
+        page = await self._call_notification_server("get_notification_history", params)
+        if not isinstance(page, dict):
+            return str(page)
+        history = page["notifications"]
+        if not history and not cursor:
+            return "📜 No notifications have been sent yet."
+        
+        formatted_history = "\n".join(self.output_budgets.fit_lines("get_notification_history", [
+            f"🔔 {notif.get('timestamp')} - {str(notif.get('type', 'notification')).title()}: "
+            f"'{notif.get('task', '')}' " +
+            (f"(Priority: {notif.get('priority', 'normal')})" if 'priority' in notif else "")
+            for notif in history
+        ]))
+        
+        message = f"📜 Notification History (newest first):\n{formatted_history}\n\nTotal: {page['total']} notifications"
+        if page["next_cursor"]:
+            self.output_budgets.record_truncation(
+                "get_notification_history", len(history), page["total"], page["next_cursor"]
+            )
+            counts = page["counts"]
+            message += f"\nBy type: {format_counts(counts['type'])}"
+            if counts["priority"]:
+                message += f"\nBy priority: {format_counts(counts['priority'])}"
+            message += (f"\n(Showing {len(history)} notifications; older ones available - call "
+                        f"get_notification_history with cursor='{page['next_cursor']}')")
+        return message
     
     async def setup_agent(self):
         """
@@ -314,164 +636,302 @@ class MCPTaskManagerAgent:
         - Agent flexibility with external service tools
         """
         
+        # LangChain, LangGraph and the OpenAI client take longer to import than
+        # the servers take to boot: load them on a worker thread meanwhile
+        frameworks = asyncio.get_running_loop().run_in_executor(None, self._load_agent_frameworks)
+        
         # Start MCP servers first
         if not await self.start_mcp_servers():
             print("❌ Failed to start MCP servers")
             return False
+        StructuredTool, create_react_agent = await frameworks
+        tools = self._build_tools(StructuredTool)
         
-        # Create async wrapper functions for LangChain tools
-        def sync_add_task(task: str) -> str:
-            """Add a new task to the task list via MCP."""
-            try:
-                # Try to get the current event loop
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If loop is running, create a task
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.add_task_mcp(task))
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.add_task_mcp(task))
-            except RuntimeError:
-                # No event loop, create one
-                return asyncio.run(self.add_task_mcp(task))
-        
-        def sync_list_tasks() -> str:
-            """List all current tasks via MCP."""
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.list_tasks_mcp())
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.list_tasks_mcp())
-            except RuntimeError:
-                return asyncio.run(self.list_tasks_mcp())
-        
-        def sync_remove_task(task: str) -> str:
-            """Remove a task from the task list via MCP."""
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.remove_task_mcp(task))
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.remove_task_mcp(task))
-            except RuntimeError:
-                return asyncio.run(self.remove_task_mcp(task))
-        
-        def sync_get_task_count() -> str:
-            """Get the total number of tasks via MCP."""
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.get_task_count_mcp())
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.get_task_count_mcp())
-            except RuntimeError:
-                return asyncio.run(self.get_task_count_mcp())
-        
-        def sync_send_reminder(task: str, priority: str = "normal") -> str:
-            """Send a reminder for a specific task via MCP."""
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.send_reminder_mcp(task, priority))
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.send_reminder_mcp(task, priority))
-            except RuntimeError:
-                return asyncio.run(self.send_reminder_mcp(task, priority))
-        
-        def sync_get_notification_history() -> str:
-            """Get the history of all notifications via MCP."""
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, self.get_notification_history_mcp())
-                        return future.result()
-                else:
-                    return loop.run_until_complete(self.get_notification_history_mcp())
-            except RuntimeError:
-                return asyncio.run(self.get_notification_history_mcp())
-        
-        # Create LangChain tools from MCP server functions
-        tools = [
+        # Create the LangGraph ReAct agent. Its tool node runs all tool calls
+        # of one model turn concurrently (each server's supervisor limits how
+        # many reach it at once) and returns the results in the model's order
+        self.agent = create_react_agent(self.model, tools)
+        
+        print("✅ MCP Task Manager Agent initialized successfully")
+        print("🌟 MCP Benefits Demonstrated:")
+        print("   • Protocol Standardization - Uniform interface across services")
+        print("   • Transport Flexibility - STDIO + HTTP working together")
+        print("   • Service Modularity - Independent, specialized microservices")
+        print("   • Easy Extensibility - Add services without core changes")
+        print(f"🛠️  Available MCP tools: {[tool.name for tool in tools]}")
+        
+        return True
+    
+    def _build_tools(self, StructuredTool) -> List[Any]:
+        """
+        Create LangChain tools straight from the MCP coroutines.
+        
+        They run on the agent's event loop and share its STDIO and HTTP
+        connections, so concurrent calls overlap instead of each blocking a
+        thread.
+        """
+        return [
             StructuredTool.from_function(
-                func=sync_add_task,
+                coroutine=self.add_task_mcp,
                 name="add_task",
-                description="Add a new task to the task list via MCP Task Database Server (STDIO transport). Use this when the user wants to create or add a task."
+                description="Add a new task to the task list via MCP Task Database Server (STDIO transport). Use this when the user wants to create or add a task. Optional 'priority' (low, normal, high) and 'due' (ISO date, YYYY-MM-DD)."
             ),
             StructuredTool.from_function(
-                func=sync_list_tasks,
+                coroutine=self.add_tasks_mcp,
+                name="add_tasks",
+                description="Add several tasks at once via MCP Task Database Server (STDIO transport). Use this instead of repeated add_task calls when the user gives a list of tasks."
+            ),
+            StructuredTool.from_function(
+                coroutine=self.list_tasks_mcp,
                 name="list_tasks", 
-                description="List all current tasks via MCP Task Database Server (STDIO transport). Use this when the user wants to see their tasks."
+                description="List current tasks via MCP Task Database Server (STDIO transport), one page at a time. Use this when the user wants to see their tasks. Optional 'contains' filters by text; pass the returned 'cursor' to get the next page."
+            ),
+            StructuredTool.from_function(
+                coroutine=self.search_tasks_mcp,
+                name="search_tasks",
+                description="Search tasks by relevance via MCP Task Database Server (STDIO transport); returns the few best matches with their IDs. Use this instead of list_tasks when the user refers to a specific task by description (e.g. 'the dentist one')."
             ),
             StructuredTool.from_function(
-                func=sync_remove_task,
+                coroutine=self.remove_task_mcp,
                 name="remove_task",
                 description="Remove a task from the list via MCP Task Database Server (STDIO transport). Use this when the user wants to delete or remove a task."
             ),
             StructuredTool.from_function(
-                func=sync_get_task_count,
+                coroutine=self.get_task_count_mcp,
                 name="get_task_count",
                 description="Get the total number of tasks via MCP Task Database Server (STDIO transport). Use this when the user asks how many tasks they have."
             ),
             StructuredTool.from_function(
-                func=sync_send_reminder,
+                coroutine=self.send_reminder_mcp,
                 name="send_reminder",
                 description="Send a reminder for a specific task via MCP Notification Server (HTTP transport). Use this when the user wants to be reminded about a task."
             ),
             StructuredTool.from_function(
-                func=sync_get_notification_history,
+                coroutine=self.get_notification_history_mcp,
                 name="get_notification_history",
-                description="Get the history of all notifications sent via MCP Notification Server (HTTP transport). Use this when the user wants to see notification history."
+                description="Get the history of notifications sent via MCP Notification Server (HTTP transport), newest first, one page at a time. Use this when the user wants to see notification history; pass the returned 'cursor' to see older ones."
             )
         ]
+    
+    def _load_agent_frameworks(self):
+        """Import the agent frameworks (timed, see import_timing) and create the chat model."""
+        StructuredTool = lazy_import("langchain_core.tools").StructuredTool
+        create_react_agent = lazy_import("langgraph.prebuilt").create_react_agent
+        if self.model is None:
+            ChatOpenAI = lazy_import("langchain_openai").ChatOpenAI
+            self.model = ChatOpenAI(model=self.model_name, temperature=self.temperature)
+        return StructuredTool, create_react_agent
+    
+    async def process_request(self, user_input: str, deadline: Optional[float] = None,
+                              session_id: Optional[str] = None) -> str:
+        """
+        Process a user request through the MCP-powered agent.
         
-        # Create the LangGraph ReAct agent
-        self.agent = create_react_agent(self.model, tools)
+        ``deadline`` (epoch seconds) bounds the whole request: every model and
+        tool call made for it sees the deadline, and the agent run is
+        cancelled, along with its in-flight tool calls, once it passes.
+        With a ``session_id`` the model also sees that conversation's recent
+        turns and a summary of older ones, within a fixed token budget.
+        """
+        if not self.agent:
+            return "❌ MCP Agent not initialized."
         
-        print("✅ MCP Task Manager Agent initialized successfully")
-        print("🌟 MCP Benefits Demonstrated:")
-        print("   • Protocol Standardization - Uniform interface across services")
-        print("   • Transport Flexibility - STDIO + HTTP working together")
-        print("   • Service Modularity - Independent, specialized microservices")
-        print("   • Easy Extensibility - Add services without core changes")
-        print(f"🛠️  Available MCP tools: {[tool.name for tool in tools]}")
+        with deadline_scope(deadline):
+            try:
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise DeadlineExceeded("request deadline exceeded")
+                answer = await self._answer(user_input, session_id)
+            except asyncio.TimeoutError:
+                return "❌ Request deadline exceeded before the agent finished"
+            except Exception as e:
+                return f"❌ Error: {str(e)}"
+        if session_id is not None and not self._is_error(answer):
+            self.memory.record(session_id, user_input, answer)
+        return answer
+    
+    async def _answer(self, user_input: str, session_id: Optional[str]) -> str:
+        """Answer from the fast path, the response cache or the model, in that order."""
+        routed = self.intent_router.route(user_input)
+        if routed is not None:
+            # Fast path: one fixed tool call, formatted locally
+            return await asyncio.wait_for(self.run_tool(*routed), remaining())
         
-        return True
+        cache_key = await self._response_cache_key(user_input, session_id)
+        if cache_key is None:
+            self.response_cache.bypass()
+        else:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if session_id is None:
+            messages = [{"role": "user", "content": user_input}]
+        else:
+            # Summary + recent turns + this message, fitted to the token budget
+            messages = self.memory.prompt(session_id, user_input)
+        
+        started = time.perf_counter()
+        response = await asyncio.wait_for(self.agent.ainvoke({"messages": messages}), remaining())
+        answer = response['messages'][-1].content
+        # Only cache if nothing changed while the model worked (the tool
+        # calls of this run update the observed versions)
+        if cache_key is not None and cache_key[1:3] == (self.task_db_cache.version, self.notification_version):
+            self.response_cache.put(
+                cache_key, answer,
+                cost_ms=(time.perf_counter() - started) * 1000,
+                tokens=self._tokens_used(response['messages'][len(messages):])
+            )
+        return answer
     
-    async def process_request(self, user_input: str) -> str:
-        """Process a user request through the MCP-powered agent."""
+    async def stream_request(self, user_input: str, emit: Callable[[Dict[str, Any]], None],
+                             deadline: Optional[float] = None,
+                             session_id: Optional[str] = None) -> str:
+        """
+        Process a request like ``process_request``, reporting progress as it happens.
+        
+        ``emit`` receives one dict per event, in order:
+        - ``{"type": "token", "text"}`` for each piece of the model's answer
+        - ``{"type": "tool_start", "id", "name", "args"}`` when a tool call begins
+        - ``{"type": "tool_end", "id", "name", "ok", "preview"}`` when it returns
+        - ``{"type": "done", "response", "source"}`` last, with the full answer
+          and where it came from (agent, fast_path, cache or error)
+        
+        Returns the full answer as well.
+        """
         if not self.agent:
-            return "❌ MCP Agent not initialized."
+            answer, source = "❌ MCP Agent not initialized.", "error"
+        else:
+            self.streamed_requests += 1
+            with deadline_scope(deadline):
+                try:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded("request deadline exceeded")
+                    answer, source = await asyncio.wait_for(
+                        self._stream_answer(user_input, session_id, emit), left
+                    )
+                except asyncio.TimeoutError:
+                    answer, source = "❌ Request deadline exceeded before the agent finished", "error"
+                except Exception as e:
+                    answer, source = f"❌ Error: {str(e)}", "error"
+            if session_id is not None and not self._is_error(answer):
+                self.memory.record(session_id, user_input, answer)
+        emit({"type": "done", "response": answer, "source": source})
+        return answer
+    
+    async def _stream_answer(self, user_input: str, session_id: Optional[str],
+                             emit: Callable[[Dict[str, Any]], None]) -> tuple:
+        """(answer, source) from the fast path, the cache or a streamed agent run."""
+        request_started = time.perf_counter()
+        routed = self.intent_router.route(user_input)
+        if routed is not None:
+            tool, arguments = routed
+            emit({"type": "tool_start", "id": "fast-path", "name": tool, "args": arguments})
+            answer = await self.run_tool(tool, arguments)
+            emit({"type": "tool_end", "id": "fast-path", "name": tool,
+                  "ok": not self._is_error(answer), "preview": answer[:200]})
+            return answer, "fast_path"
+        
+        cache_key = await self._response_cache_key(user_input, session_id)
+        if cache_key is None:
+            self.response_cache.bypass()
+        else:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached, "cache"
         
-        query = {"messages": [{"role": "user", "content": user_input}]}
+        if session_id is None:
+            messages = [{"role": "user", "content": user_input}]
+        else:
+            messages = self.memory.prompt(session_id, user_input)
         
-        try:
-            response = await self.agent.ainvoke(query)
-            return response['messages'][-1].content
-        except Exception as e:
-            return f"❌ Error: {str(e)}"
+        started = time.perf_counter()
+        first_token = True
+        answer = ""
+        tokens = 0
+        # "messages" yields the model's output token by token; "updates" yields
+        # each finished node: the model's tool calls, then the tools' results
+        async for mode, payload in self.agent.astream({"messages": messages},
+                                                      stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "agent" and isinstance(chunk.content, str) and chunk.content:
+                    if first_token:
+                        first_token = False
+                        self.first_token_ms.append((time.perf_counter() - request_started) * 1000)
+                    emit({"type": "token", "text": chunk.content})
+                continue
+            for node, update in payload.items():
+                for message in self._update_messages(update):
+                    if node == "agent":
+                        tokens += self._tokens_used([message])
+                        calls = getattr(message, "tool_calls", None) or []
+                        for call in calls:
+                            emit({"type": "tool_start", "id": call["id"], "name": call["name"], "args": call["args"]})
+                        if not calls:
+                            answer = message.content
+                    elif node == "tools":
+                        content = str(message.content)
+                        emit({"type": "tool_end", "id": message.tool_call_id, "name": message.name,
+                              "ok": not self._is_error(content), "preview": content[:200]})
+        
+        if cache_key is not None and cache_key[1:3] == (self.task_db_cache.version, self.notification_version):
+            self.response_cache.put(cache_key, answer,
+                                    cost_ms=(time.perf_counter() - started) * 1000, tokens=tokens)
+        return answer, "agent"
+    
+    @staticmethod
+    def _update_messages(update: Any) -> List[Any]:
+        """Messages in one node's state update (a dict, or a list of them for parallel tool runs)."""
+        updates = update if isinstance(update, list) else [update]
+        return [message for item in updates if isinstance(item, dict) for message in item.get("messages", [])]
+    
+    def streaming_stats(self) -> Dict[str, Any]:
+        """Streamed request count and time to first token (ms) for health reporting."""
+        samples = sorted(self.first_token_ms)
+        return {
+            "requests": self.streamed_requests,
+            "first_token_ms_p50": round(samples[len(samples) // 2], 1) if samples else None,
+            "first_token_ms_max": round(samples[-1], 1) if samples else None,
+        }
+    
+    async def run_tool(self, tool: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+        """Call one MCP tool directly (no LLM) and return its formatted result."""
+        method = getattr(self, f"{tool}_mcp", None)
+        if method is None:
+            return f"❌ Unknown tool: {tool}"
+        return await method(**(arguments or {}))
+    
+    async def run_quick_action(self, action: str, deadline: Optional[float] = None,
+                               session_id: Optional[str] = None) -> str:
+        """
+        Answer a web quick-action button with its fixed tool call.
+        
+        The result joins the session's conversation, so a follow-up such as
+        "remove the second one" can refer to it.
+        """
+        routed = self.intent_router.quick_action(action)
+        if routed is None:
+            return f"❌ Unknown quick action: {action}"
+        with deadline_scope(deadline):
+            try:
+                answer = await asyncio.wait_for(self.run_tool(*routed), remaining())
+            except asyncio.TimeoutError:
+                return "❌ Request deadline exceeded"
+        if session_id is not None and not self._is_error(answer):
+            self.memory.record(session_id, f"(quick action: {action})", answer)
+        return answer
     
     async def shutdown(self):
         """Clean shutdown of MCP servers."""
-        if self.task_db_process:
-            self.task_db_process.terminate()
-            self.task_db_process.wait()
+        await self.task_db_supervisor.stop()
+        await self.notification_supervisor.stop()
+        if self.task_db:
+            await self.task_db.close()
+        await self.notification_client.close()
+        if self.notification_process and self.notification_process.poll() is None:
+            self.notification_process.terminate()
         print("🔄 MCP servers shut down")
     
     async def run_mcp_demo(self):
@@ -0,0 +1,244 @@
+"""
+STDIO Transport Framing and Codecs
+Shared by the Task Database Server and the agent's STDIO client (and, for
+``tool_result``, by the HTTP Notification Server).
+
+Every connection starts in the plain mode: newline-delimited JSON text
+("ndjson" framing, stdlib ``json`` codec). The client may then send a
+``transport/negotiate`` request listing the framings and codecs it supports;
+the server picks the first one it also supports, replies in the current mode,
+and both sides switch for every message after that reply.
+
+Framings:
+- ndjson           one message per line (JSON text codecs only)
+- length-prefixed  4-byte big-endian payload length, then the payload
+
+Codecs (fastest first, each only if its package is installed):
+- msgpack  compact binary encoding (length-prefixed framing only)
+- orjson   fast JSON encoder/decoder, wire-compatible with json
+- json     stdlib fallback, always available
+"""
+
+import asyncio
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional speedup
+    msgpack = None
+
+FRAMING_NDJSON = "ndjson"
+FRAMING_LENGTH_PREFIXED = "length-prefixed"
+FRAMINGS = [FRAMING_LENGTH_PREFIXED, FRAMING_NDJSON]
+
+NEGOTIATE_METHOD = "transport/negotiate"
+# MCP lifecycle: the client's first request, answered once the server can serve
+INITIALIZE_METHOD = "initialize"
+INITIALIZED_NOTIFICATION = "notifications/initialized"
+MCP_PROTOCOL_VERSION = "2024-11-05"
+# MCP cancellation: the client gave up on ``requestId``; skip it if not started
+CANCELLED_NOTIFICATION = "notifications/cancelled"
+# Sent once to a preforked standby server (``--standby``) to make it open storage
+ACTIVATE_METHOD = "server/activate"
+
+# Refuse frames larger than this rather than allocating whatever a corrupt header says
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+
+class TransportError(Exception):
+    """Raised for malformed frames or an unusable negotiated mode."""
+
+
+class FrameTooLarge(TransportError):
+    """A newline-delimited message exceeded the reader's limit; it was skipped."""
+
+
+class JsonCodec:
+    """Stdlib JSON; the baseline every peer understands."""
+    name = "json"
+    binary = False
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec:
+    """orjson: same wire format as JSON, several times faster."""
+    name = "orjson"
+    binary = False
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return orjson.dumps(message)
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec:
+    """MessagePack: compact binary messages, no text escaping."""
+    name = "msgpack"
+    binary = True
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+
+CODECS: Dict[str, Any] = {"json": JsonCodec}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec
+
+# Preference order used when offering or choosing codecs
+CODEC_PREFERENCE = [name for name in ("msgpack", "orjson", "json") if name in CODECS]
+
+
+def get_codec(name: str):
+    """Return the codec class registered under ``name``."""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise TransportError(f"Codec not available: {name}")
+
+
+def choose_mode(framings: List[str], codecs: List[str]) -> Dict[str, str]:
+    """
+    Pick the framing and codec for a negotiate request.
+
+    Honours the client's order of preference, restricted to what is installed
+    here. Binary codecs need length-prefixed framing.
+    """
+    framing = next((f for f in framings if f in FRAMINGS), FRAMING_NDJSON)
+    for name in codecs:
+        codec = CODECS.get(name)
+        if codec is None:
+            continue
+        if codec.binary and framing != FRAMING_LENGTH_PREFIXED:
+            continue
+        return {"framing": framing, "codec": name}
+    return {"framing": framing, "codec": "json"}
+
+
+def encode_frame(payload: bytes, framing: str) -> bytes:
+    """Wrap an encoded message for the wire."""
+    if framing == FRAMING_LENGTH_PREFIXED:
+        return _HEADER.pack(len(payload)) + payload
+    return payload + b"\n"
+
+
+def _check_size(size: int) -> int:
+    if size > MAX_FRAME_SIZE:
+        raise TransportError(f"Frame of {size} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    return size
+
+
+async def read_frame(reader, framing: str) -> Optional[bytes]:
+    """Read one frame payload from an asyncio StreamReader. Returns None at EOF."""
+    if framing == FRAMING_LENGTH_PREFIXED:
+        try:
+            header = await reader.readexactly(_HEADER.size)
+            return await reader.readexactly(_check_size(_HEADER.unpack(header)[0]))
+        except EOFError:
+            return None
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        # EOF; a last line without a newline is still returned
+        return e.partial or None
+    except asyncio.LimitOverrunError:
+        await _skip_line(reader)
+        raise FrameTooLarge("Message exceeds the line length limit")
+
+
+async def _skip_line(reader):
+    """Discard the rest of an overlong line, including its newline."""
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.LimitOverrunError as e:
+            # Drop what is buffered so far (up to the newline, if it was seen)
+            await reader.readexactly(e.consumed)
+        except asyncio.IncompleteReadError:
+            return
+
+
+def read_frame_sync(stream, framing: str) -> Optional[bytes]:
+    """Read one frame payload from a blocking binary stream. Returns None at EOF."""
+    if framing == FRAMING_LENGTH_PREFIXED:
+        header = _read_exactly(stream, _HEADER.size)
+        if header is None:
+            return None
+        payload = _read_exactly(stream, _check_size(_HEADER.unpack(header)[0]))
+        if payload is None:
+            raise TransportError("Stream closed in the middle of a frame")
+        return payload
+    line = stream.readline()
+    return line or None
+
+
+def _read_exactly(stream, size: int) -> Optional[bytes]:
+    """Read exactly ``size`` bytes (pipes may return short reads). None at clean EOF."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise TransportError("Stream closed in the middle of a frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def tool_result(value: Any) -> Dict[str, Any]:
+    """
+    Shape a tool's return value as an MCP ``tools/call`` result.
+
+    Every result has a text ``content`` block, for clients that only read
+    ``content``: plain strings as-is, anything else serialized as JSON.
+    Non-string values also go in ``structuredContent`` as ``{"result": value}``,
+    so clients that know it read typed data straight from the decoded message.
+    """
+    if isinstance(value, str):
+        return {"content": [{"type": "text", "text": value}]}
+    return {
+        "content": [{"type": "text", "text": json.dumps(value, separators=(",", ":"))}],
+        "structuredContent": {"result": value},
+    }
+
+
+def negotiate_request(request_id: Any, framings: List[str] = None,
+                      codecs: List[str] = None) -> Dict[str, Any]:
+    """Build the ``transport/negotiate`` request a client sends first."""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": NEGOTIATE_METHOD,
+        "params": {
+            "framing": framings or list(FRAMINGS),
+            "codecs": codecs or list(CODEC_PREFERENCE),
+        },
+    }
@@ -6,8 +6,19 @@ More reliable and easier to integrate with web applications.
 
 from flask import Flask, request, jsonify
 import datetime
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional, Union
 import threading
+from deadlines import DEADLINE_HEADER, expired, header_deadline
+from mcp_transport import tool_result
+
+try:
+    from waitress import serve as waitress_serve
+except ImportError:  # optional: keep-alive capable WSGI server
+    waitress_serve = None
+
+class InvalidParams(Exception):
+    """Raised by a tool when its arguments are invalid (HTTP 400)."""
 
 class NotificationServer:
     """Simple notification server with HTTP API."""
@@ -15,6 +26,12 @@ class NotificationServer:
     def __init__(self):
         # Mock notification history - in production this might be a real notification service
         self.notification_history = []
+        # Running totals by type and priority, so a history page can summarize the rest
+        self.type_counts: Counter = Counter()
+        self.priority_counts: Counter = Counter()
+        # The server handles requests on several threads (waitress, or Flask's
+        # threaded mode): the history and its totals change together under this
+        self.lock = threading.Lock()
         self.app = Flask(__name__)
         self.setup_routes()
     
@@ -24,12 +41,19 @@ class NotificationServer:
         @self.app.route('/health', methods=['GET'])
         def health():
             """Health check endpoint."""
-            return jsonify({"status": "healthy", "server": "NotificationServer"})
+            return jsonify({"status": "healthy", "server": "NotificationServer",
+                            "stateVersion": self.state_version})
         
         @self.app.route('/call/<tool_name>', methods=['POST'])
         def call_tool(tool_name):
             """Handle MCP tool calls via HTTP."""
             try:
+                # A malformed header is treated as absent, as the web app does
+                deadline = header_deadline(request.headers.get(DEADLINE_HEADER))
+                if expired(deadline):
+                    # The caller has already given up: don't do the work
+                    return jsonify({"error": "Request deadline exceeded"}), 504
+                
                 params = request.get_json() or {}
                 
                 # Call the appropriate tool
@@ -41,17 +65,25 @@ class NotificationServer:
                     task = params.get("task", "")
                     result = self.send_task_completion_notice(task)
                 elif tool_name == "get_notification_history":
-                    result = self.get_notification_history()
+                    result = self.get_notification_history(params.get("limit"), params.get("cursor"))
                 elif tool_name == "schedule_daily_summary":
                     result = self.schedule_daily_summary()
                 else:
                     return jsonify({"error": f"Tool not found: {tool_name}"}), 404
                 
-                return jsonify({"result": result})
+                # Keep the plain "result" key for clients that predate content/structuredContent
+                return jsonify(dict(tool_result(result), result=result, stateVersion=self.state_version))
                 
+            except InvalidParams as e:
+                return jsonify({"error": str(e)}), 400
             except Exception as e:
                 return jsonify({"error": f"Internal error: {str(e)}"}), 500
     
+    @property
+    def state_version(self) -> int:
+        """Grows with every notification recorded, so clients can tell when answers go stale."""
+        return len(self.notification_history)
+    
     def send_reminder(self, task: str, priority: str = "normal") -> str:
         """Send a mock reminder notification for a specific task."""
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -63,7 +95,7 @@ class NotificationServer:
             "timestamp": timestamp,
             "type": "reminder"
         }
-        self.notification_history.append(notification_record)
+        self._record(notification_record)
         
         return f"[{timestamp}] Reminder sent for task: '{task}' (Priority: {priority})"
     
@@ -77,13 +109,57 @@ class NotificationServer:
             "timestamp": timestamp,
             "type": "completion"
         }
-        self.notification_history.append(notification_record)
+        self._record(notification_record)
         
         return f"[{timestamp}] Task completion notice sent for: '{task}'"
     
-    def get_notification_history(self) -> List[Dict[str, Any]]:
-        """Retrieve the history of all sent notifications."""
-        return self.notification_history
+    def _record(self, notification_record: Dict[str, Any]):
+        """Append to the history and keep the running totals in step."""
+        with self.lock:
+            self.notification_history.append(notification_record)
+            self.type_counts[notification_record["type"]] += 1
+            if "priority" in notification_record:
+                self.priority_counts[notification_record["priority"]] += 1
+    
+    def get_notification_history(self, limit: Optional[int] = None,
+                                 cursor: Optional[str] = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Retrieve the history of sent notifications.
+        
+        Without ``limit`` the whole history is returned, oldest first. With
+        it, one page, newest first: {"notifications", "total", "counts",
+        "next_cursor"}. Pass ``next_cursor`` back as ``cursor`` to continue.
+        """
+        if limit is None:
+            with self.lock:
+                # A copy: the response is serialized after the lock is released
+                return list(self.notification_history)
+        if not isinstance(limit, int) or limit < 1:
+            raise InvalidParams("limit must be a positive integer")
+        # The cursor is the number of newest entries already returned. Entries
+        # added meanwhile push older ones down, so a page may repeat one or two
+        with self.lock:
+            history = self.notification_history
+            offset = self._decode_cursor(cursor, len(history)) if cursor else 0
+            end = max(0, len(history) - offset)
+            start = max(0, end - limit)
+            return {
+                "notifications": history[start:end][::-1],
+                "total": len(history),
+                "counts": {"type": dict(self.type_counts), "priority": dict(self.priority_counts)},
+                "next_cursor": str(offset + (end - start)) if start > 0 else None,
+            }
+    
+    @staticmethod
+    def _decode_cursor(cursor: Any, total: int) -> int:
+        """Offset encoded in a history cursor; InvalidParams if it is malformed or past the end."""
+        try:
+            offset = int(cursor)
+        except (TypeError, ValueError):
+            raise InvalidParams(f"Invalid cursor: {cursor!r}") from None
+        if not 0 <= offset <= total:
+            raise InvalidParams(f"Invalid cursor: {cursor!r}")
+        return offset
     
     def schedule_daily_summary(self) -> str:
         """Schedule a daily task summary notification (mock implementation)."""
@@ -94,13 +170,22 @@ class NotificationServer:
             "timestamp": timestamp,
             "status": "scheduled"
         }
-        self.notification_history.append(notification_record)
+        self._record(notification_record)
         
         return f"[{timestamp}] Daily task summary notification scheduled"
     
-    def run(self, host='localhost', port=8000):
-        """Run the HTTP server."""
-        self.app.run(host=host, port=port, debug=False, threaded=True)
+    def run(self, host='localhost', port=8000, threads=8):
+        """
+        Run the HTTP server.
+        
+        Uses waitress when installed: it keeps HTTP/1.1 connections alive, so
+        the agent's pooled client reuses them. Flask's development server
+        closes every connection after one response.
+        """
+        if waitress_serve is not None:
+            waitress_serve(self.app, host=host, port=port, threads=threads)
+        else:
+            self.app.run(host=host, port=port, debug=False, threaded=True)
 
 def run_server():
     """Run the notification server in a separate thread."""
@@ -0,0 +1,517 @@
+"""
+Sharded Task Database Pool
+Runs several Task Database Server workers and spreads namespaces over them.
+
+One task_db_server.py process is bound to one core (a single writer thread
+and the GIL), so the pool starts N of them, each with its own data
+directory, and routes every call by its namespace (the ``owner`` of the
+tasks: a user or tenant) with consistent hashing:
+
+- all of a namespace's tasks live on one shard, so routed calls stay a
+  single round trip and keep that shard's ordering guarantees
+- calls for different namespaces run on different processes in parallel
+- cross-shard reads (the global task count, the owner list) are sent to
+  every shard at once and merged (scatter-gather)
+- resizing moves only the namespaces whose shard changed on the ring
+  (about 1/N of them), shard to shard, instead of reloading every task
+- every shard numbers new tasks in its own ID range and a moved task is
+  imported under its ID with every field, so IDs stay valid across moves
+
+The namespace of a call is the one set with ``namespace_scope`` (for a
+caller with a stable user or tenant key), else the pool's default, which
+the agent shares for all of its tasks, so turning sharding on does not
+change which tasks anyone sees. Tasks an unsharded server kept in the data
+directory itself are moved into the pool, under the default namespace and
+with their IDs, the first time it starts. ``pool.json`` in the data directory records how many shard
+directories may hold tasks and the page a move is copying, so a restart with
+a different ``TASK_DB_SHARDS`` still finds every namespace, and a move cut
+short between copying a page and removing it from its source is finished
+instead of leaving the page on both shards.
+
+Every shard has its own ServerSupervisor (see mcp_supervisor.py): calls to
+a shard go through its circuit breaker and concurrency limit, a probe checks
+that the shard still answers, and a failing shard is restarted on its own
+while the others keep serving.
+
+ShardedTaskDB exposes the same start/is_running/call_tool/close surface as
+StdioMCPClient, so the agent can use either.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from mcp_clients import StdioMCPClient
+from mcp_supervisor import ServerSupervisor
+from task_journal import JOURNAL_PATTERN, LEGACY_SNAPSHOT_FILE, SNAPSHOT_FILE
+
+# Virtual nodes per shard; more points give a more even spread of namespaces
+DEFAULT_REPLICAS = 64
+# Tasks copied per list_tasks/import_tasks round trip when a namespace moves
+MOVE_PAGE_SIZE = 1000
+# IDs per shard: shard-N hands out IDs from (N + 1) * SHARD_ID_SPACE, above
+# those of an unsharded server, so a task keeps a unique ID wherever it moves
+SHARD_ID_SPACE = 10 ** 9
+# Pool state kept next to the shard directories
+STATE_FILE = "pool.json"
+# Seconds a shard has to answer its health probe
+PROBE_TIMEOUT = 1.0
+# Pseudo-shard for the tasks of an unsharded server in the data directory itself
+ROOT_SOURCE = "root"
+
+_namespace: ContextVar[Optional[str]] = ContextVar("task_db_namespace", default=None)
+
+
+@contextmanager
+def namespace_scope(namespace: Optional[str]) -> Iterator[Optional[str]]:
+    """Route the pool calls made in the block (and the tasks it starts) to ``namespace``."""
+    token = _namespace.set(namespace)
+    try:
+        yield namespace
+    finally:
+        _namespace.reset(token)
+
+
+def current_namespace() -> Optional[str]:
+    """The namespace set by the innermost ``namespace_scope``, or None."""
+    return _namespace.get()
+
+
+def stable_hash(key: str) -> int:
+    """64-bit hash that is the same in every process (unlike ``hash()``)."""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to node names."""
+
+    def __init__(self, nodes: List[str], replicas: int = DEFAULT_REPLICAS):
+        if not nodes:
+            raise ValueError("a hash ring needs at least one node")
+        self.nodes = list(nodes)
+        self.replicas = replicas
+        points = sorted(
+            (stable_hash(f"{node}#{replica}"), node)
+            for node in self.nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """The node owning ``key``: the first ring point clockwise of its hash."""
+        index = bisect(self._hashes, stable_hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardedTaskDB:
+    """Pool of Task Database Server processes with namespace routing."""
+
+    def __init__(self, shard_count: int, data_dir: str, namespace: str = "default",
+                 timeout: float = 5.0, command: Optional[List[str]] = None,
+                 monitor_interval: float = 5.0, max_concurrency: Optional[int] = None):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.shard_count = shard_count
+        self.data_dir = data_dir
+        # Namespace used when a call does not name one
+        self.namespace = namespace
+        self.timeout = timeout
+        self.command = command or ["python", "task_db_server.py"]
+        self.ring = HashRing(self._shard_names(shard_count))
+        self.shards: Dict[str, StdioMCPClient] = {}
+        # One breaker, restart loop and concurrency limit per shard
+        self.supervisors: Dict[str, ServerSupervisor] = {}
+        self.monitor_interval = monitor_interval
+        self.max_concurrency = max_concurrency
+        self._monitoring = False
+        # Namespaces already moved during a resize, routed ahead of the ring
+        self._placement: Dict[str, str] = {}
+        # Namespaces being moved; their calls wait until the move finishes
+        self._moving: Dict[str, asyncio.Event] = {}
+        self._inflight: Dict[str, int] = {}
+        # Per-shard storeVersion high-water marks, folded into one pool version
+        self._versions: Dict[str, int] = {}
+        self._version_offset = 0
+        self._resize_lock: Optional[asyncio.Lock] = None
+        self.moved_namespaces = 0
+        self.moved_tasks = 0
+        # Merged initialize results and start() phase timings, like StdioMCPClient's
+        self.server_info: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+
+    @staticmethod
+    def _shard_names(count: int) -> List[str]:
+        return [f"shard-{index}" for index in range(count)]
+
+    @property
+    def is_running(self) -> bool:
+        """True once started; dead shards are restarted on their next call."""
+        return bool(self.shards)
+
+    @property
+    def version(self) -> int:
+        """Pool-wide store version: grows whenever any shard's store changes."""
+        return self._version_offset + sum(self._versions.values())
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.data_dir, STATE_FILE)) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, **changes):
+        """Update pool.json atomically (write a temporary file, then rename it)."""
+        state = dict(self._load_state(), **changes)
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = os.path.join(self.data_dir, STATE_FILE)
+        with open(path + ".tmp", "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(path + ".tmp", path)
+
+    def _client(self, name: str) -> StdioMCPClient:
+        if name == ROOT_SOURCE:
+            # Keeps the unsharded server's own ID counter
+            return StdioMCPClient(self.command + ["--data-dir", self.data_dir], timeout=self.timeout)
+        id_base = (int(name.rsplit("-", 1)[1]) + 1) * SHARD_ID_SPACE
+        return StdioMCPClient(
+            self.command + ["--data-dir", os.path.join(self.data_dir, name), "--id-base", str(id_base)],
+            timeout=self.timeout
+        )
+
+    def _has_root_data(self) -> bool:
+        """True if an unsharded server left tasks (journal, snapshot or tasks.db) in the data directory."""
+        try:
+            names = os.listdir(self.data_dir)
+        except OSError:
+            return False
+        return any(
+            name in (SNAPSHOT_FILE, LEGACY_SNAPSHOT_FILE, "tasks.db") or JOURNAL_PATTERN.match(name)
+            for name in names
+        )
+
+    async def _start_shard(self, name: str):
+        client = self._client(name)
+        await client.start()
+        self.shards[name] = client
+        # A fresh process counts from zero; keep the pool version moving forward
+        self._version_offset += self._versions.pop(name, 0) + 1
+
+    def _supervisor(self, name: str) -> ServerSupervisor:
+        supervisor = self.supervisors.get(name)
+        if supervisor is None:
+            supervisor = self.supervisors[name] = ServerSupervisor(
+                f"Task DB {name}",
+                restart=partial(self._restart_shard, name),
+                probe=partial(self._probe_shard, name),
+                monitor_interval=self.monitor_interval,
+                max_concurrency=self.max_concurrency
+            )
+            if self._monitoring:
+                supervisor.start_monitor()
+        return supervisor
+
+    async def _restart_shard(self, name: str):
+        """Replace one shard's process (run by that shard's supervisor, with backoff)."""
+        client = self.shards.pop(name, None)
+        if client is not None:
+            try:
+                await client.close()
+            except Exception:
+                pass
+        await self._start_shard(name)
+        print(f"✅ Task DB {name} restarted")
+
+    async def _probe_shard(self, name: str) -> bool:
+        """True if the shard's process is alive and answers a count within PROBE_TIMEOUT."""
+        client = self.shards.get(name)
+        if client is None or not client.is_running:
+            return False
+        response = await client.call_tool("get_task_count", timeout=PROBE_TIMEOUT)
+        return "result" in response
+
+    def start_monitor(self):
+        """Probe every shard periodically in the background (see ServerSupervisor)."""
+        self._monitoring = True
+        for name in self.shards:
+            self._supervisor(name).start_monitor()
+
+    async def stop_monitor(self):
+        """Cancel every shard's monitor and any restart in progress."""
+        self._monitoring = False
+        await asyncio.gather(*(supervisor.stop() for supervisor in self.supervisors.values()))
+
+    async def start(self):
+        """
+        Start every shard concurrently, then move any misplaced namespaces.
+
+        Shards a previous run had beyond ``shard_count`` are started too, as
+        sources only: their namespaces are moved onto the ring, then they are
+        shut down. So is an unsharded server's data directory the first time:
+        its namespaces move like any others, and its unowned tasks join the
+        default namespace. An interrupted move is finished first.
+        """
+        self._resize_lock = asyncio.Lock()
+        started = time.perf_counter()
+        state = self._load_state()
+        known = self._shard_names(max(state.get("shards", 0), self.shard_count))
+        if not state.get("root_migrated") and self._has_root_data():
+            known.append(ROOT_SOURCE)
+        move = state.get("move") or {}
+        names = list(dict.fromkeys(known + [name for name in (move.get("source"), move.get("target")) if name]))
+        await asyncio.gather(*(self._start_shard(name) for name in names))
+        shards_ready = time.perf_counter()
+        async with self._resize_lock:
+            await self._recover_move(move)
+            await self._rebalance(self.ring)
+            if ROOT_SOURCE in self.shards:
+                # Only unowned tasks are left on the root once its namespaces moved
+                await self._move(self.namespace, ROOT_SOURCE, self.node_for(self.namespace), adopt=True)
+            await self._retire([name for name in names if name not in self.ring.nodes])
+            self._save_state(shards=self.shard_count, root_migrated=True)
+        finished = time.perf_counter()
+        self.server_info = {
+            "shards": len(self.shards),
+            "taskCount": sum(client.server_info.get("taskCount", 0) for client in self.shards.values()),
+        }
+        self.timings = {
+            # Shards start in parallel, so the slowest one sets the pace
+            "slowest_shard_ms": max(client.timings["total_ms"] for client in self.shards.values()),
+            "shards_ms": round((shards_ready - started) * 1000, 1),
+            "rebalance_ms": round((finished - shards_ready) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+        }
+
+    def node_for(self, namespace: str) -> str:
+        """Shard currently serving ``namespace``."""
+        return self._placement.get(namespace) or self.ring.node_for(namespace)
+
+    def _shard(self, name: str) -> StdioMCPClient:
+        """
+        The shard's client.
+
+        Raises ConnectionError if its process died, which opens that shard's
+        circuit: its supervisor restarts it while the other shards keep serving.
+        """
+        client = self.shards.get(name)
+        if client is None or not client.is_running:
+            raise ConnectionError(f"Task DB {name} is not running")
+        return client
+
+    async def _call_shard(self, node: str, name: str, arguments: Optional[Dict[str, Any]] = None,
+                          timeout: Optional[float] = None,
+                          on_notification: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """One tool call to a shard, through that shard's supervisor."""
+        response = await self._supervisor(node).call(
+            lambda: self._shard(node).call_tool(name, arguments, timeout, on_notification)
+        )
+        return self._observe(node, response)
+
+    def _observe(self, name: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace a shard's storeVersion with the pool version it corresponds to."""
+        result = response.get("result")
+        if not isinstance(result, dict) or "storeVersion" not in result:
+            return response
+        shard_version = result["storeVersion"]
+        latest = self._versions.get(name, 0)
+        if shard_version > latest:
+            self._versions[name] = latest = shard_version
+        # A read that raced with a write reports an older version, never a newer one
+        result["storeVersion"] = self.version - (latest - shard_version)
+        return response
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None,
+                        on_notification: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Invoke a tool on the shard owning ``namespace``.
+
+        Without one, the call uses the namespace of the current
+        ``namespace_scope``, then the pool's default. The namespace is passed
+        to the server as ``owner``, so lookups, counts and removals never see
+        another namespace's tasks and new tasks are stored under it.
+        """
+        namespace = namespace or current_namespace() or self.namespace
+        arguments = dict(arguments or {}, owner=namespace)
+        if name == "add_tasks":
+            arguments["tasks"] = [
+                dict(item, owner=namespace) if isinstance(item, dict) else {"task": item, "owner": namespace}
+                for item in arguments.get("tasks", [])
+            ]
+
+        moving = self._moving.get(namespace)
+        if moving is not None:
+            await moving.wait()
+        node = self.node_for(namespace)
+        self._inflight[namespace] = self._inflight.get(namespace, 0) + 1
+        try:
+            return await self._call_shard(node, name, arguments, timeout, on_notification)
+        finally:
+            self._inflight[namespace] -= 1
+            if not self._inflight[namespace]:
+                del self._inflight[namespace]
+
+    async def scatter(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Send one tool call to every shard concurrently. Returns {shard: response}."""
+        names = list(self.ring.nodes)
+        responses = await asyncio.gather(*(self._call_shard(node, name, arguments, timeout) for node in names))
+        return dict(zip(names, responses))
+
+    @staticmethod
+    def _value(response: Dict[str, Any]) -> Any:
+        if "error" in response:
+            raise RuntimeError(response["error"].get("message", "Task DB error"))
+        result = response["result"]
+        if "structuredContent" in result:
+            return result["structuredContent"]["result"]
+        return result["content"][0]["text"]
+
+    async def total_count(self) -> int:
+        """Number of tasks across every shard and namespace."""
+        responses = await self.scatter("get_task_count")
+        return sum(self._value(response) for response in responses.values())
+
+    async def owners(self) -> Dict[str, Dict[str, Any]]:
+        """Task count and shard of every namespace in the pool."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for node, response in (await self.scatter("list_owners")).items():
+            for owner, count in self._value(response).items():
+                entry = merged.setdefault(owner, {"tasks": 0, "shards": []})
+                entry["tasks"] += count
+                entry["shards"].append(node)
+        return merged
+
+    async def resize(self, shard_count: int):
+        """
+        Change the number of shards.
+
+        New shards are started first; then only the namespaces whose ring
+        position changed are moved, and shards left empty are shut down.
+        Calls for a namespace wait while it is being moved; all others keep
+        running.
+        """
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        async with self._resize_lock:
+            ring = HashRing(self._shard_names(shard_count), self.ring.replicas)
+            # Until the moves are done, tasks may be on either ring's shards
+            self._save_state(shards=max(len(self.shards), shard_count))
+            added = [name for name in ring.nodes if name not in self.shards]
+            await asyncio.gather(*(self._start_shard(name) for name in added))
+            await self._rebalance(ring)
+            retired = [name for name in self.ring.nodes if name not in ring.nodes]
+            self.ring, self.shard_count = ring, shard_count
+            self._placement.clear()
+            await self._retire(retired)
+            self._save_state(shards=shard_count)
+
+    async def _retire(self, names: List[str]):
+        """Shut down shards that are off the ring (their namespaces have moved)."""
+        for name in names:
+            supervisor = self.supervisors.pop(name, None)
+            if supervisor is not None:
+                await supervisor.stop()
+            client = self.shards.pop(name, None)
+            if client is not None:
+                await client.close()
+            self._version_offset += self._versions.pop(name, 0)
+
+    async def _rebalance(self, ring: HashRing):
+        """Move every namespace that is not on its ``ring`` shard."""
+        # Shards of the old ring, plus any new ones already started
+        for source in list(self.shards):
+            listed = self._value(await self._shard(source).call_tool("list_owners"))
+            for namespace in listed:
+                target = ring.node_for(namespace)
+                if target != source:
+                    await self._move(namespace, source, target)
+
+    async def _move(self, namespace: str, source: str, target: str, adopt: bool = False):
+        """
+        Copy a namespace's tasks to ``target`` page by page, removing each page from ``source``.
+
+        Each page is imported under its IDs with every field (``created_at``
+        included), so IDs held by users or the agent keep pointing at the
+        same tasks. Before a page is copied, pool.json records its IDs, so
+        _recover_move can tell whether the copy landed if the move stops
+        before the removal. With ``adopt``, every task left on ``source`` is
+        copied and stored under ``namespace`` (used for the unowned root tasks).
+        """
+        done = self._moving[namespace] = asyncio.Event()
+        try:
+            while self._inflight.get(namespace):
+                await asyncio.sleep(0.005)
+            source_client, target_client = self._shard(source), self._shard(target)
+            while True:
+                query = {"limit": MOVE_PAGE_SIZE} if adopt else {"owner": namespace, "limit": MOVE_PAGE_SIZE}
+                page = self._value(await source_client.call_tool("list_tasks", query))
+                if not page["tasks"]:
+                    break
+                if adopt:
+                    page["tasks"] = [dict(task, owner=namespace) for task in page["tasks"]]
+                ids = [task["id"] for task in page["tasks"]]
+                self._save_state(move={"namespace": namespace, "source": source, "target": target, "ids": ids})
+                imported = self._observe(target, await target_client.call_tool(
+                    "import_tasks", {"tasks": page["tasks"]}
+                ))
+                # Raises (leaving the page on the source) if the target refused it
+                self._value(imported)
+                self._observe(source, await source_client.call_tool("remove_tasks", {"tasks": ids}))
+                self._save_state(move=None)
+                self.moved_tasks += len(ids)
+            self._placement[namespace] = target
+            self.moved_namespaces += 1
+        finally:
+            del self._moving[namespace]
+            done.set()
+
+    async def _recover_move(self, move: Dict[str, Any]):
+        """
+        Finish the page a move was copying when it stopped.
+
+        Copying and removing a page are each one storage operation and tasks
+        keep their IDs, so finding the page's IDs on the target shows the copy
+        landed. If it did, the page is removed from the source (IDs are never
+        reused, so removing them again is harmless); if not, the source still
+        has every task. Either way the namespace is then on exactly one shard
+        per task, and the rebalance that follows moves the rest.
+        """
+        if not move:
+            return
+        namespace, source, target = move["namespace"], move["source"], move["target"]
+        found = self._value(await self._shard(target).call_tool(
+            "get_tasks_by_ids", {"ids": move["ids"], "owner": namespace}
+        ))
+        if found and all(record["found"] for record in found):
+            await self._shard(source).call_tool("remove_tasks", {"tasks": move["ids"]})
+            print(f"🔁 Finished moving {len(move['ids'])} tasks of '{namespace}' from {source} to {target}")
+        self._save_state(move=None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool shape and rebalancing counters for health reporting."""
+        return {
+            "shards": len(self.shards),
+            "running": sum(1 for client in self.shards.values() if client.is_running),
+            "namespace": self.namespace,
+            "namespace_shard": self.node_for(self.namespace),
+            "moved_namespaces": self.moved_namespaces,
+            "moved_tasks": self.moved_tasks,
+            "store_version": self.version,
+            "supervisors": {name: supervisor.stats() for name, supervisor in self.supervisors.items()},
+        }
+
+    async def close(self, keep_spare: bool = False):
+        """Stop the shard monitors and shut every shard down (``keep_spare`` is passed on to each client)."""
+        await self.stop_monitor()
+        shards, self.shards = list(self.shards.values()), {}
+        await asyncio.gather(*(client.close(keep_spare=keep_spare) for client in shards),
+                             return_exceptions=True)
@@ -2,41 +2,237 @@
 Simplified Task Database MCP Server
 Handles task storage operations with direct JSON-RPC over STDIO.
 More reliable than FastMCP for web application integration.
+
+The wire format starts as newline-delimited JSON; clients can negotiate
+length-prefixed binary frames and a faster codec (see mcp_transport.py).
+Storage is loaded before the first request is read, so the reply to the MCP
+``initialize`` request tells the client the server is ready.
+
+Requests are pipelined: an asyncio loop keeps reading STDIN while earlier
+requests are still running, and each response is written as soon as its
+request finishes, tagged with the request's own JSON-RPC id. Cheap tools are
+answered inline on the loop; storage reads run on a worker pool and
+mutations on a single writer thread, so they apply in arrival order.
 """
 
+import argparse
+import asyncio
+import base64
+import binascii
 import json
+import os
+import signal
 import sys
 import threading
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional
+from task_store import PRIORITIES, STATUSES, TASK_FIELDS, TaskStore, normalize_due, normalize_fields
+from task_journal import TaskJournal
+from task_store_sqlite import SQLiteTaskStore
+from deadlines import DEADLINE_EXCEEDED_CODE, expired, request_deadline
+from mcp_transport import (
+    ACTIVATE_METHOD, CANCELLED_NOTIFICATION, FRAMING_NDJSON, INITIALIZE_METHOD, INITIALIZED_NOTIFICATION, MCP_PROTOCOL_VERSION,
+    NEGOTIATE_METHOD, FrameTooLarge, JsonCodec, TransportError,
+    choose_mode, encode_frame, get_codec, read_frame, read_frame_sync, tool_result
+)
+
+STORAGE_BACKENDS = ("memory", "sqlite")
+SERVER_INFO = {"name": "task-database", "version": "1.0"}
+
+# Page size limits for list_tasks / list_tasks_stream
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Longest NDJSON request line; longer ones are skipped and answered with an error
+MAX_LINE_SIZE = 2 ** 24
+# Result limits for search_tasks
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 100
+
+# Tools answered directly on the event loop (O(1), never touch storage I/O);
+# owner-scoped calls may query storage, so they go to the read pool instead
+INLINE_TOOLS = {"get_task_count"}
+# Tools that mutate storage; run one at a time, in the order they arrived
+MUTATING_TOOLS = {"add_task", "remove_task", "add_tasks", "remove_tasks", "update_task", "import_tasks"}
+# JSON-RPC error code for requests the client cancelled before they started
+REQUEST_CANCELLED_CODE = -32800
+# Optional list_tasks / list_tasks_stream arguments that narrow the listing
+LIST_FILTERS = ("contains", "status", "priority", "owner")
+
+def open_task_store(backend: str = "memory", data_dir: Optional[str] = None):
+    """
+    Create the storage engine for the server.
+    
+    - memory: indexed in-memory TaskStore, journaled to ``data_dir`` if given
+    - sqlite: SQLiteTaskStore in ``data_dir/tasks.db`` (in-memory DB if no data_dir)
+    """
+    if backend == "sqlite":
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            return SQLiteTaskStore(os.path.join(data_dir, "tasks.db"))
+        return SQLiteTaskStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown storage backend: {backend}")
+    
+    store = TaskStore()
+    if data_dir:
+        # Replay snapshot + journal, then journal every mutation
+        TaskJournal(data_dir, store).open()
+    return store
+
+class InvalidParams(Exception):
+    """Raised by a tool when its arguments are invalid (JSON-RPC -32602)."""
+
+def encode_cursor(after_id: int) -> str:
+    """Encode a continuation position as an opaque cursor string."""
+    raw = json.dumps({"after": after_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a cursor from encode_cursor(). A missing cursor starts from the beginning."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidParams(f"Invalid cursor: {cursor}")
+    if not isinstance(after_id, int):
+        raise InvalidParams(f"Invalid cursor: {cursor}")
+    return after_id
 
 class TaskDatabaseServer:
     """Simple task database server with JSON-RPC over STDIO."""
     
-    def __init__(self):
-        # Mock task storage - in production this would be a real database
-        self.tasks = []
+    def __init__(self, backend: str = "memory", data_dir: Optional[str] = None, workers: int = 4,
+                 id_base: Optional[int] = None):
+        # Pluggable task storage (stable IDs, exact + partial match)
+        self.tasks = open_task_store(backend, data_dir)
+        if id_base:
+            # A pool shard numbers its tasks in its own range, so IDs stay
+            # unique when tasks move between shards
+            self.tasks.reserve_ids(id_base)
+        self.workers = workers
+        # Wire format; starts as newline-delimited JSON until a client negotiates
+        self.framing = FRAMING_NDJSON
+        self.codec = JsonCodec
+        # Bumped after every mutating tool call that changed the store and reported
+        # with each tools/call result as ``storeVersion``, so clients can tell when
+        # cached reads go stale
+        self.store_version = 0
+        # IDs of requests received but not finished, and those the client cancelled
+        self.in_flight_ids = set()
+        self.cancelled_ids = set()
+        # Requests skipped because they expired or were cancelled before running
+        self.dropped_requests = 0
         
-    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle incoming JSON-RPC requests."""
+    def handle_request(self, request: Dict[str, Any], emit: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
+        """
+        Handle incoming JSON-RPC requests.
+        
+        ``emit`` sends intermediate messages (streamed chunks) ahead of the
+        final response; it defaults to writing straight to STDOUT.
+        """
         try:
             method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id", 1)
+            params = request.get("params") or {}
+            request_id = request.get("id")
+            if not isinstance(params, dict):
+                raise InvalidParams("params must be an object")
+            
+            # Work nobody is waiting for any more (checked again here because a
+            # request may have sat in a worker queue since it arrived)
+            if request_id is not None and request_id in self.cancelled_ids:
+                self.dropped_requests += 1
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": REQUEST_CANCELLED_CODE, "message": "Request cancelled"}
+                }
+            if expired(request_deadline(params)):
+                self.dropped_requests += 1
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": DEADLINE_EXCEEDED_CODE, "message": "Request deadline exceeded"}
+                }
             
             # Route to appropriate method
-            if method == "tools/call":
+            if method == INITIALIZE_METHOD:
+                return {"jsonrpc": "2.0", "id": request_id, "result": self.initialize()}
+            elif method == INITIALIZED_NOTIFICATION:
+                return None
+            elif method == "tools/call":
                 tool_name = params.get("name")
-                tool_args = params.get("arguments", {})
+                tool_args = params.get("arguments") or {}
+                if not isinstance(tool_args, dict):
+                    raise InvalidParams("arguments must be an object")
+                # Taken before a read runs: a write racing with it can only make
+                # the reported version older than the data, never newer
+                version = self.store_version
+                changes = self.tasks.changes
+                # Optional namespace: scopes lookups, counts and removals to one owner
+                owner = self._owner(tool_args)
                 
                 # Call the appropriate tool
                 if tool_name == "list_tasks":
-                    result = self.list_tasks()
+                    result = self.list_tasks(
+                        tool_args.get("limit", DEFAULT_PAGE_SIZE),
+                        tool_args.get("cursor"),
+                        bool(tool_args.get("with_counts")),
+                        **self._list_filters(tool_args)
+                    )
+                elif tool_name == "list_tasks_stream":
+                    result = self.list_tasks_stream(
+                        request_id,
+                        emit or self._send,
+                        tool_args.get("chunk_size", DEFAULT_PAGE_SIZE),
+                        **self._list_filters(tool_args)
+                    )
+                elif tool_name == "list_tasks_due_before":
+                    result = self.list_tasks_due_before(
+                        tool_args.get("before"),
+                        tool_args.get("limit", DEFAULT_PAGE_SIZE),
+                        tool_args.get("include_done", False),
+                        owner
+                    )
+                elif tool_name == "list_tasks_by_priority":
+                    result = self.list_tasks_by_priority(
+                        tool_args.get("priority"),
+                        tool_args.get("limit", DEFAULT_PAGE_SIZE),
+                        tool_args.get("cursor"),
+                        owner
+                    )
                 elif tool_name == "add_task":
-                    result = self.add_task(tool_args.get("task", ""))
+                    result = self.add_task(
+                        tool_args.get("task", ""),
+                        **{name: tool_args[name] for name in TASK_FIELDS if name in tool_args}
+                    )
+                elif tool_name == "update_task":
+                    result = self.update_task(tool_args.get("id"), tool_args.get("fields") or {}, owner)
                 elif tool_name == "remove_task":
-                    result = self.remove_task(tool_args.get("task", ""))
+                    result = self.remove_task(
+                        tool_args.get("task", ""), tool_args.get("id"), owner, bool(tool_args.get("partial"))
+                    )
+                elif tool_name == "add_tasks":
+                    result = self.add_tasks(tool_args.get("tasks", []))
+                elif tool_name == "import_tasks":
+                    result = self.import_tasks(tool_args.get("tasks", []))
+                elif tool_name == "remove_tasks":
+                    result = self.remove_tasks(tool_args.get("tasks", []), owner, bool(tool_args.get("partial")))
+                elif tool_name == "get_tasks_by_ids":
+                    result = self.get_tasks_by_ids(tool_args.get("ids", []), owner)
+                elif tool_name == "find_tasks":
+                    result = self.find_tasks(tool_args.get("query", ""), tool_args.get("limit", 20), owner)
+                elif tool_name == "search_tasks":
+                    result = self.search_tasks(
+                        tool_args.get("query", ""),
+                        tool_args.get("limit", DEFAULT_SEARCH_RESULTS),
+                        owner
+                    )
                 elif tool_name == "get_task_count":
-                    result = self.get_task_count()
+                    result = self.get_task_count(owner)
+                elif tool_name == "list_owners":
+                    result = self.list_owners()
                 else:
                     return {
                         "jsonrpc": "2.0",
@@ -44,12 +240,16 @@ class TaskDatabaseServer:
                         "error": {"code": -32601, "message": f"Method not found: {tool_name}"}
                     }
                 
+                if tool_name in MUTATING_TOOLS and self.tasks.changes != changes:
+                    # Mutations run one at a time on the writer thread, so the
+                    # store's change count moved only if this call changed it
+                    self.store_version += 1
+                    version = self.store_version
+                
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
-                    "result": {
-                        "content": [{"type": "text", "text": str(result)}]
-                    }
+                    "result": dict(tool_result(result), storeVersion=version)
                 }
             else:
                 return {
@@ -58,69 +258,590 @@ class TaskDatabaseServer:
                     "error": {"code": -32601, "message": f"Method not found: {method}"}
                 }
                 
+        except InvalidParams as e:
+            return {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {"code": -32602, "message": f"Invalid params: {str(e)}"}
+            }
         except Exception as e:
             return {
                 "jsonrpc": "2.0",
-                "id": request.get("id", 1),
+                "id": request.get("id"),
                 "error": {"code": -32603, "message": f"Internal error: {str(e)}"}
             }
     
-    def list_tasks(self) -> List[str]:
-        """List all tasks currently stored in the database."""
-        return self.tasks
+    def initialize(self) -> Dict[str, Any]:
+        """
+        Answer the MCP ``initialize`` handshake.
+        
+        Storage (journal replay, SQLite open) is fully loaded before the
+        server reads its first request, so this reply is the readiness
+        signal: a client can call tools as soon as it arrives.
+        """
+        return {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "serverInfo": SERVER_INFO,
+            "capabilities": {"tools": {}},
+            "ready": True,
+            "taskCount": len(self.tasks),
+            "storeVersion": self.store_version
+        }
     
-    def add_task(self, task: str) -> str:
-        """Add a new task to the database."""
+    def _owner(self, tool_args: Dict[str, Any]) -> Optional[str]:
+        """Validate the optional ``owner`` scope of a tool call."""
+        owner = tool_args.get("owner")
+        if owner is not None and not isinstance(owner, str):
+            raise InvalidParams("owner must be a string")
+        return owner or None
+    
+    def _owned(self, task_id: Any, owner: Optional[str]) -> bool:
+        """True when the task exists and belongs to ``owner`` (any owner when None)."""
+        if owner is None:
+            return True
+        record = self.tasks.get_records([task_id])[0]
+        return record is not None and record["owner"] == owner
+    
+    def _list_filters(self, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick and validate the listing filters present in a tool call."""
+        filters = {name: tool_args[name] for name in LIST_FILTERS if tool_args.get(name)}
+        if "status" in filters and filters["status"] not in STATUSES:
+            raise InvalidParams(f"status must be one of {', '.join(STATUSES)}")
+        if "priority" in filters and filters["priority"] not in PRIORITIES:
+            raise InvalidParams(f"priority must be one of {', '.join(PRIORITIES)}")
+        return filters
+    
+    def list_tasks(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                   with_counts: bool = False, **filters) -> Dict[str, Any]:
+        """
+        List one page of tasks, oldest first.
+        
+        Returns the page plus ``next_cursor``: pass it back as ``cursor`` to
+        continue, or stop when it is None. Optional filters: ``contains``
+        (case-insensitive substring), ``status``, ``priority`` and ``owner``.
+        ``total`` counts every task passing the filters, across all pages.
+        With ``with_counts`` the result also has ``counts``: the same tasks
+        broken down by status and by priority, so a caller showing one page
+        can still summarize the rest.
+        """
+        if not isinstance(limit, int) or limit < 1:
+            raise InvalidParams("limit must be a positive integer")
+        limit = min(limit, MAX_PAGE_SIZE)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = self.tasks.page(decode_cursor(cursor), limit + 1, **filters)
+        page = rows[:limit]
+        result = {
+            "tasks": page,
+            "next_cursor": encode_cursor(page[-1]["id"]) if len(rows) > limit else None,
+            "total": self.tasks.count_matching(**filters)
+        }
+        if with_counts:
+            result["counts"] = self.tasks.breakdown(filters.get("owner"))
+        return result
+    
+    def list_tasks_by_priority(self, priority: str, limit: int = DEFAULT_PAGE_SIZE,
+                               cursor: Optional[str] = None, owner: Optional[str] = None) -> Dict[str, Any]:
+        """List one page of tasks with the given priority (served from the priority index)."""
+        if priority not in PRIORITIES:
+            raise InvalidParams(f"priority must be one of {', '.join(PRIORITIES)}")
+        if owner is not None:
+            return self.list_tasks(limit, cursor, priority=priority, owner=owner)
+        return self.list_tasks(limit, cursor, priority=priority)
+    
+    def list_tasks_due_before(self, before: str, limit: int = DEFAULT_PAGE_SIZE,
+                              include_done: bool = False, owner: Optional[str] = None) -> Dict[str, Any]:
+        """List tasks due before an ISO date, soonest first (served from the due-date index)."""
+        try:
+            before = normalize_due(before)
+        except ValueError as e:
+            raise InvalidParams(str(e))
+        if before is None:
+            raise InvalidParams("before is required")
+        if not isinstance(limit, int) or limit < 1:
+            raise InvalidParams("limit must be a positive integer")
+        tasks = self.tasks.due_before(before, min(limit, MAX_PAGE_SIZE), bool(include_done), owner)
+        return {"tasks": tasks, "before": before}
+    
+    def list_tasks_stream(self, request_id: Any, emit: Callable, chunk_size: int = DEFAULT_PAGE_SIZE,
+                          **filters) -> str:
+        """
+        Stream every task as a series of chunk notifications, then finish.
+        
+        Each chunk is sent as a ``notifications/tasks/chunk`` message carrying
+        ``requestId`` so the client can route it; only one chunk is held in
+        memory at a time. The final response reports how much was sent.
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise InvalidParams("chunk_size must be a positive integer")
+        chunk_size = min(chunk_size, MAX_PAGE_SIZE)
+        
+        after_id, chunks, sent = 0, 0, 0
+        while True:
+            rows = self.tasks.page(after_id, chunk_size, **filters)
+            if not rows:
+                break
+            emit({
+                "jsonrpc": "2.0",
+                "method": "notifications/tasks/chunk",
+                "params": {
+                    "requestId": request_id,
+                    "chunk": chunks,
+                    "tasks": rows
+                }
+            })
+            chunks += 1
+            sent += len(rows)
+            after_id = rows[-1]["id"]
+            if len(rows) < chunk_size:
+                break
+        return f"Streamed {sent} tasks in {chunks} chunks."
+    
+    def add_task(self, task: str, **fields) -> str:
+        """Add a new task (optionally with status, priority, due, owner, tags)."""
         if task and task.strip():
-            self.tasks.append(task.strip())
-            return f"Task '{task}' added successfully."
+            try:
+                fields = normalize_fields(fields)
+            except ValueError as e:
+                raise InvalidParams(str(e))
+            task_id = self.tasks.add(task.strip(), **fields)
+            return f"Task '{task}' added successfully (ID {task_id})."
         return "Cannot add empty task."
     
-    def remove_task(self, task: str) -> str:
-        """Remove a task from the database if it exists."""
-        if task in self.tasks:
-            self.tasks.remove(task)
-            return f"Task '{task}' removed successfully."
-        else:
-            return f"Task '{task}' not found in the database."
+    def update_task(self, task_id: int, fields: Dict[str, Any], owner: Optional[str] = None) -> Dict[str, Any]:
+        """Change status, priority, due, owner or tags of a task. Returns the updated record."""
+        if not isinstance(task_id, int):
+            raise InvalidParams("id must be an integer")
+        if not isinstance(fields, dict) or not fields:
+            raise InvalidParams("fields must be a non-empty object")
+        try:
+            fields = normalize_fields(fields, partial=True)
+        except ValueError as e:
+            raise InvalidParams(str(e))
+        record = self.tasks.update(task_id, **fields) if self._owned(task_id, owner) else None
+        if record is None:
+            raise InvalidParams(f"Task {task_id} not found")
+        return record
+    
+    def _resolve_removal(self, task: str, owner: Optional[str], partial: bool):
+        """
+        Find the one task a removal by text refers to. Returns (task_id, error).
+        
+        Exact text only, unless ``partial`` is set: then a case-insensitive
+        partial match is accepted, but only when exactly one task matches.
+        """
+        task_id = self.tasks.find_exact(task, owner) if task else None
+        if task_id is not None or not task or not partial:
+            return task_id, None
+        matches = self.tasks.find_partial(task, limit=2, owner=owner)
+        if len(matches) > 1:
+            return None, f"'{task}' matches several tasks; remove it by ID or exact text."
+        return (matches[0], None) if matches else (None, None)
+    
+    def remove_task(self, task: str, task_id: int = None, owner: Optional[str] = None,
+                    partial: bool = False) -> str:
+        """
+        Remove a task from the database if it exists.
+        
+        The task is looked up by ID when one is given, otherwise by exact
+        text. With ``partial`` a case-insensitive partial match is used when
+        no text matches exactly, provided it matches exactly one task.
+        With ``owner`` only that owner's tasks are considered.
+        """
+        if task_id is not None and not isinstance(task_id, int):
+            raise InvalidParams("id must be an integer")
+        with self.tasks.lock:
+            error = None
+            if task_id is None:
+                task_id, error = self._resolve_removal(task, owner, partial)
+            elif not self._owned(task_id, owner):
+                task_id = None
+            removed = self.tasks.remove(task_id) if task_id is not None else None
+        if removed is not None:
+            return f"Task '{removed}' removed successfully."
+        return error or f"Task '{task or task_id}' not found in the database."
+    
+    def add_tasks(self, tasks: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Add many tasks in one storage operation. Returns one result per item.
+        
+        Each item is a task text, or an object with ``task`` plus any of the
+        add_task fields.
+        """
+        entries, results = [], []
+        for item in tasks:
+            fields = dict(item) if isinstance(item, dict) else {}
+            text = fields.pop("task", None) if isinstance(item, dict) else item
+            text = text.strip() if isinstance(text, str) else ""
+            if not text:
+                results.append({"task": text, "error": "Cannot add empty task."})
+                continue
+            try:
+                entries.append((text, normalize_fields(fields)))
+            except ValueError as e:
+                results.append({"task": text, "error": str(e)})
+                continue
+            results.append({"task": text})
+        
+        ids = iter(self.tasks.add_many(entries))
+        for result in results:
+            if "error" not in result:
+                result["id"] = next(ids)
+        return results
+    
+    def import_tasks(self, tasks: List[Any]) -> int:
+        """
+        Store task records moved from another server under their own IDs.
+        
+        Each item is a record as returned by list_tasks (``id``, ``task`` and
+        the task fields, ``created_at`` included), so a moved task keeps its
+        ID and every field. All or nothing: an invalid record or an ID already
+        in use fails the call and stores none of them. Returns the count stored.
+        """
+        if not isinstance(tasks, list):
+            raise InvalidParams("tasks must be a list")
+        entries = []
+        for item in tasks:
+            if not isinstance(item, dict):
+                raise InvalidParams("each task must be a record object")
+            task_id, text, created_at = item.get("id"), item.get("task"), item.get("created_at")
+            if not isinstance(task_id, int) or isinstance(task_id, bool) or task_id < 1:
+                raise InvalidParams("id must be a positive integer")
+            if not isinstance(text, str) or not text.strip():
+                raise InvalidParams(f"Task {task_id} has no text")
+            if created_at is not None and not isinstance(created_at, (int, float)):
+                raise InvalidParams(f"Task {task_id}: created_at must be a number")
+            try:
+                fields = normalize_fields({name: item[name] for name in TASK_FIELDS if name in item})
+            except ValueError as e:
+                raise InvalidParams(f"Task {task_id}: {e}")
+            if created_at is not None:
+                fields["created_at"] = float(created_at)
+            entries.append((task_id, text, fields))
+        taken = self.tasks.import_many(entries)
+        if taken:
+            raise InvalidParams(f"IDs already in use: {', '.join(map(str, sorted(set(taken))))}")
+        return len(entries)
+    
+    def remove_tasks(self, tasks: List[Any], owner: Optional[str] = None,
+                     partial: bool = False) -> List[Dict[str, Any]]:
+        """
+        Remove many tasks in one storage operation. Returns one result per item.
+        
+        Each item is either a task ID or a task text (matched like remove_task).
+        """
+        with self.tasks.lock:
+            ids, errors = [], []
+            for item in tasks:
+                if isinstance(item, int):
+                    ids.append(item if self._owned(item, owner) else None)
+                    errors.append(None)
+                else:
+                    task_id, error = self._resolve_removal(item if isinstance(item, str) else "", owner, partial)
+                    ids.append(task_id)
+                    errors.append(error)
+            removed = self.tasks.remove_many([task_id for task_id in ids if task_id is not None])
+        removed = iter(removed)
+        results = []
+        for item, task_id, error in zip(tasks, ids, errors):
+            text = next(removed) if task_id is not None else None
+            if text is not None:
+                results.append({"item": item, "id": task_id, "task": text, "removed": True})
+            else:
+                results.append({"item": item, "removed": False, "error": error or "Task not found."})
+        return results
+    
+    def get_tasks_by_ids(self, ids: List[int], owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Look up many tasks by ID in one storage operation (other owners' tasks count as missing)."""
+        return [
+            dict(record, found=True)
+            if record is not None and (owner is None or record["owner"] == owner)
+            else {"id": task_id, "task": None, "found": False}
+            for task_id, record in zip(ids, self.tasks.get_records(ids))
+        ]
+    
+    def find_tasks(self, query: str, limit: int = 20, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Find tasks containing the query text (case-insensitive)."""
+        return [
+            {"id": task_id, "task": self.tasks.get(task_id)}
+            for task_id in self.tasks.find_partial(query, limit=limit, owner=owner)
+        ]
+    
+    def search_tasks(self, query: str, limit: int = DEFAULT_SEARCH_RESULTS,
+                     owner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rank tasks by relevance to a free-text query (BM25) and return the top matches.
+        
+        Only the fields needed to pick a task are returned, so a search costs
+        the model a handful of lines instead of the whole list.
+        """
+        if not isinstance(query, str) or not query.strip():
+            raise InvalidParams("query is required")
+        if not isinstance(limit, int) or limit < 1:
+            raise InvalidParams("limit must be a positive integer")
+        records, total = self.tasks.search(query, min(limit, MAX_SEARCH_RESULTS), owner)
+        return {
+            "results": [
+                {"id": record["id"], "task": record["task"], "status": record["status"],
+                 "due": record["due"], "score": record["score"]}
+                for record in records
+            ],
+            "matches": total
+        }
+    
+    def get_task_count(self, owner: Optional[str] = None) -> int:
+        """Get the total number of tasks in the database (or of one owner)."""
+        return self.tasks.count(owner)
     
-    def get_task_count(self) -> int:
-        """Get the total number of tasks in the database."""
-        return len(self.tasks)
+    def list_owners(self) -> Dict[str, int]:
+        """Task count per owner; lets a sharded pool see which namespaces a worker holds."""
+        return self.tasks.owners()
     
     def run(self):
         """Run the server, listening for JSON-RPC requests on STDIN."""
+        try:
+            asyncio.run(self.serve())
+        except (EOFError, KeyboardInterrupt):
+            # Clean shutdown
+            pass
+        finally:
+            self.tasks.close()
+    
+    async def serve(self):
+        """Read requests until STDIN closes, handling many of them concurrently."""
+        loop = asyncio.get_running_loop()
+        self.read_pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task-db-read")
+        self.write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-db-write")
+        read_payload = await self._open_stdin(loop)
+        in_flight = set()
+        
         try:
             while True:
-                # Read line from stdin
-                line = sys.stdin.readline()
-                if not line:
+                try:
+                    payload = await read_payload()
+                except FrameTooLarge as e:
+                    # The oversized line was skipped; the stream is still in sync
+                    self._send({
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {"code": -32600, "message": f"Invalid Request: {e}"}
+                    })
+                    continue
+                except TransportError:
+                    # Corrupt length prefix: the stream can't be resynchronised
                     break
-                    
+                if payload is None:
+                    break
+                if not payload.strip():
+                    continue
+                
                 try:
-                    # Parse JSON request
-                    request = json.loads(line.strip())
-                    
-                    # Handle request
-                    response = self.handle_request(request)
-                    
-                    # Send response to stdout
-                    print(json.dumps(response), flush=True)
-                    
-                except json.JSONDecodeError:
-                    # Invalid JSON
-                    error_response = {
+                    message = self.codec.decode(payload)
+                except Exception:
+                    # Invalid JSON (or undecodable binary frame)
+                    self._send({
                         "jsonrpc": "2.0",
                         "id": None,
                         "error": {"code": -32700, "message": "Parse error"}
-                    }
-                    print(json.dumps(error_response), flush=True)
-                    
-        except (EOFError, KeyboardInterrupt):
-            # Clean shutdown
-            pass
+                    })
+                    continue
+                
+                if isinstance(message, dict) and message.get("method") == NEGOTIATE_METHOD:
+                    # Handled in the read loop: the next frame must be read in the new mode
+                    self._negotiate(message)
+                    continue
+                
+                handler = asyncio.create_task(self._handle_message(message))
+                in_flight.add(handler)
+                handler.add_done_callback(in_flight.discard)
+            
+            # STDIN closed: finish what is already running before exiting
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        finally:
+            self.read_pool.shutdown(wait=True)
+            self.write_pool.shutdown(wait=True)
+    
+    async def _open_stdin(self, loop):
+        """
+        Return an async function reading the next frame payload from STDIN.
+        
+        Pipes are attached to the event loop directly; anything the loop
+        cannot watch (regular files, Windows consoles) is read on a helper thread.
+        Both honour the framing in effect when each read starts.
+        """
+        try:
+            reader = asyncio.StreamReader(limit=MAX_LINE_SIZE)
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+            
+            async def read_payload():
+                return await read_frame(reader, self.framing)
+            return read_payload
+        except (NotImplementedError, ValueError, OSError):
+            stdin_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-db-stdin")
+            
+            async def read_payload():
+                return await loop.run_in_executor(stdin_pool, read_frame_sync, sys.stdin.buffer, self.framing)
+            return read_payload
+    
+    def _negotiate(self, request: Dict[str, Any]):
+        """Agree on framing and codec, reply in the old mode, then switch."""
+        params = request.get("params") or {}
+        mode = choose_mode(params.get("framing") or [], params.get("codecs") or [])
+        self._send({"jsonrpc": "2.0", "id": request.get("id"), "result": mode})
+        self.framing = mode["framing"]
+        self.codec = get_codec(mode["codec"])
+    
+    async def _handle_message(self, message: Any):
+        """Handle one decoded message (a single request or a batch) and reply."""
+        if isinstance(message, list):
+            # JSON-RPC 2.0 batch: run members concurrently, reply with one array
+            if not message:
+                self._send(self._invalid_request())
+                return
+            responses = await asyncio.gather(*(self._dispatch(request) for request in message))
+            responses = [response for response in responses if response is not None]
+            if responses:
+                self._send(responses)
+            return
+        
+        response = await self._dispatch(message)
+        if response is not None:
+            self._send(response)
+    
+    async def _dispatch(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Run one request on the right executor. Returns None for notifications."""
+        if not isinstance(request, dict):
+            return self._invalid_request()
+        
+        # Checked before routing reads them, so a malformed request still gets a reply
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            return self._invalid_params(request, "params must be an object")
+        arguments = params.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            return self._invalid_params(request, "arguments must be an object")
+        if request.get("method") == "tools/call" and not isinstance(params.get("name"), str):
+            return self._invalid_params(request, "name must be a string")
+        
+        if request.get("method") == CANCELLED_NOTIFICATION:
+            # Handled on the loop at once, ahead of anything queued
+            cancelled = params.get("requestId")
+            if cancelled in self.in_flight_ids:
+                self.cancelled_ids.add(cancelled)
+            return None
+        
+        tool_name = None
+        if request.get("method") == "tools/call":
+            tool_name = params.get("name")
+        
+        request_id = request.get("id")
+        self.in_flight_ids.add(request_id)
+        
+        loop = asyncio.get_running_loop()
+        
+        def emit(message):
+            # Streamed chunks are produced on worker threads; write them from the loop
+            loop.call_soon_threadsafe(self._send, message)
+        
+        try:
+            if request.get("method") in (INITIALIZE_METHOD, INITIALIZED_NOTIFICATION):
+                response = self.handle_request(request, emit)
+            elif tool_name in INLINE_TOOLS and not arguments.get("owner"):
+                response = self.handle_request(request, emit)
+            else:
+                pool = self.write_pool if tool_name in MUTATING_TOOLS else self.read_pool
+                response = await loop.run_in_executor(pool, self.handle_request, request, emit)
+        finally:
+            self.in_flight_ids.discard(request_id)
+            self.cancelled_ids.discard(request_id)
+        
+        # JSON-RPC notifications (no id) get no response
+        return response if "id" in request and response is not None else None
+    
+    def _invalid_request(self) -> Dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request"}
+        }
+    
+    def _invalid_params(self, request: Dict[str, Any], message: str) -> Optional[Dict[str, Any]]:
+        if "id" not in request:
+            return None
+        return {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "error": {"code": -32602, "message": f"Invalid params: {message}"}
+        }
+    
+    def _send(self, response: Any):
+        """Write one framed message. Only ever called from the event loop thread."""
+        sys.stdout.buffer.write(encode_frame(self.codec.encode(response), self.framing))
+        sys.stdout.buffer.flush()
+
+def parse_args(argv=None):
+    """Parse command-line options for the task database server."""
+    parser = argparse.ArgumentParser(description="Task Database MCP Server (JSON-RPC over STDIO)")
+    parser.add_argument(
+        "--backend",
+        choices=STORAGE_BACKENDS,
+        default="memory",
+        help="Storage engine: indexed in-memory store (default) or SQLite."
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="Directory for the journal/snapshots (memory) or tasks.db (sqlite). Nothing is persisted if omitted."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Worker threads for concurrent read-only storage operations."
+    )
+    parser.add_argument(
+        "--id-base",
+        type=int,
+        help="Lowest ID to hand out to new tasks (a pool gives each shard its own range)."
+    )
+    parser.add_argument(
+        "--standby",
+        action="store_true",
+        help="Start as a warm spare: load the interpreter and modules, then wait for a "
+             "server/activate message before opening storage and serving."
+    )
+    return parser.parse_args(argv)
+
+def wait_for_activation() -> bool:
+    """
+    Block until the activation line arrives on STDIN; False if STDIN closes first.
+    
+    Reads the raw file descriptor byte by byte so nothing after the line is
+    buffered here: the next bytes belong to the asyncio reader in serve().
+    """
+    line = bytearray()
+    while True:
+        byte = os.read(sys.stdin.fileno(), 1)
+        if not byte:
+            return False
+        if byte == b"\n":
+            break
+        line += byte
+    try:
+        return json.loads(line).get("method") == ACTIVATE_METHOD
+    except (ValueError, AttributeError):
+        return False
 
 if __name__ == "__main__":
+    args = parse_args()
+    
+    # Turn SIGTERM (sent by the agent on restart/shutdown) into a clean exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    if args.standby and not wait_for_activation():
+        sys.exit(0)
+    
     # Create and run the task database server
-    server = TaskDatabaseServer()
+    server = TaskDatabaseServer(backend=args.backend, data_dir=args.data_dir, workers=args.workers,
+                                id_base=args.id_base)
     server.run() 
\ No newline at end of file
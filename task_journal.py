@@ -0,0 +1,337 @@
+"""
+Task Journal
+Durable storage for the in-memory TaskStore: an append-only journal of
+add/update/remove/import operations plus periodic snapshot compaction.
+
+On-disk layout inside the data directory:
+- ``snapshot.rows``        full store state as of the start of generation G
+- ``journal.<gen>.log``    one JSON array per operation, for every gen >= G
+
+A snapshot is a sequence of length-prefixed frames (see mcp_transport.py): a
+JSON header naming the codec, generation and next ID, then chunks of rows in
+``TaskRecord.to_columns()`` form, encoded with the fastest installed codec
+(msgpack, orjson, else json). Chunks are decoded and bulk-loaded one at a
+time. Older ``snapshot.json`` files are still read, and replaced by the next
+compaction.
+
+Every operation is written to the OS immediately, so a crashed server process
+loses nothing. ``fsync`` is batched on a background thread (group commit),
+which bounds what an OS crash or power loss can lose to ``fsync_interval``.
+
+Compaction switches writes to a new journal generation under the store lock
+and takes the store's copy-on-write snapshot (a list of record references)
+there; serializing it happens on a background thread, so writers never wait
+for it. Older journals are deleted only after the new snapshot has been
+atomically renamed into place, so a crash at any point leaves a replayable
+state behind.
+"""
+
+import gc
+import json
+import os
+import re
+import sys
+import threading
+from typing import Any, Dict
+
+from mcp_transport import CODEC_PREFERENCE, FRAMING_LENGTH_PREFIXED, encode_frame, get_codec, read_frame_sync
+from task_store import TaskRecord, TaskStore
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+SNAPSHOT_FILE = "snapshot.rows"
+LEGACY_SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_PATTERN = re.compile(r"^journal\.(\d+)\.log$")
+# Rows per snapshot frame: bounds the memory and GIL time of one encode/decode
+SNAPSHOT_CHUNK = 10_000
+
+
+def _encode_op(op: list) -> bytes:
+    """One journal line (orjson when installed; both produce plain JSON)."""
+    if orjson is not None:
+        return orjson.dumps(op) + b"\n"
+    return json.dumps(op).encode("utf-8") + b"\n"
+
+
+def _decode_op(line: bytes) -> list:
+    """Parse one journal line; raises ValueError if it is not valid JSON."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+class TaskJournal:
+    """Append-only journal with batched fsync and background snapshot compaction."""
+
+    def __init__(self, data_dir: str, store: TaskStore,
+                 fsync_interval: float = 0.05, compact_after: int = 100_000):
+        self.data_dir = data_dir
+        self.store = store
+        self.fsync_interval = fsync_interval
+        self.compact_after = compact_after
+
+        self.generation = 0
+        self._file = None
+        self._ops_since_snapshot = 0
+        self._dirty = False
+        self._io_lock = threading.Lock()
+        self._compacting = False
+        self._snapshot_worker = None
+        self._snapshot_tasks = 0
+        self._closed = threading.Event()
+        self._flusher = None
+
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Startup: replay snapshot + journal tail
+    # ------------------------------------------------------------------
+
+    def open(self) -> int:
+        """
+        Replay the snapshot and journal tail into the store, then start
+        journaling new operations. Returns the number of tasks loaded.
+
+        Must be called before the store is shared, while it is still empty.
+        """
+        # Left behind by a snapshot write that never finished
+        for name in (SNAPSHOT_FILE, LEGACY_SNAPSHOT_FILE):
+            tmp_path = os.path.join(self.data_dir, name + ".tmp")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Replay creates millions of long-lived objects and no reference
+        # cycles, so collecting during it would only rescan them again and again
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot_generation = self._load_snapshot()
+
+            generations = sorted(
+                int(m.group(1)) for m in map(JOURNAL_PATTERN.match, os.listdir(self.data_dir)) if m
+            )
+            for generation in generations:
+                if generation >= snapshot_generation:
+                    self._ops_since_snapshot += self._replay(self._journal_path(generation))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        # Keep the loaded records out of later full collections as well
+        gc.freeze()
+
+        self.generation = max([snapshot_generation] + generations)
+        self._file = open(self._journal_path(self.generation), "ab")
+        self.store.journal = self
+
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        return len(self.store)
+
+    def _load_snapshot(self) -> int:
+        """Load the snapshot into the store and return its generation."""
+        path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return self._load_legacy_snapshot()
+        with open(path, "rb") as f:
+            header = json.loads(read_frame_sync(f, FRAMING_LENGTH_PREFIXED))
+            codec = get_codec(header["codec"])
+            while True:
+                payload = read_frame_sync(f, FRAMING_LENGTH_PREFIXED)
+                if payload is None:
+                    break
+                self.store.restore_columns(codec.decode(payload))
+        self.store.reserve_ids(header["next_id"])
+        self._snapshot_tasks = header["tasks"]
+        return header["generation"]
+
+    def _load_legacy_snapshot(self) -> int:
+        """Load a ``snapshot.json`` written before the row format; 0 if there is none."""
+        path = os.path.join(self.data_dir, LEGACY_SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        # Rows are TaskRecord.to_row() lists; older snapshots hold [id, text]
+        restore_row = self.store.restore_row
+        for row in snapshot["tasks"]:
+            restore_row(row)
+        self.store.reserve_ids(snapshot["next_id"])
+        return snapshot["generation"]
+
+    def _replay(self, path: str) -> int:
+        """Apply every operation in one journal file. Returns the op count."""
+        count = 0
+        offset = 0
+        restore, remove, update = self.store.restore, self.store.remove, self.store.apply_update
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    op = _decode_op(line)
+                except ValueError:
+                    # A torn final write from a crash: everything before it is
+                    # intact, so cut it off before new records are appended.
+                    f.close()
+                    os.truncate(path, offset)
+                    break
+                if op[0] == "a":
+                    # ["a", id, text, fields]; fields are absent in older journals
+                    restore(op[1], op[2], op[3] if len(op) > 3 else None)
+                elif op[0] == "r":
+                    remove(op[1])
+                elif op[0] == "u":
+                    update(op[1], op[2])
+                elif op[0] == "i":
+                    # ["i", id, text, fields]: moved in from another shard, keeps its ID
+                    self.store.restore_imported(op[1], op[2], op[3])
+                offset += len(line)
+                count += 1
+        return count
+
+    def _journal_path(self, generation: int) -> str:
+        return os.path.join(self.data_dir, f"journal.{generation:06d}.log")
+
+    # ------------------------------------------------------------------
+    # Recording operations (called by TaskStore under its lock)
+    # ------------------------------------------------------------------
+
+    def record_add(self, task_id: int, text: str, fields: Dict[str, Any]):
+        """Journal an add operation."""
+        self._append(_encode_op(["a", task_id, text, fields]))
+
+    def record_update(self, task_id: int, fields: Dict[str, Any]):
+        """Journal a field update."""
+        self._append(_encode_op(["u", task_id, fields]))
+
+    def record_remove(self, task_id: int):
+        """Journal a remove operation."""
+        self._append(_encode_op(["r", task_id]))
+
+    def record_add_many(self, entries):
+        """Journal several (id, text, fields) add operations with a single write."""
+        lines = [_encode_op(["a", task_id, text, fields]) for task_id, text, fields in entries]
+        self._append(b"".join(lines), len(lines))
+
+    def record_import_many(self, entries):
+        """Journal several (id, text, fields) import operations with a single write."""
+        lines = [_encode_op(["i", task_id, text, fields]) for task_id, text, fields in entries]
+        self._append(b"".join(lines), len(lines))
+
+    def record_remove_many(self, task_ids):
+        """Journal several remove operations with a single write."""
+        lines = [_encode_op(["r", task_id]) for task_id in task_ids]
+        self._append(b"".join(lines), len(lines))
+
+    def _append(self, data: bytes, ops: int = 1):
+        with self._io_lock:
+            self._file.write(data)
+            # Hand the bytes to the OS now; fsync happens in the flusher
+            self._file.flush()
+            self._dirty = True
+        self._ops_since_snapshot += ops
+        # Compact once the journal holds as many operations as the last snapshot
+        # held tasks (and at least compact_after), so snapshot cost stays
+        # proportional to the writes however large the store grows
+        if (self._ops_since_snapshot >= max(self.compact_after, self._snapshot_tasks)
+                and not self._compacting):
+            self.compact()
+
+    # ------------------------------------------------------------------
+    # Group commit and compaction
+    # ------------------------------------------------------------------
+
+    def sync(self):
+        """fsync the current journal if anything was written since the last sync."""
+        with self._io_lock:
+            if self._dirty and self._file is not None:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def _flush_loop(self):
+        """Background group commit: one fsync per interval covers every write in it."""
+        while not self._closed.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except (OSError, ValueError):
+                pass
+
+    def compact(self, wait: bool = False):
+        """
+        Start a snapshot compaction.
+
+        Must be safe to call while the store lock is held: the state copy and
+        the journal switch happen together so no operation is lost between them.
+        Under the lock this costs one list of record references and the
+        journal switch; rows are built and written by the snapshot thread.
+        """
+        with self.store.lock:
+            if self._compacting:
+                # One compaction at a time; ``wait`` waits for the running one
+                worker = self._snapshot_worker
+            else:
+                self._compacting = True
+                next_id, records = self.store.snapshot()
+                self._snapshot_tasks = len(records)
+                with self._io_lock:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                    self.generation += 1
+                    self._file = open(self._journal_path(self.generation), "ab")
+                    self._dirty = False
+                self._ops_since_snapshot = 0
+
+                worker = self._snapshot_worker = threading.Thread(
+                    target=self._write_snapshot, args=(self.generation, next_id, records), daemon=True
+                )
+                worker.start()
+        if wait:
+            worker.join()
+
+    def _write_snapshot(self, generation: int, next_id: int, records):
+        """Write the snapshot for ``generation`` and drop the journals it covers."""
+        try:
+            path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+            tmp_path = path + ".tmp"
+            codec = get_codec(CODEC_PREFERENCE[0])
+            header = {"codec": codec.name, "generation": generation, "next_id": next_id, "tasks": len(records)}
+            with open(tmp_path, "wb") as f:
+                f.write(encode_frame(json.dumps(header).encode("utf-8"), FRAMING_LENGTH_PREFIXED))
+                for start in range(0, len(records), SNAPSHOT_CHUNK):
+                    columns = TaskRecord.to_columns(records[start:start + SNAPSHOT_CHUNK])
+                    f.write(encode_frame(codec.encode(columns), FRAMING_LENGTH_PREFIXED))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+            legacy_path = os.path.join(self.data_dir, LEGACY_SNAPSHOT_FILE)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+            for name in os.listdir(self.data_dir):
+                match = JOURNAL_PATTERN.match(name)
+                if match and int(match.group(1)) < generation:
+                    os.remove(os.path.join(self.data_dir, name))
+        except OSError as e:
+            print(f"⚠️ Snapshot compaction failed: {e}", file=sys.stderr)
+        finally:
+            self._compacting = False
+
+    def close(self):
+        """Finish any snapshot in progress, stop the flusher and fsync outstanding writes."""
+        if self._snapshot_worker is not None:
+            self._snapshot_worker.join()
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.sync()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.store.journal = None
+
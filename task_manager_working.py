@@ -13,12 +13,13 @@ from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
+from task_store import TaskStore
 
 # Load environment variables
 load_dotenv()
 
 # Global task storage (in production this would be a database)
-task_storage = []
+task_storage = TaskStore()
 notification_history = []
 
 class TaskManagerTools:
@@ -38,7 +39,7 @@ class TaskManagerTools:
         Returns:
             str: Confirmation message
         """
-        task_storage.append(task)
+        task_storage.add(task)
         return f"✅ Task '{task}' added successfully. You now have {len(task_storage)} tasks."
     
     @staticmethod
@@ -52,7 +53,7 @@ class TaskManagerTools:
         if not task_storage:
             return "📝 No tasks found. Your task list is empty!"
         
-        task_list = "\n".join([f"{i+1}. {task}" for i, task in enumerate(task_storage)])
+        task_list = "\n".join([f"{i+1}. {task}" for i, task in enumerate(task_storage.texts())])
         return f"📝 Your current tasks:\n{task_list}\n\nTotal: {len(task_storage)} tasks"
     
     @staticmethod
@@ -66,15 +67,14 @@ class TaskManagerTools:
         Returns:
             str: Confirmation message
         """
-        # Find tasks that contain the search term
-        matching_tasks = [t for t in task_storage if task.lower() in t.lower()]
+        # Find the oldest task containing the search term (indexed lookup)
+        matching_ids = task_storage.find_partial(task, limit=1)
         
-        if not matching_tasks:
-            return f"❌ No tasks found matching '{task}'. Current tasks: {task_storage}"
+        if not matching_ids:
+            return f"❌ No tasks found matching '{task}'. Current tasks: {task_storage.texts()}"
         
         # Remove the first matching task
-        task_to_remove = matching_tasks[0]
-        task_storage.remove(task_to_remove)
+        task_to_remove = task_storage.remove(matching_ids[0])
         return f"✅ Removed task: '{task_to_remove}'. You now have {len(task_storage)} tasks remaining."
     
     @staticmethod
@@ -0,0 +1,109 @@
+"""
+Task Search Index
+Word-level inverted index with BM25 ranking, used by the ``search_tasks`` tool.
+
+Task text is tokenized into lowercase alphanumeric words, common stopwords
+are dropped and simple plurals are folded ("dentists" -> "dentist"), so
+"the dentist one" finds "Book dentist appointment". Each term maps to the
+tasks containing it and their term frequencies; a query only touches the
+postings of its own terms, never the whole store.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on one or that the this to "
+    "with my me i".split()
+)
+
+
+def normalize_term(word: str) -> str:
+    """Fold simple English plurals; leaves short words and "-ss" endings alone."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized search terms (stopwords removed)."""
+    return [
+        normalize_term(word) for word in _WORD.findall(text.lower())
+        if word not in STOPWORDS
+    ]
+
+
+class InvertedIndex:
+    """Incrementally maintained term -> {task id: term frequency} index."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # task id -> number of terms, for BM25 length normalization
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, task_id: int, text: str):
+        """Index a task's text."""
+        terms = tokenize(text)
+        for term, frequency in Counter(terms).items():
+            self._postings.setdefault(term, {})[task_id] = frequency
+        self._lengths[task_id] = len(terms)
+        self._total_length += len(terms)
+
+    def discard(self, task_id: int, text: str):
+        """Remove a task indexed under ``text``; unknown IDs are ignored."""
+        length = self._lengths.pop(task_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in set(tokenize(text)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(task_id, None)
+            if not posting:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 10,
+               allowed: Optional[Callable[[int], bool]] = None) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Rank tasks against ``query`` with BM25.
+
+        Returns ([(task id, score), ...] best first, number of matching tasks).
+        Ties are broken by ID so results are stable. ``allowed`` restricts the
+        candidates (statistics still cover the whole index).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._lengths:
+            return [], 0
+
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1.0
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = {}
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            lengths = self._lengths
+            for task_id, frequency in posting.items():
+                if allowed is not None and not allowed(task_id):
+                    continue
+                norm = k1 * (1 - b + b * lengths[task_id] / average_length)
+                scores[task_id] = scores.get(task_id, 0.0) + idf * frequency * (k1 + 1) / (frequency + norm)
+
+        top = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(task_id, round(score, 4)) for task_id, score in top], len(scores)
@@ -0,0 +1,766 @@
+"""
+In-Memory Task Store
+Indexed task storage used by the Task Database Server.
+
+Every task gets a stable integer ID. IDs are handed out monotonically, so
+ordering by ID is the same as insertion order. A task is a compact
+``TaskRecord`` (``__slots__``, no per-instance dict) carrying the text plus
+status, priority, due date, owner and tags. Lookups go through indexes
+instead of list scans:
+- a hash map from exact task text to IDs (O(1) exact match/removal)
+- a trigram index for case-insensitive partial matches
+- a word-level inverted index with BM25 ranking (see task_search.py)
+- secondary indexes by status, priority and owner (ascending ID lists)
+- due-date indexes sorted by (due, id): one for unfinished tasks and one for
+  done ones, each also split per owner, so due queries read only the list
+  they need
+
+The trigram and search indexes are built lazily on their first query and kept
+up to date incrementally afterwards, so bulk loads (e.g. journal replay on
+startup) only pay for the hash maps.
+"""
+
+import datetime
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from task_search import InvertedIndex
+
+STATUSES = ("open", "in_progress", "done")
+PRIORITIES = ("low", "normal", "high")
+DEFAULT_STATUS = "open"
+DEFAULT_PRIORITY = "normal"
+
+# Fields callers may set on a task (besides its text)
+TASK_FIELDS = ("status", "priority", "due", "owner", "tags")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of character trigrams in an already-lowercased string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def normalize_due(value: Any) -> Optional[str]:
+    """
+    Normalize a due date to an ISO-8601 string (``YYYY-MM-DD`` or full datetime).
+
+    ISO strings sort chronologically, so the due index can compare them
+    directly; a bare date sorts as the start of that day.
+    """
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"due must be an ISO-8601 date string, got {value!r}")
+    try:
+        if len(value) == 10:
+            return datetime.date.fromisoformat(value).isoformat()
+        return datetime.datetime.fromisoformat(value).isoformat(timespec="seconds")
+    except ValueError:
+        raise ValueError(f"due must be an ISO-8601 date, got {value!r}")
+
+
+def normalize_fields(fields: Dict[str, Any], partial: bool = False) -> Dict[str, Any]:
+    """
+    Validate task fields coming from a tool call.
+
+    Returns a dict with every field set (defaults filled in), or with only the
+    given fields when ``partial`` is true (for updates). Raises ValueError.
+    """
+    unknown = set(fields) - set(TASK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown task field(s): {', '.join(sorted(unknown))}")
+
+    normalized = {}
+    if "status" in fields or not partial:
+        status = fields.get("status") or DEFAULT_STATUS
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        normalized["status"] = status
+    if "priority" in fields or not partial:
+        priority = fields.get("priority") or DEFAULT_PRIORITY
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        normalized["priority"] = priority
+    if "due" in fields or not partial:
+        normalized["due"] = normalize_due(fields.get("due"))
+    if "owner" in fields or not partial:
+        owner = fields.get("owner")
+        normalized["owner"] = str(owner) if owner not in (None, "") else None
+    if "tags" in fields or not partial:
+        tags = fields.get("tags") or ()
+        if isinstance(tags, str):
+            tags = [tags]
+        normalized["tags"] = tuple(dict.fromkeys(str(tag) for tag in tags))
+    return normalized
+
+
+class TaskRecord:
+    """
+    One task. Slotted to keep per-task memory low at millions of rows.
+
+    Records are never changed in place once stored: an update swaps in a
+    copy (``replace``), so a snapshot can hold on to the records it copied.
+    """
+
+    __slots__ = ("id", "text", "lowered", "status", "priority", "due", "owner", "tags", "created_at")
+
+    def __init__(self, task_id: int, text: str, status: str = DEFAULT_STATUS,
+                 priority: str = DEFAULT_PRIORITY, due: Optional[str] = None,
+                 owner: Optional[str] = None, tags: Tuple[str, ...] = (),
+                 created_at: Optional[float] = None):
+        self.id = task_id
+        self.text = text
+        self.lowered = text.lower()
+        self.status = status
+        self.priority = priority
+        self.due = due
+        self.owner = owner
+        self.tags = tuple(tags)
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def fields(self) -> Dict[str, Any]:
+        """Everything except id/text, in journal/snapshot form."""
+        return {
+            "status": self.status,
+            "priority": self.priority,
+            "due": self.due,
+            "owner": self.owner,
+            "tags": list(self.tags),
+            "created_at": self.created_at,
+        }
+
+    def to_row(self) -> list:
+        """Compact positional form (matches the constructor order and ROW_FIELDS)."""
+        return [self.id, self.text, self.status, self.priority, self.due,
+                self.owner, list(self.tags), self.created_at]
+
+    @staticmethod
+    def to_columns(records: List["TaskRecord"]) -> List[list]:
+        """
+        Rows of ``records`` stored column-wise, one list per ROW_FIELDS entry.
+
+        Snapshots use this form: it allocates a handful of lists per chunk
+        instead of one (plus a tags list) per row, so serializing a large store
+        does not set off full garbage collections in the writing process.
+        """
+        return [list(map(attrgetter(name), records)) for name in ROW_FIELDS]
+
+    def replace(self, fields: Dict[str, Any]) -> "TaskRecord":
+        """A copy of the record with ``fields`` changed."""
+        clone = TaskRecord.__new__(TaskRecord)
+        for name in TaskRecord.__slots__:
+            setattr(clone, name, getattr(self, name))
+        for name, value in fields.items():
+            setattr(clone, name, tuple(value) if name == "tags" else value)
+        return clone
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record as returned by tools."""
+        record = {"id": self.id, "task": self.text}
+        record.update(self.fields())
+        return record
+
+
+# Constructor order of TaskRecord, used by to_row/to_columns
+ROW_FIELDS = ("id", "text", "status", "priority", "due", "owner", "tags", "created_at")
+
+
+class _IdIndex:
+    """Secondary index: key -> ascending list of task IDs."""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self):
+        self._ids: Dict[Any, List[int]] = {}
+
+    def add(self, key: Any, task_id: int):
+        ids = self._ids.setdefault(key, [])
+        if not ids or task_id > ids[-1]:
+            ids.append(task_id)
+        else:
+            ids.insert(bisect_left(ids, task_id), task_id)
+
+    def discard(self, key: Any, task_id: int):
+        ids = self._ids.get(key)
+        if ids is None:
+            return
+        position = bisect_left(ids, task_id)
+        if position < len(ids) and ids[position] == task_id:
+            del ids[position]
+            if not ids:
+                del self._ids[key]
+
+    def get(self, key: Any) -> List[int]:
+        return self._ids.get(key, [])
+
+    def counts(self) -> Dict[Any, int]:
+        return {key: len(ids) for key, ids in self._ids.items()}
+
+
+class _DueIndex:
+    """
+    Due-date index: (owner, done) -> list of (due, id) sorted soonest first.
+
+    Every task with a due date is under (None, done) and, if it has an
+    owner, under (owner, done) too; ``done`` is whether its status is
+    "done", so completing a task moves it out of the unfinished lists.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Optional[str], bool], List[Tuple[str, int]]] = {}
+
+    @staticmethod
+    def _keys(record: "TaskRecord") -> List[Tuple[Optional[str], bool]]:
+        done = record.status == "done"
+        if record.owner is None:
+            return [(None, done)]
+        return [(None, done), (record.owner, done)]
+
+    def add(self, record: "TaskRecord"):
+        entry = (record.due, record.id)
+        for key in self._keys(record):
+            entries = self._entries.setdefault(key, [])
+            if not entries or entry > entries[-1]:
+                entries.append(entry)
+            else:
+                entries.insert(bisect_left(entries, entry), entry)
+
+    def discard(self, record: "TaskRecord"):
+        entry = (record.due, record.id)
+        for key in self._keys(record):
+            entries = self._entries.get(key)
+            if entries is None:
+                continue
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+                if not entries:
+                    del self._entries[key]
+
+    def extend(self, records: List["TaskRecord"]):
+        """Add many records at once (one sort per list touched)."""
+        touched = set()
+        # Sorted first, so each list gains one sorted run
+        for record in sorted(records, key=attrgetter("due", "id")):
+            entry = (record.due, record.id)
+            for key in self._keys(record):
+                self._entries.setdefault(key, []).append(entry)
+                touched.add(key)
+        for key in touched:
+            # Two sorted runs: timsort merges them in linear time
+            self._entries[key].sort()
+
+    def before(self, before: str, owner: Optional[str], include_done: bool) -> Iterator[int]:
+        """IDs due strictly before ``before``, soonest first."""
+        lists = [self._entries.get((owner, False), [])]
+        if include_done:
+            lists.append(self._entries.get((owner, True), []))
+        heads = [islice(entries, bisect_left(entries, (before,))) for entries in lists]
+        return (task_id for _, task_id in merge(*heads))
+
+
+class TaskStore:
+    """Thread-safe in-memory task store with exact, partial-match and field indexes."""
+
+    def __init__(self):
+        # id -> TaskRecord; dicts keep insertion order, which is also ID order
+        self._tasks: Dict[int, TaskRecord] = {}
+        # exact text -> ids holding that text (dict used as an ordered set)
+        self._by_text: Dict[str, Dict[int, None]] = {}
+        # Ascending ids for cursor seeks; removed ids linger as tombstones
+        # until they outnumber live ones, then the list is rebuilt
+        self._order: List[int] = []
+        # trigram -> ascending ids whose lowercased text contains it (None until first use)
+        self._trigrams: Optional[_IdIndex] = None
+        # Word-level inverted index for ranked search (None until first use)
+        self._search: Optional[InvertedIndex] = None
+        # Secondary indexes
+        self._by_status = _IdIndex()
+        self._by_priority = _IdIndex()
+        self._by_owner = _IdIndex()
+        self._due = _DueIndex()
+        self._next_id = 1
+        # Mutations that changed something (no-op removals and updates don't count)
+        self.changes = 0
+        self.lock = threading.RLock()
+        # Optional journal (see task_journal.py) notified of every mutation
+        self.journal = None
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._tasks
+
+    @property
+    def next_id(self) -> int:
+        """The ID the next added task will receive."""
+        return self._next_id
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def add(self, text: str, **fields) -> int:
+        """Store a task (fields already normalized) and return its new ID."""
+        with self.lock:
+            task_id = self._next_id
+            self._next_id += 1
+            record = self._insert(TaskRecord(task_id, text, **fields))
+            self.changes += 1
+            if self.journal is not None:
+                self.journal.record_add(task_id, text, record.fields())
+            return task_id
+
+    def add_many(self, entries: List[Tuple[str, Dict[str, Any]]]) -> List[int]:
+        """Store several (text, fields) tasks under one lock and one journal write."""
+        with self.lock:
+            first_id = self._next_id
+            self._next_id += len(entries)
+            ids = list(range(first_id, self._next_id))
+            records = [
+                self._insert(TaskRecord(task_id, text, **fields))
+                for task_id, (text, fields) in zip(ids, entries)
+            ]
+            if ids:
+                self.changes += 1
+                if self.journal is not None:
+                    self.journal.record_add_many((r.id, r.text, r.fields()) for r in records)
+            return ids
+
+    def import_many(self, entries: List[Tuple[int, str, Dict[str, Any]]]) -> List[int]:
+        """
+        Store (id, text, fields) tasks moved from another store under their own IDs.
+
+        Every field is kept, ``created_at`` included. All or nothing: if an
+        ID is already in use, nothing is stored and the taken IDs are
+        returned. The ID counter is left alone, so tasks added here keep
+        numbering within this store's own range.
+        """
+        with self.lock:
+            ids = [task_id for task_id, _, _ in entries]
+            taken = [task_id for task_id in ids if task_id in self._tasks]
+            if len(set(ids)) != len(ids):
+                taken += [task_id for task_id in set(ids) if ids.count(task_id) > 1]
+            if taken or not entries:
+                return taken
+            records = [self._insert(TaskRecord(task_id, text, **fields)) for task_id, text, fields in entries]
+            self.changes += 1
+            if self.journal is not None:
+                self.journal.record_import_many((r.id, r.text, r.fields()) for r in records)
+            return []
+
+    def restore(self, task_id: int, text: str, fields: Optional[Dict[str, Any]] = None):
+        """Insert a task under a known ID (used by journal replay)."""
+        self.restore_row([task_id, text], fields)
+
+    def restore_imported(self, task_id: int, text: str, fields: Optional[Dict[str, Any]] = None):
+        """Insert an imported task without moving the ID counter (used by journal replay)."""
+        with self.lock:
+            self._insert(TaskRecord(task_id, text, **(fields or {})))
+
+    def restore_row(self, row: list, fields: Optional[Dict[str, Any]] = None):
+        """Insert a task from its TaskRecord.to_row() form (used by snapshot replay)."""
+        with self.lock:
+            record = self._insert(TaskRecord(*row, **(fields or {})))
+            if record.id >= self._next_id:
+                self._next_id = record.id + 1
+
+    def restore_columns(self, columns: List[list]):
+        """
+        Insert many tasks from TaskRecord.to_columns() form under one lock (snapshot replay).
+
+        The ID counter is not moved (imported tasks may hold IDs from another
+        store's range); the caller reserves the snapshot's next ID instead.
+        """
+        ids = columns[0] if columns else []
+        if not ids:
+            return
+        with self.lock:
+            ascending = all(previous < task_id for previous, task_id in zip(ids, ids[1:]))
+            if (not ascending or (self._order and ids[0] <= self._order[-1])
+                    or self._trigrams is not None or self._search is not None):
+                for record in map(TaskRecord, *columns):
+                    self._insert(record)
+            else:
+                self._append_records(map(TaskRecord, *columns))
+                self._order.extend(ids)
+
+    def _append_records(self, records: Iterator[TaskRecord]):
+        """
+        Bulk form of _insert for records whose IDs ascend past every stored ID.
+
+        Every ID posting just grows at the end, so no bisecting is needed; the
+        due entries are sorted once and merged. The caller extends ``_order``
+        and must have checked that the lazy indexes are not built yet.
+        """
+        tasks, by_text, due = self._tasks, self._by_text, []
+        by_status, by_priority, by_owner = self._by_status._ids, self._by_priority._ids, self._by_owner._ids
+        for record in records:
+            task_id = record.id
+            tasks[task_id] = record
+            by_text.setdefault(record.text, {})[task_id] = None
+            by_status.setdefault(record.status, []).append(task_id)
+            by_priority.setdefault(record.priority, []).append(task_id)
+            if record.owner is not None:
+                by_owner.setdefault(record.owner, []).append(task_id)
+            if record.due is not None:
+                due.append(record)
+        if due:
+            self._due.extend(due)
+
+    def reserve_ids(self, next_id: int):
+        """Never hand out IDs below ``next_id`` (IDs of removed tasks stay retired)."""
+        with self.lock:
+            self._next_id = max(self._next_id, next_id)
+
+    def update(self, task_id: int, **fields) -> Optional[Dict[str, Any]]:
+        """Change fields of a task and reindex it. Returns the updated record."""
+        with self.lock:
+            record = self._apply_update(task_id, fields)
+            if record is None:
+                return None
+            self.changes += 1
+            if self.journal is not None:
+                self.journal.record_update(task_id, fields)
+            return record.to_dict()
+
+    def apply_update(self, task_id: int, fields: Dict[str, Any]):
+        """Apply an update without journaling it (used by journal replay)."""
+        with self.lock:
+            self._apply_update(task_id, fields)
+
+    def _apply_update(self, task_id: int, fields: Dict[str, Any]) -> Optional[TaskRecord]:
+        record = self._tasks.get(task_id)
+        if record is None:
+            return None
+        self._unindex_fields(record)
+        # Copy on write: a snapshot in progress may still hold the old record
+        record = self._tasks[task_id] = record.replace(fields)
+        self._index_fields(record)
+        return record
+
+    def remove(self, task_id: int) -> Optional[str]:
+        """Remove a task by ID. Returns the removed text, or None if unknown."""
+        with self.lock:
+            text = self._delete(task_id)
+            if text is not None:
+                self.changes += 1
+                if self.journal is not None:
+                    self.journal.record_remove(task_id)
+            return text
+
+    def remove_many(self, task_ids: List[int]) -> List[Optional[str]]:
+        """Remove several tasks under one lock and one journal write."""
+        with self.lock:
+            removed = [self._delete(task_id) for task_id in task_ids]
+            gone = [task_id for task_id, text in zip(task_ids, removed) if text is not None]
+            if gone:
+                self.changes += 1
+                if self.journal is not None:
+                    self.journal.record_remove_many(gone)
+            return removed
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _insert(self, record: TaskRecord) -> TaskRecord:
+        """Insert a record under its ID and update every index."""
+        task_id = record.id
+        self._tasks[task_id] = record
+        self._by_text.setdefault(record.text, {})[task_id] = None
+        if not self._order or task_id > self._order[-1]:
+            self._order.append(task_id)
+        else:
+            self._order.insert(bisect_right(self._order, task_id), task_id)
+        if self._trigrams is not None:
+            for gram in trigrams(record.lowered):
+                self._trigrams.add(gram, task_id)
+        if self._search is not None:
+            self._search.add(task_id, record.text)
+        self._index_fields(record)
+        return record
+
+    def _index_fields(self, record: TaskRecord):
+        self._by_status.add(record.status, record.id)
+        self._by_priority.add(record.priority, record.id)
+        if record.owner is not None:
+            self._by_owner.add(record.owner, record.id)
+        if record.due is not None:
+            self._due.add(record)
+
+    def _unindex_fields(self, record: TaskRecord):
+        self._by_status.discard(record.status, record.id)
+        self._by_priority.discard(record.priority, record.id)
+        if record.owner is not None:
+            self._by_owner.discard(record.owner, record.id)
+        if record.due is not None:
+            self._due.discard(record)
+
+    def _ensure_trigrams(self) -> _IdIndex:
+        """Build the trigram index on first use."""
+        if self._trigrams is None:
+            index = _IdIndex()
+            for task_id in sorted(self._tasks):
+                for gram in trigrams(self._tasks[task_id].lowered):
+                    index.add(gram, task_id)
+            self._trigrams = index
+        return self._trigrams
+
+    def _ensure_search(self) -> InvertedIndex:
+        """Build the search index on first use."""
+        if self._search is None:
+            index = InvertedIndex()
+            for task_id, record in self._tasks.items():
+                index.add(task_id, record.text)
+            self._search = index
+        return self._search
+
+    def _delete(self, task_id: int) -> Optional[str]:
+        """Drop a task from every index without journaling it."""
+        record = self._tasks.pop(task_id, None)
+        if record is None:
+            return None
+
+        ids = self._by_text[record.text]
+        del ids[task_id]
+        if not ids:
+            del self._by_text[record.text]
+
+        if self._trigrams is not None:
+            for gram in trigrams(record.lowered):
+                self._trigrams.discard(gram, task_id)
+
+        if self._search is not None:
+            self._search.discard(task_id, record.text)
+
+        self._unindex_fields(record)
+
+        if len(self._order) > 2 * len(self._tasks) + 64:
+            self._order = sorted(self._tasks)
+        return record.text
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, task_id: int) -> Optional[str]:
+        """Return the text of a task, or None if the ID is unknown."""
+        record = self._tasks.get(task_id)
+        return record.text if record is not None else None
+
+    def get_many(self, task_ids: List[int]) -> List[Optional[str]]:
+        """Return the text of each task ID (None for unknown IDs)."""
+        with self.lock:
+            return [self.get(task_id) for task_id in task_ids]
+
+    def get_records(self, task_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Return the full record of each task ID (None for unknown IDs)."""
+        with self.lock:
+            records = [self._tasks.get(task_id) for task_id in task_ids]
+            return [record.to_dict() if record is not None else None for record in records]
+
+    def find_exact(self, text: str, owner: Optional[str] = None) -> Optional[int]:
+        """Return the oldest task ID whose text equals ``text`` exactly (optionally of one owner)."""
+        ids = self._by_text.get(text)
+        if not ids:
+            return None
+        if owner is None:
+            return next(iter(ids))
+        with self.lock:
+            return next((task_id for task_id in ids if self._tasks[task_id].owner == owner), None)
+
+    def find_partial(self, query: str, limit: Optional[int] = None,
+                     owner: Optional[str] = None) -> List[int]:
+        """
+        Return IDs of tasks containing ``query`` (case-insensitive), oldest first.
+
+        Queries of three or more characters walk the rarest of their trigram
+        postings (every match is in it), checking each task for the query.
+        Shorter queries carry no trigram and walk the owner's tasks, or all
+        tasks; either way the walk stops at ``limit`` matches.
+        """
+        needle = query.lower()
+        with self.lock:
+            ids = self._candidates(needle, owner=owner)
+            return [record.id for record in self._scan(ids, 0, limit, needle, owner=owner)]
+
+    def match(self, text: str, owner: Optional[str] = None) -> Optional[int]:
+        """
+        Resolve ``text`` to a task ID: exact match first, then partial match.
+
+        Text shorter than three characters is matched exactly only: a partial
+        lookup for it has no trigram to narrow the scan.
+        """
+        task_id = self.find_exact(text, owner)
+        if task_id is not None or len(text) < 3:
+            return task_id
+        matches = self.find_partial(text, limit=1, owner=owner)
+        return matches[0] if matches else None
+
+    def _candidates(self, needle: Optional[str] = None, status: Optional[str] = None,
+                    priority: Optional[str] = None, owner: Optional[str] = None) -> List[int]:
+        """
+        The shortest ascending ID list that holds every task passing the filters.
+
+        Picks among the status/priority/owner postings and, for a needle of
+        three or more characters, its rarest trigram posting; with none of
+        those it is the full ID list.
+        """
+        candidates = [
+            index.get(key) for index, key in
+            ((self._by_status, status), (self._by_priority, priority), (self._by_owner, owner))
+            if key is not None
+        ]
+        if needle is not None and len(needle) >= 3:
+            index = self._ensure_trigrams()
+            candidates.append(min((index.get(gram) for gram in trigrams(needle)), key=len))
+        return min(candidates, key=len) if candidates else self._order
+
+    def _scan(self, ids: List[int], after_id: int, limit: Optional[int], needle: Optional[str] = None,
+              status: Optional[str] = None, priority: Optional[str] = None,
+              owner: Optional[str] = None) -> List[TaskRecord]:
+        """Walk ascending ``ids`` from past ``after_id``, keeping up to ``limit`` records that pass."""
+        results = []
+        position = bisect_right(ids, after_id)
+        while position < len(ids) and (limit is None or len(results) < limit):
+            record = self._tasks.get(ids[position])
+            position += 1
+            if record is None:
+                # Tombstone in the full ID list
+                continue
+            if ((status is not None and record.status != status)
+                    or (priority is not None and record.priority != priority)
+                    or (owner is not None and record.owner != owner)
+                    or (needle is not None and needle not in record.lowered)):
+                continue
+            results.append(record)
+        return results
+
+    def search(self, query: str, limit: int = 10,
+               owner: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Rank tasks against ``query`` (BM25 over words), optionally among one owner's tasks.
+
+        Returns (top ``limit`` records, each with a ``score``, best first;
+        total number of matching tasks).
+        """
+        with self.lock:
+            allowed = None
+            if owner is not None:
+                allowed = lambda task_id: self._tasks[task_id].owner == owner  # noqa: E731
+            ranked, total = self._ensure_search().search(query, limit, allowed)
+            return [dict(self._tasks[task_id].to_dict(), score=score) for task_id, score in ranked], total
+
+    def page(self, after_id: int = 0, limit: int = 100, contains: Optional[str] = None,
+             status: Optional[str] = None, priority: Optional[str] = None,
+             owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to ``limit`` records with id > ``after_id``, oldest first.
+
+        The candidate IDs come from the shortest posting that applies
+        (status/priority/owner or the rarest trigram of ``contains``, else
+        the full ID list). A binary search seeks to the cursor and the walk
+        stops at ``limit`` matches, so a page costs O(log n + scanned) no
+        matter how deep the cursor is.
+        """
+        needle = contains.lower() if contains else None
+        with self.lock:
+            ids = self._candidates(needle, status, priority, owner)
+            return [record.to_dict() for record in
+                    self._scan(ids, after_id, limit, needle, status, priority, owner)]
+
+    def due_before(self, before: str, limit: int = 100, include_done: bool = False,
+                   owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return records due strictly before ``before`` (ISO date), soonest first.
+
+        Reads only the owner's (or everyone's) unfinished list, merged with
+        the done list when ``include_done``: O(log n + limit).
+        """
+        with self.lock:
+            return [self._tasks[task_id].to_dict()
+                    for task_id in islice(self._due.before(before, owner, include_done), limit)]
+
+    def count(self, owner: Optional[str] = None) -> int:
+        """Number of tasks, or of one owner's tasks (from the owner index)."""
+        if owner is None:
+            return len(self._tasks)
+        with self.lock:
+            return len(self._by_owner.get(owner))
+
+    def count_matching(self, contains: Optional[str] = None, status: Optional[str] = None,
+                       priority: Optional[str] = None, owner: Optional[str] = None) -> int:
+        """
+        Number of tasks passing the ``page`` filters.
+
+        One status/priority/owner filter alone is the size of its posting;
+        otherwise the shortest candidate list is scanned once.
+        """
+        needle = contains.lower() if contains else None
+        with self.lock:
+            if needle is None:
+                postings = [
+                    (index, key) for index, key in
+                    ((self._by_status, status), (self._by_priority, priority), (self._by_owner, owner))
+                    if key is not None
+                ]
+                if not postings:
+                    return len(self._tasks)
+                if len(postings) == 1:
+                    index, key = postings[0]
+                    return len(index.get(key))
+            ids = self._candidates(needle, status, priority, owner)
+            return len(self._scan(ids, 0, None, needle, status, priority, owner))
+
+    def owners(self) -> Dict[str, int]:
+        """Task count per owner (tasks without an owner are not included)."""
+        with self.lock:
+            return self._by_owner.counts()
+
+    def breakdown(self, owner: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Task counts by status and by priority (from the field indexes)."""
+        with self.lock:
+            if owner is None:
+                return {"status": self._by_status.counts(), "priority": self._by_priority.counts()}
+            status: Dict[str, int] = {}
+            priority: Dict[str, int] = {}
+            for task_id in self._by_owner.get(owner):
+                record = self._tasks[task_id]
+                status[record.status] = status.get(record.status, 0) + 1
+                priority[record.priority] = priority.get(record.priority, 0) + 1
+            return {"status": status, "priority": priority}
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        """Iterate over (id, text) pairs in insertion order."""
+        with self.lock:
+            return iter([(task_id, record.text) for task_id, record in self._tasks.items()])
+
+    def texts(self) -> List[str]:
+        """Return all task texts in insertion order."""
+        with self.lock:
+            return [record.text for record in self._tasks.values()]
+
+    def close(self):
+        """Flush and detach the journal, if one is attached."""
+        if self.journal is not None:
+            self.journal.close()
+
+    def snapshot(self) -> Tuple[int, List[TaskRecord]]:
+        """
+        Return (next_id, [record, ...]) as a consistent point-in-time copy.
+
+        Only the list of references is copied under the lock: records are
+        never changed in place, so the caller can serialize them later
+        (``to_row``) without holding the lock while writes continue.
+        """
+        with self.lock:
+            return self._next_id, list(self._tasks.values())
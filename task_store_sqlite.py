@@ -0,0 +1,556 @@
+"""
+SQLite Task Store
+Alternative storage engine for the Task Database Server, selected with
+``task_db_server.py --backend sqlite``.
+
+It exposes the same interface as the in-memory TaskStore (add, update,
+remove, get, match, find_partial, page, due_before, breakdown, texts, len) but answers
+everything with indexed queries:
+- WAL journal mode, so readers never block the writer
+- indexes on task text, status, priority, owner, due date and created time
+- an FTS5 trigram table for case-insensitive partial matches when the SQLite
+  build supports it (falls back to a scan otherwise)
+- an FTS5 word table ranked with its built-in bm25() for ``search`` (falls
+  back to the in-memory InvertedIndex from task_search.py)
+- a trigger-maintained row counter, so counts never run COUNT(*)
+
+All SQL lives in module-level constants; sqlite3 caches prepared statements
+by SQL text, so each statement is compiled once per connection and reused.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from task_search import InvertedIndex, tokenize
+from task_store import DEFAULT_PRIORITY, DEFAULT_STATUS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    text        TEXT NOT NULL,
+    text_lower  TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'open',
+    priority    TEXT NOT NULL DEFAULT 'normal',
+    due         TEXT,
+    owner       TEXT,
+    tags        TEXT NOT NULL DEFAULT '[]',
+    created_at  REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name   TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters(name, value) VALUES ('tasks', 0);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_text ON tasks(text);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_owner ON tasks(owner, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due, id) WHERE due IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+
+CREATE TRIGGER IF NOT EXISTS tasks_count_insert AFTER INSERT ON tasks BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'tasks';
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_count_delete AFTER DELETE ON tasks BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'tasks';
+END;
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    text, content='tasks', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts(tasks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# Columns added after the first release; ALTERed into older databases on open
+MIGRATIONS = [
+    ("priority", "ALTER TABLE tasks ADD COLUMN priority TEXT NOT NULL DEFAULT 'normal'"),
+    ("due", "ALTER TABLE tasks ADD COLUMN due TEXT"),
+    ("owner", "ALTER TABLE tasks ADD COLUMN owner TEXT"),
+    ("tags", "ALTER TABLE tasks ADD COLUMN tags TEXT NOT NULL DEFAULT '[]'"),
+]
+
+RECORD_COLUMNS = "id, text, status, priority, due, owner, tags, created_at"
+
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_search USING fts5(
+    text, content='tasks', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS tasks_search_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_search(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_search_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_search(tasks_search, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+SQL_INSERT = (
+    "INSERT INTO tasks(text, text_lower, status, priority, due, owner, tags, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_IMPORT = (
+    "INSERT INTO tasks(id, text, text_lower, status, priority, due, owner, tags, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_RESERVE_IDS = "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'tasks'"
+SQL_RESERVE_IDS_FIRST = "INSERT INTO sqlite_sequence(name, seq) SELECT 'tasks', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')"
+SQL_UPDATE = "UPDATE tasks SET {assignments} WHERE id = ?"
+SQL_DELETE = "DELETE FROM tasks WHERE id = ?"
+SQL_GET = "SELECT text FROM tasks WHERE id = ?"
+SQL_GET_RECORD = f"SELECT {RECORD_COLUMNS} FROM tasks WHERE id = ?"
+SQL_GET_RECORDS = f"SELECT {RECORD_COLUMNS} FROM tasks WHERE id IN ({{placeholders}})"
+SQL_FIND_EXACT = "SELECT id FROM tasks WHERE text = ? ORDER BY id LIMIT 1"
+SQL_FIND_EXACT_OWNER = "SELECT id FROM tasks WHERE text = ? AND owner = ? ORDER BY id LIMIT 1"
+SQL_FIND_FTS = "SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ? ORDER BY rowid LIMIT ?"
+SQL_FIND_SCAN = "SELECT id FROM tasks WHERE instr(text_lower, ?) > 0 ORDER BY id LIMIT ?"
+SQL_GET_MANY = "SELECT id, text FROM tasks WHERE id IN ({placeholders})"
+SQL_LIST = "SELECT text FROM tasks ORDER BY id"
+# {where} holds extra "AND column = ?" filters; at most 16 distinct statements
+SQL_PAGE = f"SELECT {RECORD_COLUMNS} FROM tasks WHERE id > ?{{where}} ORDER BY id LIMIT ?"
+SQL_PAGE_FTS = (
+    "SELECT t.id, t.text, t.status, t.priority, t.due, t.owner, t.tags, t.created_at "
+    "FROM tasks_fts f JOIN tasks t ON t.id = f.rowid "
+    "WHERE f.tasks_fts MATCH ? AND f.rowid > ?{where} ORDER BY f.rowid LIMIT ?"
+)
+SQL_PAGE_SCAN = (
+    f"SELECT {RECORD_COLUMNS} FROM tasks "
+    "WHERE id > ? AND instr(text_lower, ?) > 0{where} ORDER BY id LIMIT ?"
+)
+SQL_DUE_BEFORE = (
+    f"SELECT {RECORD_COLUMNS} FROM tasks WHERE due IS NOT NULL AND due < ?{{where}} "
+    "ORDER BY due, id LIMIT ?"
+)
+SQL_DUE_BEFORE_OPEN = (
+    f"SELECT {RECORD_COLUMNS} FROM tasks WHERE due IS NOT NULL AND due < ? AND status != 'done'{{where}} "
+    "ORDER BY due, id LIMIT ?"
+)
+SQL_COUNT = "SELECT value FROM counters WHERE name = 'tasks'"
+SQL_COUNT_OWNER = "SELECT count(*) FROM tasks WHERE owner = ?"
+SQL_COUNT_MATCHING = "SELECT count(*) FROM tasks WHERE 1{where}"
+SQL_COUNT_MATCHING_FTS = (
+    "SELECT count(*) FROM tasks_fts f JOIN tasks t ON t.id = f.rowid WHERE f.tasks_fts MATCH ?{where}"
+)
+SQL_COUNT_MATCHING_SCAN = "SELECT count(*) FROM tasks WHERE instr(text_lower, ?) > 0{where}"
+SQL_OWNERS = "SELECT owner, count(*) FROM tasks WHERE owner IS NOT NULL GROUP BY owner"
+SQL_OWNER_IDS = "SELECT id FROM tasks WHERE owner = ?"
+SQL_BREAKDOWN = "SELECT {field}, count(*) FROM tasks{where} GROUP BY {field}"
+SQL_HAS_TABLE = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+# bm25() is lower-is-better; negate it so scores read like the memory store's
+SQL_SEARCH = (
+    "SELECT t.id, t.text, t.status, t.priority, t.due, t.owner, t.tags, t.created_at, "
+    "-bm25(tasks_search) AS score "
+    "FROM tasks_search s JOIN tasks t ON t.id = s.rowid "
+    "WHERE tasks_search MATCH ?{where} ORDER BY bm25(tasks_search), t.id LIMIT ?"
+)
+SQL_SEARCH_COUNT = "SELECT count(*) FROM tasks_search WHERE tasks_search MATCH ?"
+SQL_SEARCH_COUNT_OWNER = (
+    "SELECT count(*) FROM tasks_search s JOIN tasks t ON t.id = s.rowid "
+    "WHERE tasks_search MATCH ? AND t.owner = ?"
+)
+SQL_LIST_ROWS = "SELECT id, text FROM tasks ORDER BY id"
+
+# Stand-in for "no limit" in LIMIT clauses
+NO_LIMIT = -1
+# IDs per IN (...) query; stays under SQLite's host-parameter limit
+ID_CHUNK = 500
+# Columns page() may filter on by equality
+FILTER_COLUMNS = ("status", "priority", "owner")
+
+
+def _record(row: tuple) -> Dict[str, Any]:
+    """Turn a RECORD_COLUMNS row into the dict returned by tools."""
+    task_id, text, status, priority, due, owner, tags, created_at = row
+    return {
+        "id": task_id,
+        "task": text,
+        "status": status,
+        "priority": priority,
+        "due": due,
+        "owner": owner,
+        "tags": json.loads(tags),
+        "created_at": created_at,
+    }
+
+
+class SQLiteTaskStore:
+    """Task store backed by a SQLite database in WAL mode."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.RLock()
+        # Autocommit mode: every statement commits on its own
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, cached_statements=64
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            self.has_fts = False
+
+        try:
+            existed = self._conn.execute(SQL_HAS_TABLE, ("tasks_search",)).fetchone() is not None
+            self._conn.executescript(SEARCH_SCHEMA)
+            if not existed:
+                # Database created before the search table: index existing rows
+                self._conn.execute("INSERT INTO tasks_search(tasks_search) VALUES ('rebuild')")
+            self.has_search = True
+        except sqlite3.OperationalError:
+            self.has_search = False
+        # In-memory fallback search index when FTS5 is missing (built on first search)
+        self._search_index: Optional[InvertedIndex] = None
+
+        self._count = self._conn.execute(SQL_COUNT).fetchone()[0]
+        # Mutations that changed something (no-op removals and updates don't count)
+        self.changes = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, task_id: int) -> bool:
+        return self.get(task_id) is not None
+
+    def _migrate(self):
+        """Add columns missing from a database created by an older version."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if not columns:
+            return
+        for column, statement in MIGRATIONS:
+            if column not in columns:
+                self._conn.execute(statement)
+
+    @staticmethod
+    def _insert_params(text: str, fields: Dict[str, Any], now: float) -> tuple:
+        return (
+            text, text.lower(),
+            fields.get("status") or DEFAULT_STATUS,
+            fields.get("priority") or DEFAULT_PRIORITY,
+            fields.get("due"),
+            fields.get("owner"),
+            json.dumps(list(fields.get("tags") or ())),
+            fields.get("created_at") or now,
+        )
+
+    def add(self, text: str, **fields) -> int:
+        """Store a task (fields already normalized) and return its new ID."""
+        with self.lock:
+            cursor = self._conn.execute(SQL_INSERT, self._insert_params(text, fields, time.time()))
+            self._count += 1
+            self.changes += 1
+            if self._search_index is not None:
+                self._search_index.add(cursor.lastrowid, text)
+            return cursor.lastrowid
+
+    def add_many(self, entries: List[Tuple[str, Dict[str, Any]]]) -> List[int]:
+        """Store several (text, fields) tasks in a single transaction."""
+        with self.lock:
+            now = time.time()
+            ids = []
+            self._conn.execute("BEGIN")
+            try:
+                for text, fields in entries:
+                    cursor = self._conn.execute(SQL_INSERT, self._insert_params(text, fields, now))
+                    ids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._count += len(ids)
+            if ids:
+                self.changes += 1
+            if self._search_index is not None:
+                for task_id, (text, _) in zip(ids, entries):
+                    self._search_index.add(task_id, text)
+            return ids
+
+    def import_many(self, entries: List[Tuple[int, str, Dict[str, Any]]]) -> List[int]:
+        """
+        Store (id, text, fields) tasks under their own IDs in one transaction.
+
+        All or nothing: returns the IDs already in use and stores nothing if
+        there are any. Unlike the memory store, AUTOINCREMENT numbers new
+        tasks after the largest ID ever stored, imported ones included.
+        """
+        with self.lock:
+            ids = [task_id for task_id, _, _ in entries]
+            taken = [task_id for task_id, text in zip(ids, self.get_many(ids)) if text is not None]
+            if len(set(ids)) != len(ids):
+                taken += [task_id for task_id in set(ids) if ids.count(task_id) > 1]
+            if taken or not entries:
+                return taken
+            now = time.time()
+            self._conn.execute("BEGIN")
+            try:
+                for task_id, text, fields in entries:
+                    self._conn.execute(SQL_IMPORT, (task_id,) + self._insert_params(text, fields, now))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._count += len(entries)
+            self.changes += 1
+            if self._search_index is not None:
+                for task_id, text, _ in entries:
+                    self._search_index.add(task_id, text)
+            return []
+
+    def reserve_ids(self, next_id: int):
+        """Never hand out IDs below ``next_id``."""
+        with self.lock:
+            self._conn.execute(SQL_RESERVE_IDS_FIRST, (next_id - 1,))
+            self._conn.execute(SQL_RESERVE_IDS, (next_id - 1,))
+
+    def update(self, task_id: int, **fields) -> Optional[Dict[str, Any]]:
+        """Change fields of a task. Returns the updated record, or None if unknown."""
+        if "tags" in fields:
+            fields["tags"] = json.dumps(list(fields["tags"]))
+        columns = sorted(fields)
+        sql = SQL_UPDATE.format(assignments=", ".join(f"{column} = ?" for column in columns))
+        with self.lock:
+            cursor = self._conn.execute(sql, [fields[column] for column in columns] + [task_id])
+            if cursor.rowcount == 0:
+                return None
+            self.changes += 1
+            return _record(self._conn.execute(SQL_GET_RECORD, (task_id,)).fetchone())
+
+    def remove(self, task_id: int) -> Optional[str]:
+        """Remove a task by ID. Returns the removed text, or None if unknown."""
+        with self.lock:
+            text = self.get(task_id)
+            if text is None:
+                return None
+            self._conn.execute(SQL_DELETE, (task_id,))
+            self._count -= 1
+            self.changes += 1
+            if self._search_index is not None:
+                self._search_index.discard(task_id, text)
+            return text
+
+    def remove_many(self, task_ids: List[int]) -> List[Optional[str]]:
+        """Remove several tasks in a single transaction."""
+        with self.lock:
+            removed = self.get_many(task_ids)
+            self._conn.execute("BEGIN")
+            try:
+                for task_id, text in zip(task_ids, removed):
+                    if text is not None:
+                        self._conn.execute(SQL_DELETE, (task_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            # The same ID may appear twice; only the first occurrence removes it
+            seen = set()
+            for index, task_id in enumerate(task_ids):
+                if task_id in seen:
+                    removed[index] = None
+                seen.add(task_id)
+            gone = sum(1 for text in removed if text is not None)
+            self._count -= gone
+            if gone:
+                self.changes += 1
+            if self._search_index is not None:
+                for task_id, text in zip(task_ids, removed):
+                    if text is not None:
+                        self._search_index.discard(task_id, text)
+            return removed
+
+    def get(self, task_id: int) -> Optional[str]:
+        """Return the text of a task, or None if the ID is unknown."""
+        with self.lock:
+            row = self._conn.execute(SQL_GET, (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, task_ids: List[int]) -> List[Optional[str]]:
+        """Return the text of each task ID (None for unknown IDs)."""
+        found = {}
+        unique_ids = list(dict.fromkeys(task_ids))
+        with self.lock:
+            for start in range(0, len(unique_ids), ID_CHUNK):
+                chunk = unique_ids[start:start + ID_CHUNK]
+                sql = SQL_GET_MANY.format(placeholders=",".join("?" * len(chunk)))
+                found.update(self._conn.execute(sql, chunk).fetchall())
+        return [found.get(task_id) for task_id in task_ids]
+
+    def get_records(self, task_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Return the full record of each task ID (None for unknown IDs)."""
+        found = {}
+        unique_ids = list(dict.fromkeys(task_ids))
+        with self.lock:
+            for start in range(0, len(unique_ids), ID_CHUNK):
+                chunk = unique_ids[start:start + ID_CHUNK]
+                sql = SQL_GET_RECORDS.format(placeholders=",".join("?" * len(chunk)))
+                for row in self._conn.execute(sql, chunk):
+                    found[row[0]] = _record(row)
+        return [found.get(task_id) for task_id in task_ids]
+
+    def find_exact(self, text: str, owner: Optional[str] = None) -> Optional[int]:
+        """Return the oldest task ID whose text equals ``text`` exactly (optionally of one owner)."""
+        with self.lock:
+            if owner is None:
+                row = self._conn.execute(SQL_FIND_EXACT, (text,)).fetchone()
+            else:
+                row = self._conn.execute(SQL_FIND_EXACT_OWNER, (text, owner)).fetchone()
+        return row[0] if row else None
+
+    def find_partial(self, query: str, limit: Optional[int] = None,
+                     owner: Optional[str] = None) -> List[int]:
+        """Return IDs of tasks containing ``query`` (case-insensitive), oldest first."""
+        needle = query.lower()
+        limit = NO_LIMIT if limit is None else limit
+        if owner is not None:
+            return [record["id"] for record in self.page(0, limit, contains=query, owner=owner)]
+        with self.lock:
+            if self.has_fts and len(needle) >= 3:
+                phrase = '"' + needle.replace('"', '""') + '"'
+                rows = self._conn.execute(SQL_FIND_FTS, (phrase, limit)).fetchall()
+            else:
+                rows = self._conn.execute(SQL_FIND_SCAN, (needle, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def match(self, text: str, owner: Optional[str] = None) -> Optional[int]:
+        """Resolve ``text`` to a task ID: exact match first, then partial match (three characters or more)."""
+        task_id = self.find_exact(text, owner)
+        if task_id is not None or len(text) < 3:
+            return task_id
+        matches = self.find_partial(text, limit=1, owner=owner)
+        return matches[0] if matches else None
+
+    def search(self, query: str, limit: int = 10,
+               owner: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Rank tasks against ``query`` (BM25 over words), optionally among one owner's tasks.
+
+        Returns (top ``limit`` records, each with a ``score``, best first;
+        total number of matching tasks).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        with self.lock:
+            if not self.has_search:
+                if self._search_index is None:
+                    self._search_index = InvertedIndex()
+                    for task_id, text in self._conn.execute(SQL_LIST_ROWS):
+                        self._search_index.add(task_id, text)
+                allowed = None
+                if owner is not None:
+                    owned = {row[0] for row in self._conn.execute(SQL_OWNER_IDS, (owner,))}
+                    allowed = owned.__contains__
+                ranked, total = self._search_index.search(query, limit, allowed)
+                records = self.get_records([task_id for task_id, _ in ranked])
+                return [dict(record, score=score) for record, (_, score) in zip(records, ranked)], total
+
+            expression = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            if owner is None:
+                sql, params = SQL_SEARCH.format(where=""), (expression, limit)
+                count_sql, count_params = SQL_SEARCH_COUNT, (expression,)
+            else:
+                sql, params = SQL_SEARCH.format(where=" AND t.owner = ?"), (expression, owner, limit)
+                count_sql, count_params = SQL_SEARCH_COUNT_OWNER, (expression, owner)
+            results = []
+            for row in self._conn.execute(sql, params):
+                record = _record(row[:-1])
+                record["score"] = round(row[-1], 4)
+                results.append(record)
+            total = self._conn.execute(count_sql, count_params).fetchone()[0]
+            return results, total
+
+    def page(self, after_id: int = 0, limit: int = 100, contains: Optional[str] = None,
+             status: Optional[str] = None, priority: Optional[str] = None,
+             owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` records with id > ``after_id``, oldest first."""
+        values = {"status": status, "priority": priority, "owner": owner}
+        filters = [column for column in FILTER_COLUMNS if values[column] is not None]
+        where = "".join(f" AND {column} = ?" for column in filters)
+        filter_params = [values[column] for column in filters]
+        with self.lock:
+            if not contains:
+                sql, params = SQL_PAGE, [after_id]
+            else:
+                needle = contains.lower()
+                if self.has_fts and len(needle) >= 3:
+                    sql, params = SQL_PAGE_FTS, ['"' + needle.replace('"', '""') + '"', after_id]
+                else:
+                    sql, params = SQL_PAGE_SCAN, [after_id, needle]
+            rows = self._conn.execute(sql.format(where=where), params + filter_params + [limit])
+            return [_record(row) for row in rows]
+
+    def due_before(self, before: str, limit: int = 100, include_done: bool = False,
+                   owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return records due strictly before ``before`` (ISO date), soonest first."""
+        sql = SQL_DUE_BEFORE if include_done else SQL_DUE_BEFORE_OPEN
+        if owner is None:
+            sql, params = sql.format(where=""), (before, limit)
+        else:
+            sql, params = sql.format(where=" AND owner = ?"), (before, owner, limit)
+        with self.lock:
+            return [_record(row) for row in self._conn.execute(sql, params)]
+
+    def count(self, owner: Optional[str] = None) -> int:
+        """Number of tasks, or of one owner's tasks (via the owner index)."""
+        if owner is None:
+            return self._count
+        with self.lock:
+            return self._conn.execute(SQL_COUNT_OWNER, (owner,)).fetchone()[0]
+
+    def count_matching(self, contains: Optional[str] = None, status: Optional[str] = None,
+                       priority: Optional[str] = None, owner: Optional[str] = None) -> int:
+        """Number of tasks passing the ``page`` filters (the same query, counted)."""
+        values = {"status": status, "priority": priority, "owner": owner}
+        filters = [column for column in FILTER_COLUMNS if values[column] is not None]
+        if not filters and not contains:
+            return self._count
+        where = "".join(f" AND {column} = ?" for column in filters)
+        filter_params = [values[column] for column in filters]
+        with self.lock:
+            if not contains:
+                sql, params = SQL_COUNT_MATCHING, []
+            else:
+                needle = contains.lower()
+                if self.has_fts and len(needle) >= 3:
+                    sql, params = SQL_COUNT_MATCHING_FTS, ['"' + needle.replace('"', '""') + '"']
+                else:
+                    sql, params = SQL_COUNT_MATCHING_SCAN, [needle]
+            return self._conn.execute(sql.format(where=where), params + filter_params).fetchone()[0]
+
+    def owners(self) -> Dict[str, int]:
+        """Task count per owner (tasks without an owner are not included)."""
+        with self.lock:
+            return dict(self._conn.execute(SQL_OWNERS).fetchall())
+
+    def breakdown(self, owner: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Task counts by status and by priority (GROUP BY over their indexes)."""
+        where, params = ("", ()) if owner is None else (" WHERE owner = ?", (owner,))
+        with self.lock:
+            return {
+                field: dict(self._conn.execute(SQL_BREAKDOWN.format(field=field, where=where), params).fetchall())
+                for field in ("status", "priority")
+            }
+
+    def texts(self) -> List[str]:
+        """Return all task texts in insertion order."""
+        with self.lock:
+            return [row[0] for row in self._conn.execute(SQL_LIST)]
+
+    def close(self):
+        """Close the connection (SQLite checkpoints the WAL on last close)."""
+        with self.lock:
+            self._conn.close()
@@ -0,0 +1,37 @@
+"""Tests for the Notification Server's HTTP tool endpoint."""
+
+import time
+
+import pytest
+
+from deadlines import DEADLINE_HEADER
+from notification_server import NotificationServer
+
+
+@pytest.fixture
+def client():
+    return NotificationServer().app.test_client()
+
+
+def send_reminder(client, deadline=None):
+    headers = {DEADLINE_HEADER: deadline} if deadline is not None else {}
+    return client.post("/call/send_reminder", json={"task": "Buy milk"}, headers=headers)
+
+
+@pytest.mark.parametrize("deadline", ["soon", "", "nan", "inf"])
+def test_malformed_deadline_header_is_ignored(client, deadline):
+    response = send_reminder(client, deadline)
+    assert response.status_code == 200
+    assert "Reminder sent" in response.get_json()["result"]
+
+
+def test_expired_deadline_is_rejected(client):
+    response = send_reminder(client, str(time.time() - 1))
+    assert response.status_code == 504
+    assert client.get("/health").get_json()["stateVersion"] == 0
+
+
+def test_future_deadline_is_served(client):
+    response = send_reminder(client, str(time.time() + 60))
+    assert response.status_code == 200
+    assert response.get_json()["stateVersion"] == 1
@@ -0,0 +1,124 @@
+"""
+Tool Output Budgets
+Caps on how much of a tool's result is put into the model's context.
+
+A listing tool could otherwise hand the model thousands of lines, costing
+latency and tokens and possibly overflowing the context window. Each tool
+has a ToolBudget:
+
+- ``max_items``  items shown per call; the agent asks the server for one page
+                 of that size, so the rest is never even transferred
+- ``max_chars``  characters for those items; when they do not fit, each line
+                 is shortened rather than items dropped, so the page still
+                 lines up with the server's continuation cursor
+
+Whatever is left out is summarized instead: the tool reports the total,
+aggregate counts and a continuation handle (the server's cursor) the model
+can pass back for the next page. Every truncation is logged and counted.
+
+Budgets can be overridden per tool with ``TOOL_OUTPUT_BUDGETS``, e.g.
+``list_tasks=20:2000,get_notification_history=10`` (items[:chars]).
+"""
+
+import threading
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Shortest a line is clipped to; max_chars is raised so max_items lines fit
+MIN_LINE_CHARS = 40
+
+
+class ToolBudget:
+    """How many items, and how many characters for them, one tool result may carry."""
+
+    def __init__(self, max_items: int, max_chars: int):
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        self.max_items = max_items
+        self.max_chars = max(max_chars, max_items * MIN_LINE_CHARS)
+
+    def __repr__(self) -> str:
+        return f"ToolBudget({self.max_items}, {self.max_chars})"
+
+
+DEFAULT_BUDGETS: Dict[str, ToolBudget] = {
+    "list_tasks": ToolBudget(50, 6000),
+    "search_tasks": ToolBudget(5, 1500),
+    "get_notification_history": ToolBudget(20, 3000),
+}
+DEFAULT_BUDGET = ToolBudget(50, 6000)
+
+
+def parse_budgets(spec: str) -> Dict[str, ToolBudget]:
+    """
+    Parse ``tool=items[:chars],...``; a missing chars part keeps the tool's default.
+
+    A malformed entry is skipped with a warning, so that tool keeps its
+    default budget instead of the agent failing to start.
+    """
+    budgets = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        tool, _, value = entry.partition("=")
+        items, _, chars = value.partition(":")
+        default = DEFAULT_BUDGETS.get(tool.strip(), DEFAULT_BUDGET)
+        try:
+            if not tool.strip():
+                raise ValueError("missing tool name")
+            budgets[tool.strip()] = ToolBudget(int(items), int(chars) if chars else default.max_chars)
+        except ValueError as e:
+            print(f"⚠️ Ignoring TOOL_OUTPUT_BUDGETS entry '{entry}': {e}")
+    return budgets
+
+
+def format_counts(counts: Dict[str, int]) -> str:
+    """"open 12, done 3" with the largest count first."""
+    return ", ".join(f"{key} {count}" for key, count in sorted(counts.items(), key=lambda item: -item[1]))
+
+
+class OutputBudgets:
+    """Per-tool budgets plus a record of every truncated result."""
+
+    def __init__(self, overrides: Optional[Dict[str, ToolBudget]] = None, recent_events: int = 50):
+        self.budgets = dict(DEFAULT_BUDGETS, **(overrides or {}))
+        self.truncations: Counter = Counter()
+        self.clipped_lines: Counter = Counter()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent_events)
+        self._lock = threading.Lock()
+
+    def for_tool(self, tool: str) -> ToolBudget:
+        return self.budgets.get(tool, DEFAULT_BUDGET)
+
+    def fit_lines(self, tool: str, lines: List[str], record: bool = True) -> List[str]:
+        """Shorten lines evenly until they fit the tool's ``max_chars``; ``record=False`` skips the log."""
+        budget = self.for_tool(tool)
+        if sum(len(line) for line in lines) <= budget.max_chars:
+            return lines
+        per_line = max(MIN_LINE_CHARS, budget.max_chars // max(len(lines), 1))
+        fitted = [line if len(line) <= per_line else line[:per_line - 1].rstrip() + "…" for line in lines]
+        if not record:
+            return fitted
+        clipped = sum(1 for before, after in zip(lines, fitted) if before is not after)
+        with self._lock:
+            self.clipped_lines[tool] += clipped
+        print(f"✂️ {tool} output: {clipped} of {len(lines)} lines shortened to {per_line} chars")
+        return fitted
+
+    def record_truncation(self, tool: str, shown: int, total: int, continuation: Optional[str] = None):
+        """Log and count a result that shows ``shown`` of ``total`` items."""
+        with self._lock:
+            self.truncations[tool] += 1
+            self.recent.append({"tool": tool, "shown": shown, "total": total,
+                                "continuation": continuation is not None})
+        print(f"✂️ {tool} output truncated: showing {shown} of {total} items"
+              f"{' (continuation available)' if continuation else ''}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Budgets in force and truncation counters for health reporting."""
+        with self._lock:
+            return {
+                "budgets": {tool: {"max_items": budget.max_items, "max_chars": budget.max_chars}
+                            for tool, budget in self.budgets.items()},
+                "truncations": dict(self.truncations),
+                "clipped_lines": dict(self.clipped_lines),
+                "recent": list(self.recent)[-10:],
+            }
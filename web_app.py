@@ -8,16 +8,36 @@ MCP Benefits Demonstrated:
 - Transport Flexibility: STDIO and HTTP/SSE transports working together
 - Service Modularity: Independent, specialized microservices
 - Easy Extensibility: Add new MCP servers without changing core agent code
+
+Start-up is kept short: the agent frameworks are imported lazily (see
+import_timing.py) and the agent is initialized in the background, so the
+app answers /api/health while the MCP servers are still booting.
+
+Every request gets a deadline (``REQUEST_TIMEOUT`` seconds, or sooner if the
+caller sends an ``X-Request-Deadline`` header) that the agent carries into
+each tool call; work still running when it passes is cancelled.
+
+``/api/process/stream`` answers the same requests as Server-Sent Events
+(tokens and tool-call progress as the agent produces them), so the chat shows
+output from the first token instead of after the whole run.
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from import_timing import PROCESS_T0, import_report, record
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
 import asyncio
+import json
 import os
+import queue
 import threading
+import time
+import uuid
 from datetime import datetime
 from dotenv import load_dotenv
+from deadlines import DEADLINE_HEADER, header_deadline
+from intent_router import QUICK_ACTIONS
 from mcp_task_manager import MCPTaskManagerAgent
-from concurrent.futures import ThreadPoolExecutor
+from task_db_pool import ShardedTaskDB
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # Load environment variables
 load_dotenv()
@@ -27,15 +47,30 @@ app.secret_key = 'mcp-task-manager-secret-key-change-in-production'
 
 # Global MCP agent instance and event loop
 mcp_agent = None
+# Serializes agent initialization on the background loop (created there)
+agent_lock = None
 event_loop = None
 loop_thread = None
 executor = ThreadPoolExecutor(max_workers=4)
+# Set by the loop thread once its event loop is running
+loop_ready = threading.Event()
+# Seconds a user request may take end to end
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+# Extra seconds run_async waits past a deadline for the agent to report it
+DEADLINE_GRACE = 1.0
+# Seconds between SSE keep-alive comments while the agent is quiet
+SSE_KEEPALIVE = 15.0
+# Seconds a shard resize request waits for the moves before answering 202
+RESIZE_TIMEOUT = 300.0
+# Seconds /api/health waits for the pool-wide task count before reporting the last one
+HEALTH_COUNT_TIMEOUT = float(os.getenv("HEALTH_COUNT_TIMEOUT", "1"))
 
 def run_event_loop():
     """Run the event loop in a separate thread."""
     global event_loop
     event_loop = asyncio.new_event_loop()
     asyncio.set_event_loop(event_loop)
+    event_loop.call_soon(loop_ready.set)
     event_loop.run_forever()
 
 def start_background_loop():
@@ -46,25 +81,57 @@ def start_background_loop():
 
 async def initialize_mcp_agent():
     """Initialize the MCP-powered task manager agent."""
-    global mcp_agent
-    if mcp_agent is None:
-        mcp_agent = MCPTaskManagerAgent()
-        success = await mcp_agent.setup_agent()
-        if not success:
-            print("❌ Failed to initialize MCP agent")
-            return None
+    global mcp_agent, agent_lock
+    if agent_lock is None:
+        agent_lock = asyncio.Lock()
+    # Requests arriving during start-up wait for the one initialization in progress
+    async with agent_lock:
+        if mcp_agent is None:
+            agent = MCPTaskManagerAgent()
+            success = await agent.setup_agent()
+            if not success:
+                print("❌ Failed to initialize MCP agent")
+                return None
+            mcp_agent = agent
     return mcp_agent
 
-def run_async(coro):
-    """Run an async coroutine in the background event loop."""
+def run_async(coro, timeout=REQUEST_TIMEOUT, cancel=True):
+    """
+    Run an async coroutine in the background event loop.
+    
+    After ``timeout`` seconds the coroutine is cancelled (unless ``cancel``
+    is False) instead of being left running, and TimeoutError is raised.
+    """
     if event_loop is None:
         start_background_loop()
-        # Wait a bit for the loop to start
-        import time
-        time.sleep(0.1)
+    loop_ready.wait()
     
     future = asyncio.run_coroutine_threadsafe(coro, event_loop)
-    return future.result(timeout=30)  # 30 second timeout
+    try:
+        return future.result(timeout=max(0.0, timeout))
+    except FutureTimeoutError:
+        if cancel:
+            future.cancel()
+        raise TimeoutError(f"gave up after {timeout:g}s")
+
+def request_deadline():
+    """This request's deadline: REQUEST_TIMEOUT from now, or the caller's if sooner."""
+    deadline = time.time() + REQUEST_TIMEOUT
+    header = header_deadline(request.headers.get(DEADLINE_HEADER))
+    if header is not None:
+        deadline = min(deadline, header)
+    return deadline
+
+def conversation_id():
+    """This browser's conversation ID, kept in Flask's signed session cookie."""
+    if 'conversation_id' not in session:
+        session['conversation_id'] = uuid.uuid4().hex
+    return session['conversation_id']
+
+def run_agent(agent, user_input, deadline):
+    """Run one request through the agent, bounded by ``deadline``."""
+    return run_async(agent.process_request(user_input, deadline, conversation_id()),
+                     timeout=deadline - time.time() + DEADLINE_GRACE)
 
 @app.route('/')
 def index():
@@ -79,14 +146,15 @@ def process_request():
         
         if not user_input:
             return jsonify({'error': 'No message provided'}), 400
+        deadline = request_deadline()
         
-        # Initialize MCP agent if needed
-        agent = run_async(initialize_mcp_agent())
+        # Initialize MCP agent if needed (start-up is shared, so never cancelled)
+        agent = run_async(initialize_mcp_agent(), cancel=False)
         if not agent:
             return jsonify({'error': 'MCP agent initialization failed'}), 500
         
         # Process request via MCP protocol
-        response = run_async(agent.process_request(user_input))
+        response = run_agent(agent, user_input, deadline)
         
         # Add MCP info to response for demonstration
         mcp_info = "\n\n🌟 Powered by MCP: Task DB (STDIO) + Notifications (HTTP)"
@@ -98,31 +166,90 @@ def process_request():
             'mcp_enabled': True
         })
         
+    except TimeoutError:
+        return jsonify({'error': 'Request deadline exceeded'}), 504
     except Exception as e:
         return jsonify({'error': f'MCP Error: {str(e)}'}), 500
 
+def sse_event(event):
+    """Format one agent event as a Server-Sent Events frame."""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@app.route('/api/process/stream', methods=['POST'])
+def process_request_stream():
+    """
+    Process a request and stream its progress as Server-Sent Events.
+    
+    Events: ``token`` (a piece of the answer), ``tool_start`` and
+    ``tool_end`` (each MCP tool call), then ``done`` with the full response.
+    The agent runs on the background loop and hands events to this
+    response through a queue; if the client disconnects, the run is
+    cancelled.
+    """
+    user_input = (request.json or {}).get('message', '').strip()
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+    deadline = request_deadline()
+    session_id = conversation_id()
+    
+    try:
+        agent = run_async(initialize_mcp_agent(), cancel=False)
+    except TimeoutError:
+        return jsonify({'error': 'Request deadline exceeded'}), 504
+    if not agent:
+        return jsonify({'error': 'MCP agent initialization failed'}), 500
+    
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        agent.stream_request(user_input, events.put, deadline, session_id), event_loop
+    )
+    
+    def generate():
+        try:
+            while True:
+                wait = min(SSE_KEEPALIVE, deadline - time.time() + DEADLINE_GRACE)
+                if wait <= 0:
+                    yield sse_event({'type': 'done', 'response': '❌ Request deadline exceeded', 'source': 'error'})
+                    return
+                try:
+                    event = events.get(timeout=wait)
+                except queue.Empty:
+                    # Comment line: keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if event['type'] == 'done':
+                    event['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                yield sse_event(event)
+                if event['type'] == 'done':
+                    return
+        finally:
+            # Client gone or stream over: stop any agent work still running
+            future.cancel()
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/quick-action', methods=['POST'])
 def quick_action():
     """Handle quick action buttons via MCP protocol."""
     try:
         action = request.json.get('action')
         
-        action_map = {
-            'list_tasks': 'List all my current tasks',
-            'task_count': 'How many tasks do I have?',
-            'notification_history': 'Show me the notification history'
-        }
-        
-        if action not in action_map:
+        if action not in QUICK_ACTIONS:
             return jsonify({'error': 'Invalid action'}), 400
         
-        # Initialize MCP agent if needed
-        agent = run_async(initialize_mcp_agent())
+        deadline = request_deadline()
+        
+        # Initialize MCP agent if needed (start-up is shared, so never cancelled)
+        agent = run_async(initialize_mcp_agent(), cancel=False)
         if not agent:
             return jsonify({'error': 'MCP agent initialization failed'}), 500
         
-        # Process action via MCP protocol
-        response = run_async(agent.process_request(action_map[action]))
+        # A quick action is one fixed MCP tool call: run it directly, without the LLM
+        response = run_async(agent.run_quick_action(action, deadline, conversation_id()),
+                             timeout=deadline - time.time() + DEADLINE_GRACE)
         
         # Add MCP transport info for demonstration
         transport_info = {
@@ -139,9 +266,58 @@ def quick_action():
             'transport': 'STDIO' if action in ['list_tasks', 'task_count'] else 'HTTP'
         })
         
+    except TimeoutError:
+        return jsonify({'error': 'Request deadline exceeded'}), 504
+    except Exception as e:
+        return jsonify({'error': f'MCP Error: {str(e)}'}), 500
+
+@app.route('/api/task-db/shards', methods=['POST'])
+def resize_task_db():
+    """Change the number of Task DB shards; only namespaces whose shard changes move."""
+    try:
+        shards = (request.json or {}).get('shards')
+        if not isinstance(shards, int) or shards < 1:
+            return jsonify({'error': 'shards must be a positive integer'}), 400
+        
+        agent = run_async(initialize_mcp_agent(), cancel=False)
+        if not agent:
+            return jsonify({'error': 'MCP agent initialization failed'}), 500
+        
+        # Moves are not cancelled half way: a resize runs to completion
+        pool = run_async(agent.resize_task_db(shards), timeout=RESIZE_TIMEOUT, cancel=False)
+        return jsonify({'task_db_pool': pool, 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except TimeoutError:
+        return jsonify({'error': 'Resize is still running; see /api/health for progress'}), 202
     except Exception as e:
         return jsonify({'error': f'MCP Error: {str(e)}'}), 500
 
+def task_db_pool_health():
+    """
+    Pool stats plus the task count across every shard, and whether the pool is degraded.
+    
+    The count gets HEALTH_COUNT_TIMEOUT seconds, so one wedged shard cannot
+    hold up the health check: past that (or if a shard fails) the last count
+    is reported with its age, and the pool is degraded. So it is while any
+    shard's circuit is not closed.
+    """
+    stats = mcp_agent.task_db.stats()
+    try:
+        total = run_async(mcp_agent.total_task_count(), timeout=HEALTH_COUNT_TIMEOUT)
+    except TimeoutError:
+        total = None
+    degraded = total is None or any(
+        supervisor['state'] != 'closed' for supervisor in stats['supervisors'].values()
+    )
+    if total is None:
+        total = mcp_agent.last_task_count
+        stats['total_tasks_age_s'] = (
+            round(time.time() - mcp_agent.last_task_count_at, 1)
+            if mcp_agent.last_task_count_at is not None else None
+        )
+    return dict(stats, total_tasks=total), degraded
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint for MCP-powered system."""
@@ -149,14 +325,32 @@ def health_check():
         # Check if OpenAI API key is configured
         has_api_key = bool(os.getenv('OPENAI_API_KEY'))
         
+        pool, degraded = None, False
+        if mcp_agent and isinstance(mcp_agent.task_db, ShardedTaskDB):
+            pool, degraded = task_db_pool_health()
+        
         return jsonify({
-            'status': 'healthy',
+            'status': 'degraded' if degraded else 'healthy',
             'has_api_key': has_api_key,
             'mcp_enabled': True,
             'mcp_servers': {
                 'task_database': 'STDIO transport',
                 'notifications': 'HTTP/SSE transport'
             },
+            'task_cache': mcp_agent.task_db_cache.stats() if mcp_agent else None,
+            'response_cache': mcp_agent.response_cache.stats() if mcp_agent else None,
+            'conversation_memory': mcp_agent.memory.stats() if mcp_agent else None,
+            'tool_output': mcp_agent.output_budgets.stats() if mcp_agent else None,
+            'streaming': mcp_agent.streaming_stats() if mcp_agent else None,
+            'agent_ready': mcp_agent is not None,
+            'fast_path': mcp_agent.intent_router.stats() if mcp_agent else None,
+            'supervisors': {
+                'task_database': mcp_agent.task_db_supervisor.stats(),
+                'notifications': mcp_agent.notification_supervisor.stats()
+            } if mcp_agent else None,
+            'startup_ms': mcp_agent.startup_timings if mcp_agent else None,
+            'import_ms': import_report(),
+            'task_db_pool': pool,
             'benefits': [
                 'Protocol Standardization',
                 'Transport Flexibility', 
@@ -168,6 +362,9 @@ def health_check():
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
+# Time from the first import of this module to the app being ready to serve
+record('web_app', PROCESS_T0)
+
 if __name__ == '__main__':
     # Check if OpenAI API key is configured
     if not os.getenv('OPENAI_API_KEY'):
@@ -192,14 +389,20 @@ if __name__ == '__main__':
     
     # Start the background event loop
     start_background_loop()
+    loop_ready.wait()
     
-    # Initialize the MCP agent in the background
-    try:
-        print("🔄 Initializing MCP agent...")
-        run_async(initialize_mcp_agent())
-        print("✅ MCP agent initialized successfully")
-    except Exception as e:
-        print(f"⚠️  Warning: Could not initialize MCP agent: {e}")
-        print("The agent will be initialized on first request")
+    # Initialize the MCP agent in the background; the app serves meanwhile
+    # (/api/health reports agent_ready, requests wait for the initialization)
+    print("🔄 Initializing MCP agent in the background...")
+    agent_startup = asyncio.run_coroutine_threadsafe(initialize_mcp_agent(), event_loop)
+    
+    def report_agent_startup(future):
+        try:
+            if future.result():
+                print("✅ MCP agent initialized successfully")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not initialize MCP agent: {e}")
+            print("The agent will be initialized on first request")
+    agent_startup.add_done_callback(report_agent_startup)
     
     app.run(debug=False, host='0.0.0.0', port=8080, threaded=True) 
\ No newline at end of file